@@ -0,0 +1,211 @@
+"""
+Compares the previous ``BaseHTTPMiddleware`` based cache middleware with the pure ASGI one.
+
+Both middlewares are driven directly through the ASGI interface against an in-memory caching repository, so the numbers
+reflect the middleware overhead only (no network, no Redis). On a miss, the pure ASGI one also compresses the cached
+variants, which the previous one didn't.
+
+Usage:
+    python -m benchmarks.cache_middleware_benchmark [--iterations 5000] [--items 100]
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+import tracemalloc
+from collections.abc import Callable
+from datetime import timedelta
+
+from fastapi import FastAPI, Request
+from fastapi.security import HTTPBearer
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.responses import JSONResponse, Response
+from starlette.status import HTTP_200_OK
+from starlette.types import ASGIApp, Message
+
+from src.api.middlewares.cache_middleware import CacheMiddleware
+from src.core.config import redis_config
+from src.utils.codecs import get_codec
+from src.utils.json_serialization import deserialize_json, serialize_json
+
+
+class InMemoryCachingRepository:
+    """Mimics ``RedisRequestCachingService`` including the serialization round trip."""
+
+    def __init__(self) -> None:
+        self.storage: dict[str, tuple[str | bytes, dict | None]] = {}
+        self.codec = get_codec(redis_config.CACHE_CODEC)
+
+    async def get_cache(self, key: str, encodings: tuple = ()) -> dict | None:
+        if (entry := self.storage.get(key)) is None:
+            return None
+        metadata, bodies = entry
+        # Legacy entries are plain JSON documents with the content inside
+        if bodies is None:
+            return deserialize_json(metadata)
+        response = self.codec.decode(metadata)
+        encoding = next((encoding for encoding in encodings if encoding in bodies), None)
+        response["content"] = None if encoding else bodies[None]
+        response["variants"] = {encoding: bodies[encoding]} if encoding else {}
+        return response
+
+    async def get_cache_metadata(self, key: str) -> dict | None:
+        if (entry := self.storage.get(key)) is None:
+            return None
+        return self.codec.decode(entry[0])
+
+    async def set_cache(self, key: str, response: dict, expire: timedelta, tags: tuple = ()) -> None:
+        if "variants" not in response:
+            self.storage[key] = (serialize_json(response), None)
+            return
+        metadata = self.codec.encode(
+            {name: value for name, value in response.items() if name not in ("content", "variants")},
+        )
+        self.storage[key] = (metadata, {None: response["content"], **response["variants"]})
+
+
+class LegacyCacheMiddleware(BaseHTTPMiddleware):
+    """Verbatim copy of the ``BaseHTTPMiddleware`` implementation replaced by the pure ASGI one."""
+
+    auth_scheme = HTTPBearer(auto_error=False)
+
+    def __init__(self, app: ASGIApp, caching_repository: InMemoryCachingRepository, expire: timedelta) -> None:
+        self.caching_repository = caching_repository
+        self.expire = expire
+        super().__init__(app)
+
+    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+        if request.method.lower() != "get":
+            return await call_next(request)
+
+        if not (authorization := await self.auth_scheme(request)):
+            return await call_next(request)
+
+        path = f"{request.url.path}/{request.url.query}"
+        cache_key = f"{path}:{authorization.credentials}"
+
+        cached_response = await self.caching_repository.get_cache(cache_key)
+        if cached_response:
+            return Response(
+                content=cached_response["content"],
+                media_type="application/json",
+                status_code=cached_response["status_code"],
+            )
+
+        response = await call_next(request)
+        if response.status_code == HTTP_200_OK:
+            response_body = [chunk async for chunk in response.body_iterator]
+            response_dict = {
+                "content": b"".join(response_body).decode("utf-8"),
+                "status_code": response.status_code,
+            }
+            await self.caching_repository.set_cache(cache_key, response_dict, self.expire)
+            return Response(
+                content=response_dict["content"],
+                media_type="application/json",
+                status_code=response.status_code,
+            )
+        return response
+
+
+def build_app(items: int) -> FastAPI:
+    app = FastAPI()
+    payload = {
+        "items": [
+            {"id": i, "first_name": "John", "last_name": "Doe", "email": f"user{i}@example.com"} for i in range(items)
+        ],
+        "page": 1,
+        "pages": 1,
+        "size": items,
+        "total": items,
+    }
+
+    @app.get("/api/v1/users/")
+    async def list_users() -> JSONResponse:
+        return JSONResponse(payload)
+
+    return app
+
+
+def build_scope(query: str) -> dict:
+    return {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/api/v1/users/",
+        "raw_path": b"/api/v1/users/",
+        "query_string": query.encode(),
+        "root_path": "",
+        "headers": [(b"host", b"test"), (b"authorization", b"Bearer benchmark-token")],
+        "client": ("127.0.0.1", 1234),
+        "server": ("test", 80),
+    }
+
+
+async def run_request(app: ASGIApp, scope: dict) -> None:
+    async def receive() -> Message:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message: Message) -> None:
+        return None
+
+    await app(scope, receive, send)
+
+
+async def measure(app: ASGIApp, iterations: int, *, hit: bool) -> dict:
+    if hit:
+        await run_request(app, build_scope("warm"))  # Fill the cache once, every measured request is a hit
+
+    latencies = []
+    for i in range(iterations):
+        scope = build_scope("warm" if hit else f"latency={i}")
+        started_at = time.perf_counter()
+        await run_request(app, scope)
+        latencies.append(time.perf_counter() - started_at)
+
+    # Allocations are traced in a separate pass as tracemalloc distorts the latency figures
+    peaks = []
+    tracemalloc.start()
+    for i in range(min(iterations, 500)):
+        scope = build_scope("warm" if hit else f"allocations={i}")
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        await run_request(app, scope)
+        peaks.append(tracemalloc.get_traced_memory()[1] - current)
+    tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        "mean_us": statistics.fmean(latencies) * 1e6,
+        "p50_us": latencies[len(latencies) // 2] * 1e6,
+        "p99_us": latencies[int(len(latencies) * 0.99)] * 1e6,
+        "peak_kib": statistics.fmean(peaks) / 1024,
+    }
+
+
+async def main(iterations: int, items: int) -> None:
+    expire = timedelta(seconds=300)
+    implementations = {
+        "BaseHTTPMiddleware": lambda app: LegacyCacheMiddleware(app, InMemoryCachingRepository(), expire),
+        "pure ASGI": lambda app: CacheMiddleware(app, InMemoryCachingRepository(), expire),
+    }
+
+    print(f"{'implementation':<20} {'path':<5} {'mean us':>10} {'p50 us':>10} {'p99 us':>10} {'peak KiB':>10}")
+    for name, factory in implementations.items():
+        for hit in (True, False):
+            result = await measure(factory(build_app(items)), iterations, hit=hit)
+            print(
+                f"{name:<20} {'hit' if hit else 'miss':<5} {result['mean_us']:>10.1f} {result['p50_us']:>10.1f} "
+                f"{result['p99_us']:>10.1f} {result['peak_kib']:>10.1f}",
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=5000)
+    parser.add_argument("--items", type=int, default=100, help="Number of items in the benchmarked JSON payload")
+    args = parser.parse_args()
+    asyncio.run(main(args.iterations, args.items))
@@ -0,0 +1,97 @@
+"""
+Compares the available cache codecs on paginated payloads and on cache entry metadata.
+
+The "legacy" row is the previous cache hit path: a JSON document with the body inside, read from a decoding Redis
+client and turned back into bytes (bytes -> str -> dict -> str -> bytes). With the raw body stored separately, a hit
+decodes the small metadata only.
+
+Usage:
+    python -m benchmarks.codec_benchmark [--iterations 2000] [--sizes 10 50 500]
+"""
+
+import argparse
+import json
+import statistics
+import time
+from collections.abc import Callable
+from typing import Any
+
+from src.utils.codecs import CODECS
+
+
+def build_page(size: int) -> dict:
+    return {
+        "items": [
+            {
+                "id": i,
+                "first_name": "John",
+                "last_name": "Doe",
+                "email": f"user{i}@example.com",
+                "user_role": "User",
+                "created_at": "2024-10-01T12:00:00.000000+00:00",
+                "score": i * 1.5,
+                "is_active": i % 2 == 0,
+            }
+            for i in range(size)
+        ],
+        "page": 1,
+        "pages": 10,
+        "size": size,
+        "total": size * 10,
+    }
+
+
+def build_metadata() -> dict:
+    return {
+        "status_code": 200,
+        "headers": [["content-type", "application/json"], ["content-length", "12345"], ["vary", "Accept-Encoding"]],
+        "etag": '"0123456789abcdef0123456789abcdef"',
+        "encodings": ["zstd", "gzip"],
+        "created_at": time.time(),
+    }
+
+
+def measure(function: Callable[[], Any], iterations: int) -> float:
+    """
+    :return: Mean duration of a call in microseconds.
+    """
+    timings = []
+    for _ in range(iterations):
+        started_at = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started_at)
+    return statistics.fmean(timings) * 1e6
+
+
+def legacy_hit(document: str) -> bytes:
+    return json.loads(document)["content"].encode()
+
+
+def main(iterations: int, sizes: list[int]) -> None:
+    metadata = build_metadata()
+    print(f"{'codec':<8} {'payload':<10} {'encode us':>10} {'decode us':>10} {'bytes':>10}")
+    for codec in CODECS.values():
+        encoded = codec.encode(metadata)
+        encode_us = measure(lambda codec=codec: codec.encode(metadata), iterations)
+        decode_us = measure(lambda codec=codec, encoded=encoded: codec.decode(encoded), iterations)
+        print(f"{codec.name:<8} {'metadata':<10} {encode_us:>10.1f} {decode_us:>10.1f} {len(encoded):>10}")
+
+    for size in sizes:
+        page = build_page(size)
+        for codec in CODECS.values():
+            encoded = codec.encode(page)
+            encode_us = measure(lambda codec=codec, page=page: codec.encode(page), iterations)
+            decode_us = measure(lambda codec=codec, encoded=encoded: codec.decode(encoded), iterations)
+            print(f"{codec.name:<8} {f'page={size}':<10} {encode_us:>10.1f} {decode_us:>10.1f} {len(encoded):>10}")
+
+        document = json.dumps({**metadata, "content": json.dumps(page)})
+        hit_us = measure(lambda document=document: legacy_hit(document), iterations)
+        print(f"{'legacy':<8} {f'page={size}':<10} {'':>10} {hit_us:>10.1f} {len(document):>10}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 50, 500], help="Page sizes of the payloads")
+    args = parser.parse_args()
+    main(args.iterations, args.sizes)
@@ -0,0 +1,127 @@
+"""
+Compares the adapter statements built on every call ("legacy") with the statements prebuilt once per model.
+
+The calls are driven against a fake session compiling the statements through the SQLAlchemy compiled cache the way a
+connection does, so the numbers reflect the statement overhead only (no network, no database). The number of the
+distinct SQL texts sent for the bulk retrieves is the number of the statements asyncpg has to prepare.
+
+Usage:
+    python -m benchmarks.postgres_adapter_benchmark [--iterations 5000] [--max-keys 50]
+"""
+
+import argparse
+import asyncio
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects import postgresql
+
+from src.adapters.postgres_adapter import PostgresAdapter
+from src.models.user_model import User
+
+
+class FakeResult:
+    def scalars(self) -> "FakeResult":
+        return self
+
+    def first(self) -> User:
+        return User(id=1)
+
+    def all(self) -> list[User]:
+        return [User(id=1)]
+
+    def scalar(self) -> int:
+        return 1
+
+
+class FakeSession:
+    """Compiles the executed statements through a compiled cache, as ``Connection.execute`` does."""
+
+    def __init__(self) -> None:
+        self.dialect = postgresql.asyncpg.dialect()
+        self.compiled_cache: dict = {}
+
+    async def execute(self, statement: Any, *_: Any, **__: Any) -> FakeResult:
+        statement._compile_w_cache(self.dialect, compiled_cache=self.compiled_cache, column_keys=[])
+        return FakeResult()
+
+    async def commit(self) -> None:
+        pass
+
+
+async def legacy_retrieve(session: FakeSession, pk: int) -> User:
+    pk_attr = getattr(User.__table__.c, User.pk_name())
+    res = await session.execute(select(User).where(pk_attr == pk), execution_options={"populate_existing": True})
+    return res.scalars().first()
+
+
+async def legacy_bulk_retrieve(session: FakeSession, pks: list[int]) -> list[User]:
+    pk_attr = getattr(User.__table__.c, User.pk_name())
+    res = await session.execute(select(User).where(pk_attr.in_(pks)), execution_options={"populate_existing": True})
+    return res.scalars().all()
+
+
+async def legacy_delete(session: FakeSession, pk: int) -> None:
+    pk_attr = getattr(User.__table__.c, User.pk_name())
+    res = await session.execute(delete(User).where(pk_attr == pk).returning(pk_attr))
+    res.scalar()
+
+
+async def measure(call: Callable[[int], Awaitable[Any]], iterations: int) -> float:
+    """
+    :return: Calls per second.
+    """
+    started_at = time.perf_counter()
+    for i in range(iterations):
+        await call(i)
+    return iterations / (time.perf_counter() - started_at)
+
+
+def count_distinct_sql(max_keys: int) -> tuple[int, int]:
+    """
+    :return: Number of the distinct SQL texts of the legacy and of the prebuilt bulk retrieves of 1 to max_keys keys.
+    """
+    dialect = postgresql.asyncpg.dialect()
+    compile_kwargs = {"render_postcompile": True}  # Expanding the IN parameters as they are sent to the database
+    pk_attr = getattr(User.__table__.c, User.pk_name())
+    prebuilt_statement = PostgresAdapter(FakeSession(), User).statements.bulk_retrieve
+    legacy, prebuilt = set(), set()
+    for size in range(1, max_keys + 1):
+        legacy_statement = select(User).where(pk_attr.in_(range(size)))
+        legacy.add(str(legacy_statement.compile(dialect=dialect, compile_kwargs=compile_kwargs)))
+        bound_statement = prebuilt_statement.params(primary_keys=list(range(size)))
+        prebuilt.add(str(bound_statement.compile(dialect=dialect, compile_kwargs=compile_kwargs)))
+    return len(legacy), len(prebuilt)
+
+
+async def main(iterations: int, max_keys: int) -> None:
+    session = FakeSession()
+    adapter = PostgresAdapter(session, User)
+    keys = [list(range(1 + i % max_keys)) for i in range(max_keys)]
+    calls = {
+        "retrieve": (lambda i: legacy_retrieve(session, i), adapter.retrieve),
+        "bulk_retrieve": (
+            lambda i: legacy_bulk_retrieve(session, keys[i % max_keys]),
+            lambda i: adapter.bulk_retrieve(keys[i % max_keys]),
+        ),
+        "delete": (lambda i: legacy_delete(session, i), lambda i: adapter.delete(i, commit=False)),
+    }
+
+    print(f"{'call':<14} {'legacy/s':>10} {'prebuilt/s':>11} {'speedup':>8}")
+    for name, (legacy_call, prebuilt_call) in calls.items():
+        legacy_rate = await measure(legacy_call, iterations)
+        prebuilt_rate = await measure(prebuilt_call, iterations)
+        print(f"{name:<14} {legacy_rate:>10.0f} {prebuilt_rate:>11.0f} {prebuilt_rate / legacy_rate:>7.2f}x")
+
+    legacy_sql, prebuilt_sql = count_distinct_sql(max_keys)
+    print(f"\nDistinct bulk_retrieve statements for 1..{max_keys} keys: legacy={legacy_sql} prebuilt={prebuilt_sql}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=5000)
+    parser.add_argument("--max-keys", type=int, default=50, help="Maximum number of the keys of the bulk retrieves")
+    args = parser.parse_args()
+    asyncio.run(main(args.iterations, args.max_keys))
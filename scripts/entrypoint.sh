@@ -7,5 +7,11 @@ export PYTHONPATH="${PYTHONPATH}:/app"
 echo "Applying migrations..."
 alembic --config /app/src/alembic.ini upgrade head
 
+if [ -n "${PROMETHEUS_MULTIPROC_DIR:-}" ]; then
+    echo "Clearing the metrics of the previous workers..."
+    rm -rf "${PROMETHEUS_MULTIPROC_DIR:?}"
+    mkdir -p "${PROMETHEUS_MULTIPROC_DIR}"
+fi
+
 echo "Starting the application..."
 uvicorn src.main:app --reload --host 0.0.0.0 --port 8000
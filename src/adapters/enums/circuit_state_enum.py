@@ -0,0 +1,7 @@
+from src.core.enums.base_enum import BaseEnum
+
+
+class CircuitStateEnum(BaseEnum):
+    CLOSED = "closed"  # Calls go through, their outcomes are recorded
+    OPEN = "open"  # Calls are rejected right away
+    HALF_OPEN = "half_open"  # A few trial calls go through, their outcomes close or open the circuit again
@@ -0,0 +1,8 @@
+from src.core.enums.base_enum import BaseEnum
+
+
+class CountStrategyEnum(BaseEnum):
+    EXACT = "exact"  # count(*) over the filtered query
+    ESTIMATED = "estimated"  # Planner estimate, exact below the estimate threshold
+    CACHED = "cached"  # Exact count cached per query for a short time
+    NONE = "none"  # No total, only whether there is a next page
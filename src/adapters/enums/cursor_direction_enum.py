@@ -0,0 +1,6 @@
+from src.core.enums.base_enum import BaseEnum
+
+
+class CursorDirectionEnum(BaseEnum):
+    NEXT = "next"  # Rows after the cursor in the requested order
+    PREVIOUS = "previous"  # Rows before the cursor in the requested order
@@ -0,0 +1,6 @@
+from src.core.enums.base_enum import BaseEnum
+
+
+class HTTPCacheStorageEnum(BaseEnum):
+    MEMORY = "memory"  # Per-process LRU
+    REDIS = "redis"  # Shared by the workers
@@ -5,4 +5,7 @@ class HTTPMethodEnum(BaseEnum):
     POST = "post"
     GET = "get"
     PUT = "put"
+    PATCH = "patch"
     DELETE = "delete"
+    HEAD = "head"
+    OPTIONS = "options"
@@ -0,0 +1,36 @@
+from functools import cache
+
+from sqlalchemy import Delete, Select, Update, any_, bindparam, delete, func, select, update
+from sqlalchemy.dialects.postgresql import ARRAY
+
+
+class ModelStatements:
+    """
+    Standard statements of a model, built once and executed with the values bound, e.g.
+    `session.execute(statements.retrieve, {"primary_key": 1})`.
+
+    Reusing the same statement objects skips building the constructs and hits the compiled cache of SQLAlchemy.
+    The bulk statements compare the primary key with `= ANY(:primary_keys)` rather than with IN, so the SQL is the
+    same whatever the number of the keys and the prepared statement cached by asyncpg is reused.
+    """
+
+    def __init__(self, model: type) -> None:
+        self.pk_attr = getattr(model.__table__.c, model.pk_name())
+        pk_condition = self.pk_attr == bindparam("primary_key")
+        pks_condition = self.pk_attr == any_(bindparam("primary_keys", type_=ARRAY(self.pk_attr.type)))
+
+        self.retrieve: Select = select(model).where(pk_condition)
+        self.bulk_retrieve: Select = select(model).where(pks_condition)
+        self.update: Update = update(model).where(pk_condition).returning(model)
+        self.bulk_update: Update = update(model).where(pks_condition).returning(model)
+        # The bound primary key can't be evaluated against the objects of the session, the deleted object is removed
+        # from the session by the returned primary key instead
+        self.delete: Delete = (
+            delete(model).where(pk_condition).returning(self.pk_attr).execution_options(synchronize_session="fetch")
+        )
+        self.count: Select = select(func.count()).select_from(model)
+
+
+@cache
+def get_model_statements(model: type) -> ModelStatements:
+    return ModelStatements(model)
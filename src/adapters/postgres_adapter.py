@@ -1,28 +1,106 @@
+import hashlib
+import itertools
+import json
+import logging
 import math
-from collections.abc import Sequence
+from collections.abc import AsyncIterable, AsyncIterator, Awaitable, Callable, Hashable, Iterable, Mapping, Sequence
+from enum import Enum
+from operator import itemgetter
 from typing import Generic, TypeVar
 
+from asyncpg import PostgresError
 from fastapi import HTTPException, status
-from pydantic import BaseModel
-from sqlalchemy import Select, UnaryExpression, delete, func, select, update
-from sqlalchemy.exc import IntegrityError
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from sqlalchemy import (
+    ColumnElement,
+    RowMapping,
+    Select,
+    UnaryExpression,
+    and_,
+    func,
+    literal,
+    or_,
+    select,
+    tuple_,
+)
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.dialects.postgresql import Insert
+from sqlalchemy.exc import DBAPIError, IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.sql import expression
-from sqlalchemy.testing.plugin.plugin_base import logging
+from sqlalchemy.sql import operators
 
-from src.api.schema.pagination_schema import PaginatedData, PaginationParams
+from src.adapters.enums.count_strategy_enum import CountStrategyEnum
+from src.adapters.enums.cursor_direction_enum import CursorDirectionEnum
+from src.adapters.model_statements import get_model_statements
+from src.adapters.redis_adapter import RedisRequestCachingService
+from src.api.schema.bulk_write_schema import BatchError, BulkWriteResult
+from src.api.schema.pagination_schema import (
+    CursorPaginatedData,
+    CursorPaginationParams,
+    PaginatedData,
+    PaginationParams,
+)
+from src.core.config import postgres_config
+from src.utils.batching import iterate_batches
+from src.utils.cache_policy import resource_tag
+from src.utils.cursor import decode_cursor, encode_cursor
+from src.utils.lru_ttl_cache import LRUTTLCache
+from src.utils.sql_explain import Explain
 
 logger = logging.getLogger(__name__)
 
+# Maximum number of bind parameters of a PostgreSQL statement
+MAX_BIND_PARAMETERS = 32767
+
 TModel = TypeVar("TModel")
 TCreate = TypeVar("TCreate", bound=BaseModel)
 TUpdate = TypeVar("TUpdate", bound=BaseModel)
 
 
+def get_query_fingerprint(query: Select) -> str:
+    """
+    :return: Digest of the SQL and the parameters of the query.
+    """
+    compiled = query.compile(dialect=postgresql.dialect())
+    parameters = sorted(compiled.params.items(), key=itemgetter(0))
+    return hashlib.blake2b(f"{compiled}\n{parameters!r}".encode(), digest_size=16).hexdigest()
+
+
+def deduplicate_rows(rows: list[dict], columns: Sequence[str]) -> list[dict]:
+    """
+    :return: Rows with a single row per values of the columns, the last one, at the position of the first one. The rows
+    missing any of the columns are kept as they are.
+    """
+    unique_rows: dict[Hashable, dict] = {}
+    for row in rows:
+        key = tuple(row.get(column) for column in columns)
+        unique_rows[id(row) if None in key else key] = row
+    return list(unique_rows.values())
+
+
 class PostgresAdapter(Generic[TModel, TCreate, TUpdate]):
-    def __init__(self, session: AsyncSession, model: TModel) -> None:
+    # Exact counts of the queries paginated with the cached count strategy, by the query fingerprint
+    count_cache = LRUTTLCache(
+        max_entries=postgres_config.COUNT_CACHE_MAX_ENTRIES,
+        ttl=postgres_config.COUNT_CACHE_TTL,
+    )
+
+    def __init__(
+        self,
+        session: AsyncSession,
+        model: TModel,
+        caching_service: RedisRequestCachingService | None = None,
+    ) -> None:
+        """
+        :param session: Database session.
+        :param model: Model to operate on.
+        :param caching_service: If passed, committed writes invalidate the cached responses tagged with the model
+        resource, i.e. routes declaring `cache_policy(resources=(<model table name>,))`.
+        """
         self.session = session
         self.model = model
+        self.caching_service = caching_service
+        self.statements = get_model_statements(model)
 
     async def create(self, input_data: BaseModel) -> TModel | HTTPException:
         try:
@@ -36,42 +114,116 @@ class PostgresAdapter(Generic[TModel, TCreate, TUpdate]):
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Record with some unique data exists",
             ) from e
+        await self.invalidate_cache()
         return obj
 
+    async def bulk_create(
+        self,
+        input_data: Iterable[BaseModel] | AsyncIterable[BaseModel],
+        batch_size: int = postgres_config.BULK_WRITE_BATCH_SIZE,
+        returning: bool = True,
+        use_copy: bool = False,
+    ) -> BulkWriteResult:
+        """
+        Inserts the rows in batches, each batch is a single multi-row INSERT committed on its own. A failed batch is
+        rolled back to a savepoint and reported, the following batches are still written.
+        :param input_data: Rows to insert, iterated lazily.
+        :param batch_size: Number of the rows per statement, capped by the bind parameters limit of PostgreSQL.
+        :param returning: Whether to return the inserted rows, disable for big loads to keep the memory flat.
+        :param use_copy: Whether to load the rows with COPY, the fastest way for very large loads. The rows aren't
+        returned then, asyncpg is required.
+        :return: Inserted rows and the errors of the failed batches.
+        """
+        if use_copy:
+            return await self._bulk_write(input_data, batch_size, self._copy_batch)
+        insert_batch = self._insert_batch(lambda rows: postgresql.insert(self.model).values(rows), returning)
+        return await self._bulk_write(input_data, batch_size, insert_batch)
+
+    async def bulk_upsert(
+        self,
+        input_data: Iterable[BaseModel] | AsyncIterable[BaseModel],
+        conflict_columns: Sequence[str] | None = None,
+        update_columns: Sequence[str] | None = None,
+        batch_size: int = postgres_config.BULK_WRITE_BATCH_SIZE,
+        returning: bool = True,
+    ) -> BulkWriteResult:
+        """
+        Inserts the rows in batches with INSERT ... ON CONFLICT DO UPDATE, see bulk_create for the batching.
+        :param input_data: Rows to insert or update, iterated lazily. Out of the rows of a batch with the same conflict
+        columns values, the last one is written.
+        :param conflict_columns: Columns of the unique constraint identifying the existing rows, the primary key by
+        default.
+        :param update_columns: Columns updated on the existing rows, all the passed columns by default. The columns not
+        set on a row are never updated.
+        :param batch_size: Number of the rows per statement.
+        :param returning: Whether to return the inserted and updated rows.
+        :return: Inserted and updated rows and the errors of the failed batches.
+        """
+        conflict_columns = conflict_columns or [self.model.pk_name()]
+
+        def build_statement(rows: list[dict]) -> Insert:
+            statement = postgresql.insert(self.model).values(rows)
+            # The columns not provided aren't updated, so the existing values aren't overwritten with NULL
+            columns = [
+                column for column in update_columns or rows[0] if column in rows[0] and column not in conflict_columns
+            ]
+            if not columns:
+                return statement.on_conflict_do_nothing(index_elements=conflict_columns)
+            return statement.on_conflict_do_update(
+                index_elements=conflict_columns,
+                set_={column: statement.excluded[column] for column in columns},
+            )
+
+        return await self._bulk_write(
+            input_data,
+            batch_size,
+            self._insert_batch(build_statement, returning),
+            unique_columns=conflict_columns,
+        )
+
     async def get_paginated_data(
         self,
         params: PaginationParams,
         query: Select,
         is_mapping: bool = False,
         order_by: UnaryExpression = None,
+        count_strategy: CountStrategyEnum = CountStrategyEnum.EXACT,
     ) -> PaginatedData | HTTPException:
+        """
+        :param params: Number and size of the page.
+        :param query: Query selecting the rows.
+        :param is_mapping: Whether to return the rows as mappings instead of the model objects.
+        :param order_by: Order of the rows.
+        :param count_strategy: How the total is counted, see CountStrategyEnum. Whether there is a next page is known
+        exactly with any of the strategies.
+        """
         try:
-            count_query = query.with_only_columns(func.count()).order_by(None)
-            res = await self.session.execute(count_query)
+            count, is_exact = await self._count(query, count_strategy)
         except Exception as e:
             logger.exception("Invalid input query!", extra={"e": e})
             raise HTTPException(
                 status_code=status.HTTP_409_CONFLICT,
                 detail="Query error, try again later",
             ) from e
-        count = res.scalar() if isinstance(res.scalar(), int) else 0
 
-        total_pages = math.ceil(count / params.size) if params.size else 1
+        total_pages = math.ceil(count / params.size) if count is not None else None
         offset = params.size * (params.page - 1)
 
         try:
-            data_query = query.limit(params.size).offset(offset)
+            data_query = query.limit(params.size + 1).offset(offset)  # The extra row tells if there is a next page
             if order_by is not None:
                 data_query = data_query.order_by(order_by)
             res = await self.session.execute(data_query)
 
             data = res.mappings().all() if is_mapping else res.scalars().all()
             return PaginatedData(
-                items=data,
+                items=data[: params.size],
                 page=params.page,
                 pages=total_pages,
                 size=params.size,
                 total=count,
+                total_is_exact=is_exact,
+                has_next=len(data) > params.size,
             )
 
         except Exception as e:
@@ -81,20 +233,112 @@ class PostgresAdapter(Generic[TModel, TCreate, TUpdate]):
                 detail="Query error, try again later",
             ) from e
 
-    async def retrieve(self, pk: int) -> TModel | HTTPException:
-        query = select(self.model).where(self._get_pk_attr() == pk)
-        res = await self.session.execute(query)
+    async def get_cursor_paginated_data(
+        self,
+        params: CursorPaginationParams,
+        query: Select,
+        order_by: Sequence[ColumnElement] = (),
+        is_mapping: bool = False,
+    ) -> CursorPaginatedData | HTTPException:
+        """
+        Keyset pagination: the page is located with a condition on the key columns instead of an offset, so it's read
+        straight from the index matching the order, however deep the page is.
+        :param params: Cursor and size of the page.
+        :param query: Query selecting the rows, without an order.
+        :param order_by: Key columns, e.g. `(User.created_at.desc(), User.id)`. The primary key is appended as the
+        tie-breaker if it's missing. The key columns can't be nullable and have to be selected by mapping queries.
+        :param is_mapping: Whether to return the rows as mappings instead of the model objects.
+        :return: Page along with the cursors of the next and the previous pages, None if there are no such pages.
+        """
+        keyset = self._get_keyset(order_by)
+        direction, values = CursorDirectionEnum.NEXT, None
+        if params.cursor is not None:
+            try:
+                raw_values, direction = decode_cursor(params.cursor)
+                values = self._validate_cursor_values(keyset, raw_values)
+            except (ValueError, ValidationError) as e:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor") from e
+
+        # The previous page is read in the reversed order starting from the cursor, then reversed back
+        backward = direction == CursorDirectionEnum.PREVIOUS
+        data_query = query.order_by(
+            *(column.asc() if descending == backward else column.desc() for column, descending in keyset),
+        )
+        if values is not None:
+            data_query = data_query.where(self._build_keyset_condition(keyset, values, backward))
+        data_query = data_query.limit(params.size + 1)  # The extra row tells if there are more rows in the direction
+
+        try:
+            res = await self.session.execute(data_query)
+            data = res.mappings().all() if is_mapping else res.scalars().all()
+        except Exception as e:
+            logger.exception("Invalid input query!", extra={"e": e})
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Query error, try again later",
+            ) from e
+
+        has_more = len(data) > params.size
+        data = list(data[: params.size])
+        if backward:
+            data.reverse()
+        has_next = has_more if not backward else values is not None
+        has_previous = has_more if backward else values is not None
+
+        return CursorPaginatedData(
+            items=data,
+            size=params.size,
+            next_cursor=self._get_cursor(keyset, data[-1], CursorDirectionEnum.NEXT) if data and has_next else None,
+            previous_cursor=(
+                self._get_cursor(keyset, data[0], CursorDirectionEnum.PREVIOUS) if data and has_previous else None
+            ),
+        )
+
+    async def stream(
+        self,
+        query: Select,
+        fetch_size: int = postgres_config.STREAM_FETCH_SIZE,
+        is_mapping: bool = False,
+    ) -> AsyncIterator[TModel | RowMapping]:
+        """
+        Reads the rows through a server-side cursor, fetch size rows at a time, so the memory use doesn't depend on
+        the number of the rows. The session connection is held until the iteration ends.
+        :param query: Query selecting the rows.
+        :param fetch_size: Number of the rows fetched from the cursor at once.
+        :param is_mapping: Whether to yield the rows as mappings instead of the model objects.
+        """
+        res = await self.session.stream(query.execution_options(yield_per=fetch_size))
+        async for partition in (res.mappings() if is_mapping else res.scalars()).partitions():
+            for row in partition:
+                yield row
+
+    async def retrieve(self, pk: int, refresh: bool = False) -> TModel | HTTPException:
+        """
+        :param pk: Primary key of the object.
+        :param refresh: Whether to refresh the object with a separate query, e.g. to load expired attributes. The
+        object is read fresh without it as well.
+        """
+        res = await self.session.execute(
+            self.statements.retrieve,
+            {"primary_key": pk},
+            execution_options={"populate_existing": True},
+        )
         obj = res.scalars().first()
         self._check_object(obj)
-        await self.session.refresh(obj)
+        if refresh:
+            await self.session.refresh(obj)
         return obj
 
-    async def bulk_retrieve(self, pks: Sequence[int]) -> Sequence[TModel] | HTTPException:
-        query = select(self.model).where(self._get_pk_attr().in_(pks))
-        res = await self.session.execute(query)
+    async def bulk_retrieve(self, pks: Sequence[int], refresh: bool = False) -> Sequence[TModel] | HTTPException:
+        res = await self.session.execute(
+            self.statements.bulk_retrieve,
+            {"primary_keys": list(pks)},
+            execution_options={"populate_existing": True},
+        )
         objs = res.scalars().all()
-        [self._check_object(obj) for obj in objs]
-        [await self.session.refresh(obj) for obj in objs]
+        if refresh:
+            for obj in objs:
+                await self.session.refresh(obj)
         return objs
 
     async def update(
@@ -102,35 +346,260 @@ class PostgresAdapter(Generic[TModel, TCreate, TUpdate]):
         pk: int,
         input_data: BaseModel,
         partial: bool = False,
+        commit: bool = True,
+        refresh: bool = False,
     ) -> TModel | HTTPException:
-        retrieved_obj = await self.retrieve(pk)
-        query = update(self.model).where(self._get_pk_attr() == pk).values(**input_data.dict(exclude_unset=partial))
-        await self._execute_commit(query)
-        return retrieved_obj
+        """
+        Updates the object with a single UPDATE ... RETURNING statement.
+        :return: Updated object.
+        """
+        if not (values := input_data.model_dump(exclude_unset=partial)):
+            return await self.retrieve(pk, refresh=refresh)
+
+        res = await self.session.execute(
+            self.statements.update.values(**values),
+            {"primary_key": pk},
+            execution_options={"populate_existing": True},
+        )
+        obj = res.scalars().first()
+        self._check_object(obj)
+        await self._commit(commit)
+        if refresh:
+            await self.session.refresh(obj)
+        return obj
 
     async def bulk_update(
         self,
         pks: Sequence[int],
         input_data: BaseModel,
         partial: bool = False,
-    ) -> Sequence[TModel] or HTTPException:
-        retrieved_objs = await self.bulk_retrieve(pks)
-        query = update(self.model).where(self._get_pk_attr().in_(pks)).values(**input_data.dict(exclude_unset=partial))
-        await self._execute_commit(query)
-        return retrieved_objs
+        commit: bool = True,
+        refresh: bool = False,
+    ) -> Sequence[TModel] | HTTPException:
+        """
+        Updates the objects with a single UPDATE ... RETURNING statement.
+        :return: Updated objects, the missing ones are skipped.
+        """
+        if not (values := input_data.model_dump(exclude_unset=partial)):
+            return await self.bulk_retrieve(pks, refresh=refresh)
+
+        res = await self.session.execute(
+            self.statements.bulk_update.values(**values),
+            {"primary_keys": list(pks)},
+            execution_options={"populate_existing": True},
+        )
+        objs = res.scalars().all()
+        await self._commit(commit)
+        if refresh:
+            for obj in objs:
+                await self.session.refresh(obj)
+        return objs
 
     async def delete(self, pk: int, commit: bool = True) -> None:
-        await self.retrieve(pk)
-        query = delete(self.model).where(self._get_pk_attr() == pk)
-        await self._execute_commit(query, commit)
+        res = await self.session.execute(self.statements.delete, {"primary_key": pk})
+        self._check_object(res.scalar() is not None)  # No row returned if there was nothing to delete
+        await self._commit(commit)
+
+    async def count(self) -> int:
+        """
+        :return: Number of all the rows of the model.
+        """
+        res = await self.session.execute(self.statements.count)
+        return res.scalar() or 0
+
+    async def invalidate_cache(self) -> None:
+        """
+        Invalidates the cached responses built from the model. Called on committed writes, should be called manually
+        when committing the session outside the adapter.
+        """
+        if self.caching_service is not None:
+            await self.caching_service.invalidate_tags(resource_tag(self.model.__tablename__))
 
-    async def _execute_commit(self, query: expression, commit: bool = True) -> None:
-        await self.session.execute(query)
+    async def _commit(self, commit: bool = True) -> None:
         if commit:
             await self.session.commit()
+            await self.invalidate_cache()
+
+    async def _bulk_write(
+        self,
+        input_data: Iterable[BaseModel] | AsyncIterable[BaseModel],
+        batch_size: int,
+        write_batch: Callable[[list[dict]], Awaitable[tuple[int, Sequence[TModel]]]],
+        unique_columns: Sequence[str] = (),
+    ) -> BulkWriteResult:
+        """
+        :param unique_columns: Columns identifying a row, the rows repeating the values of an earlier one replace it,
+        as a statement can't upsert the same row twice.
+        """
+        result = BulkWriteResult(items=[])
+        index = 0
+        async for models in iterate_batches(input_data, batch_size):
+            # Only the set fields are written, as in create, so the server defaults apply to the others. The rows of a
+            # statement need the same columns, the consecutive rows setting the same fields are written together.
+            rows = [model.model_dump(exclude_unset=True) for model in models]
+            if unique_columns:
+                rows = deduplicate_rows(rows, unique_columns)
+            for columns, group in itertools.groupby(rows, key=tuple):
+                same_column_rows = list(group)
+                # A statement can't have more than 32767 bind parameters, a parameter per column per row
+                rows_per_batch = max(1, min(batch_size, MAX_BIND_PARAMETERS // max(len(columns), 1)))
+                for start in range(0, len(same_column_rows), rows_per_batch):
+                    batch = same_column_rows[start : start + rows_per_batch]
+                    try:
+                        # Rolling back to a savepoint rather than the whole session, which would expire the rows
+                        # returned by the earlier batches
+                        async with self.session.begin_nested():
+                            written, items = await write_batch(batch)
+                        await self.session.commit()
+                    except (DBAPIError, PostgresError) as e:
+                        logger.exception("Failed to write the batch", extra={"e": e, "batch": index})
+                        result.errors.append(BatchError(batch=index, size=len(batch), detail=str(e)))
+                    else:
+                        result.written += written
+                        result.items.extend(items)
+                    index += 1
+
+        if result.written:
+            await self.invalidate_cache()
+        return result
+
+    def _insert_batch(
+        self,
+        build_statement: Callable[[list[dict]], Insert],
+        returning: bool,
+    ) -> Callable[[list[dict]], Awaitable[tuple[int, Sequence[TModel]]]]:
+        async def insert_batch(rows: list[dict]) -> tuple[int, Sequence[TModel]]:
+            query = build_statement(rows)
+            if not returning:
+                res = await self.session.execute(query)
+                return res.rowcount, ()
+            res = await self.session.execute(
+                query.returning(self.model),
+                execution_options={"populate_existing": True},
+            )
+            items = res.scalars().all()
+            return len(items), items
+
+        return insert_batch
+
+    async def _copy_batch(self, rows: list[dict]) -> tuple[int, Sequence[TModel]]:
+        connection = await self.session.connection()
+        driver_connection = (await connection.get_raw_connection()).driver_connection
+        columns = list(rows[0])
+        records = [tuple(self._to_copy_value(row[column]) for column in columns) for row in rows]
+        await driver_connection.copy_records_to_table(
+            self.model.__table__.name,
+            records=records,
+            columns=columns,
+            schema_name=self.model.__table__.schema,
+        )
+        return len(records), ()
+
+    @staticmethod
+    def _to_copy_value(value: object) -> object:
+        # COPY bypasses the SQLAlchemy types, so the enums are passed by their database values
+        return value.value if isinstance(value, Enum) else value
+
+    async def _count(self, query: Select, count_strategy: CountStrategyEnum) -> tuple[int | None, bool]:
+        """
+        :return: Total number of the rows, None if it isn't counted, and whether the number is exact.
+        """
+        if count_strategy == CountStrategyEnum.NONE:
+            return None, False
+
+        if count_strategy == CountStrategyEnum.CACHED:
+            fingerprint = get_query_fingerprint(query)
+            if (count := self.count_cache.get(fingerprint)) is not None:
+                return count, False  # Might be outdated by up to the cache TTL
+            count = await self._count_exact(query)
+            self.count_cache.set(fingerprint, count)
+            return count, True
+
+        if count_strategy == CountStrategyEnum.ESTIMATED:
+            estimate = await self._count_estimated(query)
+            if estimate >= postgres_config.COUNT_ESTIMATE_THRESHOLD:
+                return estimate, False
+
+        return await self._count_exact(query), True
+
+    async def _count_exact(self, query: Select) -> int:
+        # Counting over a subquery, so queries with DISTINCT or GROUP BY are counted right
+        res = await self.session.execute(select(func.count()).select_from(query.order_by(None).subquery()))
+        return res.scalar() or 0
+
+    async def _count_estimated(self, query: Select) -> int:
+        """
+        :return: Number of the rows estimated by the planner, as accurate as the table statistics are.
+        """
+        res = await self.session.execute(Explain(query.order_by(None)))
+        plan = res.scalar()
+        if isinstance(plan, str):  # The driver may not decode JSON values
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+
+    def _get_keyset(self, order_by: Sequence[ColumnElement]) -> list[tuple[ColumnElement, bool]]:
+        """
+        :return: Key columns along with whether they are in the descending order.
+        """
+        keyset = []
+        for column in order_by:
+            if isinstance(column, UnaryExpression) and column.modifier in (operators.asc_op, operators.desc_op):
+                keyset.append((column.element, column.modifier is operators.desc_op))
+            else:
+                keyset.append((column, False))
+        pk_attr = self._get_pk_attr()
+        if all(column.key != pk_attr.key for column, _ in keyset):
+            keyset.append((pk_attr, False))
+        return keyset
+
+    @staticmethod
+    def _validate_cursor_values(keyset: list[tuple[ColumnElement, bool]], values: list) -> list:
+        if len(values) != len(keyset):
+            msg = "Cursor doesn't match the key columns"
+            raise ValueError(msg)
+        # Converting the JSON values back, e.g. to datetimes, so they are bound with the types of the columns
+        converted_values = []
+        for (column, _), value in zip(keyset, values, strict=True):
+            try:
+                python_type = column.type.python_type
+            except NotImplementedError:  # Types without a Python counterpart are bound as they are
+                converted_values.append(value)
+                continue
+            converted_values.append(TypeAdapter(python_type).validate_python(value))
+        return converted_values
+
+    @staticmethod
+    def _build_keyset_condition(
+        keyset: list[tuple[ColumnElement, bool]],
+        values: list,
+        backward: bool,
+    ) -> ColumnElement:
+        columns = [column for column, _ in keyset]
+        bound_values = [literal(value, column.type) for column, value in zip(columns, values, strict=True)]
+        directions = {descending for _, descending in keyset}
+        if len(directions) == 1:
+            # A row value comparison is matched against a composite index directly
+            after = directions.pop() == backward
+            return tuple_(*columns) > tuple_(*bound_values) if after else tuple_(*columns) < tuple_(*bound_values)
+
+        # Mixed directions can't be compared as a row value: (a > x) OR (a = x AND b < y) OR ...
+        conditions = []
+        for i, (column, descending) in enumerate(keyset):
+            after = descending == backward
+            equal_prefix = [columns[j] == bound_values[j] for j in range(i)]
+            conditions.append(and_(*equal_prefix, column > bound_values[i] if after else column < bound_values[i]))
+        return or_(*conditions)
+
+    @staticmethod
+    def _get_cursor(keyset: list[tuple[ColumnElement, bool]], row: object, direction: CursorDirectionEnum) -> str:
+        if isinstance(row, Mapping):
+            values = [row[column.key] for column, _ in keyset]
+        else:
+            values = [getattr(row, column.key) for column, _ in keyset]
+        return encode_cursor(values, direction)
 
-    def _get_pk_attr(self) -> str:
-        return getattr(self.model.__table__.c, self.model.pk_name())
+    def _get_pk_attr(self) -> ColumnElement:
+        return self.statements.pk_attr
 
     def _check_object(self, obj: TModel) -> bool | HTTPException:
         if not obj:
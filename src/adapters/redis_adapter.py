@@ -1,26 +1,126 @@
 import logging
+import secrets
+import time
+from collections.abc import Sequence
 from datetime import timedelta
 
 from redis import RedisError
 from redis.asyncio import Redis
 
 from src.core.config import redis_config
+from src.core.metrics import RESPONSE_CACHE_BYTES
+from src.utils.codecs import Codec, get_codec
 from src.utils.exception_decorator import catch_exceptions
-from src.utils.json_serialization import deserialize_json, serialize_json
+from src.utils.lru_ttl_cache import LRUTTLCache
 
 logger = logging.getLogger(__name__)
 
+# Deleting the lock only if it's still owned by the caller, so an expired lock taken over by another worker is kept
+RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+# Reading the metadata along with the first stored body out of the requested fields and the remaining TTL of the
+# entry in ms in a single round trip
+GET_CACHE_SCRIPT = """
+local metadata = redis.call("hget", KEYS[1], "metadata")
+if not metadata then
+    return nil
+end
+for _, field in ipairs(ARGV) do
+    local content = redis.call("hget", KEYS[1], field)
+    if content then
+        return {metadata, field, content, redis.call("pttl", KEYS[1])}
+    end
+end
+return nil
+"""
+
 
 class RedisRequestCachingService:
     prefix = "request-cache:"
+    lock_prefix = "request-cache-lock:"
+    # Sorted sets of the keys scored by their expiration time, renamed from the plain sets of the earlier releases so
+    # they aren't written to with WRONGTYPE errors until they expire
+    tag_prefix = "request-cache-tags:"
 
-    def __init__(self, redis: Redis) -> None:
+    def __init__(
+        self,
+        redis: Redis,
+        local_cache: LRUTTLCache | None = None,
+        batch_size: int = redis_config.INVALIDATION_BATCH_SIZE,
+        codec: Codec | None = None,
+    ) -> None:
+        """
+        :param redis: Binary-safe Redis client, i.e. not decoding the responses.
+        :param local_cache: Optional in-process cache tier checked before Redis and filled on Redis hits. Its keys
+        are hashed, so the invalidations clear it as a whole. Only the tier of the invalidating worker is cleared, the
+        other workers may serve the invalidated entries until their local TTL expires.
+        :param batch_size: Number of keys deleted per pipeline when invalidating the cache.
+        :param codec: Codec of the response metadata, the bodies are stored as they are.
+        """
         self.redis = redis
+        self.local_cache = local_cache
+        self.batch_size = batch_size
+        self.codec = codec or get_codec(redis_config.CACHE_CODEC)
+        self.get_cache_script = redis.register_script(GET_CACHE_SCRIPT)
 
-    @catch_exceptions((RedisError,))
-    async def get_cache(self, key: str) -> dict | None:
-        if response := await self.redis.get(self.prefix + key):
-            return deserialize_json(response)
+    # Entries stored with another codec fail to decode with ValueError, they are treated as misses and overwritten
+    @catch_exceptions((RedisError, ValueError))
+    async def get_cache(self, key: str, encodings: Sequence[str] = ()) -> dict | None:
+        """
+        :param key: Cache key.
+        :param encodings: Content encodings acceptable by the client, the most preferred first.
+        :return: Cached response metadata along with its body under the "content" key. Out of the compressed body
+        variants, only the most preferred stored one is loaded under the "variants" key, the identity body is loaded
+        only if there is no such variant.
+        """
+        if (response := self._get_local_cache(key, encodings)) is not None:
+            return response
+
+        fields = [*(f"content:{encoding}" for encoding in encodings), "content"]
+        if not (result := await self.get_cache_script(keys=[self.prefix + key], args=fields)):
+            return None
+
+        metadata, field, content, ttl = result
+        RESPONSE_CACHE_BYTES.labels("read", "redis").inc(len(metadata) + len(content))
+        response = self.codec.decode(metadata)
+        _, _, encoding = field.decode().partition(":")
+        response["content"] = None if encoding else content
+        response["variants"] = {encoding: content} if encoding else {}
+        if self.local_cache is not None:
+            # The local entry never outlives the Redis one, whose TTL may be shorter than the local one per route
+            expire = timedelta(milliseconds=ttl) if ttl > 0 else None
+            self.local_cache.set(key, response, size=len(metadata) + len(content), ttl=expire)
+        return response
+
+    def _get_local_cache(self, key: str, encodings: Sequence[str]) -> dict | None:
+        if self.local_cache is None:
+            return None
+
+        def get_body(response: dict) -> bytes | None:
+            # The entry may have been filled from Redis with a single compressed variant the client doesn't accept
+            encoding = next((encoding for encoding in encodings if encoding in response["variants"]), None)
+            return response["variants"][encoding] if encoding else response["content"]
+
+        if (response := self.local_cache.get(key, is_usable=lambda response: get_body(response) is not None)) is None:
+            return None
+        RESPONSE_CACHE_BYTES.labels("read", "local").inc(len(get_body(response)))
+        return response
+
+    @catch_exceptions((RedisError, ValueError))
+    async def get_cache_metadata(self, key: str) -> dict | None:
+        """
+        :return: Cached response metadata (status, headers, ETag...) without loading its body from Redis.
+        """
+        if self.local_cache is not None and (response := self.local_cache.get(key)) is not None:
+            return response
+
+        if metadata := await self.redis.hget(self.prefix + key, "metadata"):
+            return self.codec.decode(metadata)
         return None
 
     @catch_exceptions((RedisError, TypeError))
@@ -29,11 +129,196 @@ class RedisRequestCachingService:
         key: str,
         response: dict,
         expire: timedelta = redis_config.CACHE_TTL,
+        tags: Sequence[str] = (),
     ) -> None:
-        await self.redis.setex(self.prefix + key, expire, serialize_json(response))
+        """
+        Stores the response and registers its key under the invalidation tags.
+
+        The response is kept as a hash with the metadata, the body and each of its compressed variants stored in
+        separate fields, so the metadata can be read without the body and only the needed variant is loaded.
+        :param key: Cache key.
+        :param response: Response metadata along with its raw body under the "content" key and compressed variants of
+        the body by encoding under the "variants" key.
+        :param expire: Response TTL.
+        :param tags: Invalidation tags, e.g. route, resource type or user id.
+        """
+        metadata = self.codec.encode(
+            {name: value for name, value in response.items() if name not in ("content", "variants")},
+        )
+        now = time.time()
+        bodies = {
+            "content": response["content"],
+            **{f"content:{encoding}": content for encoding, content in response["variants"].items()},
+        }
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.unlink(self.prefix + key)
+            pipe.hset(self.prefix + key, mapping={"metadata": metadata, **bodies})
+            pipe.expire(self.prefix + key, expire)
+            for tag in tags:
+                # Pruning the keys already expired, so the tag holds only the live entries
+                pipe.zremrangebyscore(self.tag_prefix + tag, "-inf", now)
+                pipe.zadd(self.tag_prefix + tag, {key: now + expire.total_seconds()})
+                # The tag lives as long as its longest-living entry: setting the TTL of a new tag, extending otherwise
+                pipe.expire(self.tag_prefix + tag, expire, nx=True)
+                pipe.expire(self.tag_prefix + tag, expire, gt=True)
+            await pipe.execute()
+        size = len(metadata) + sum(map(len, bodies.values()))
+        RESPONSE_CACHE_BYTES.labels("written", "redis").inc(size)
+        if self.local_cache is not None:
+            self.local_cache.set(key, response, size=size, ttl=expire)
+
+    @catch_exceptions((RedisError,))
+    async def invalidate_tags(self, *tags: str) -> int:
+        """
+        Removes all the entries registered under any of the tags, in batches of pipelined deletes. Only the scanned
+        keys are removed from the tags, the ones registered meanwhile are kept along with their entries.
+        :return: Number of removed entries.
+        """
+        if self.local_cache is not None:
+            self.local_cache.clear()
+
+        removed = 0
+        for tag in tags:
+            tag_key = self.tag_prefix + tag
+            batch = []
+            async for key, _ in self.redis.zscan_iter(tag_key, count=self.batch_size):
+                batch.append(key.decode())
+                if len(batch) >= self.batch_size:
+                    removed += await self._remove_tagged_batch(tag_key, batch)
+                    batch = []
+            if batch:
+                removed += await self._remove_tagged_batch(tag_key, batch)
+        logger.info("Invalidated cache tags", extra={"tags": tags, "removed": removed})
+        return removed
+
+    async def _remove_tagged_batch(self, tag_key: str, keys: list[str]) -> int:
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.unlink(*(self.prefix + key for key in keys))
+            pipe.zrem(tag_key, *keys)
+            removed, _ = await pipe.execute()
+        return removed
 
     @catch_exceptions((RedisError,))
     async def remove_all_cache(self, key_substring: str) -> None:
-        keys = await self.redis.keys(f"*{key_substring}*")
-        if len(keys):
-            await self.redis.delete(*keys)
+        """
+        Removes all the keys containing the substring. Iterates the keyspace incrementally with SCAN, so Redis isn't
+        blocked, yet it's still proportional to the whole keyspace: prefer invalidate_tags, this one is meant for
+        cleaning up legacy keys not registered under any tag.
+        """
+        if self.local_cache is not None:
+            self.local_cache.clear()
+
+        batch = []
+        async for key in self.redis.scan_iter(match=f"*{key_substring}*", count=self.batch_size):
+            batch.append(key)
+            if len(batch) >= self.batch_size:
+                await self.redis.unlink(*batch)
+                batch = []
+        if batch:
+            await self.redis.unlink(*batch)
+
+    async def acquire_lock(self, key: str, ttl: timedelta) -> str | None:
+        """
+        Tries to acquire a short lock for computing the response with the key across workers.
+        :param key: Cache key.
+        :param ttl: Lock TTL, the lock is released automatically after it.
+        :return: Lock token if the lock has been acquired or Redis is unavailable, None if the lock is held by another
+        worker.
+        """
+        token = secrets.token_hex(16)
+        try:
+            acquired = await self.redis.set(self.lock_prefix + key, token, nx=True, px=ttl)
+        except RedisError as e:
+            logger.exception("Failed to acquire the lock, proceeding without it", extra={"e": e, "key": key})
+            return token
+        return token if acquired else None
+
+    @catch_exceptions((RedisError,))
+    async def release_lock(self, key: str, token: str) -> None:
+        await self.redis.eval(RELEASE_LOCK_SCRIPT, 1, self.lock_prefix + key, token)
+
+
+class RedisHTTPCachingService:
+    """
+    Shared storage of the outbound HTTP cache, see HTTPCache.
+    """
+
+    prefix = "http-cache:"
+
+    def __init__(self, redis: Redis, codec: Codec | None = None) -> None:
+        """
+        :param redis: Binary-safe Redis client, i.e. not decoding the responses.
+        :param codec: Codec of the response metadata, the bodies are stored as they are.
+        """
+        self.redis = redis
+        self.codec = codec or get_codec(redis_config.CACHE_CODEC)
+
+    @catch_exceptions((RedisError, ValueError))
+    async def get(self, key: str) -> dict | None:
+        metadata, content = await self.redis.hmget(self.prefix + key, ["metadata", "content"])
+        if metadata is None or content is None:
+            return None
+        return {**self.codec.decode(metadata), "content": content}
+
+    @catch_exceptions((RedisError, TypeError))
+    async def set(self, key: str, entry: dict, expire: timedelta) -> None:
+        metadata = self.codec.encode({name: value for name, value in entry.items() if name != "content"})
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.hset(self.prefix + key, mapping={"metadata": metadata, "content": entry["content"]})
+            pipe.expire(self.prefix + key, expire)
+            await pipe.execute()
+
+
+class RedisTokenCachingService:
+    """
+    Shared tier of the verified JWT claims cache and the denylist of revoked tokens.
+
+    Tokens are identified by their digest, so the tokens themselves never end up in Redis.
+    """
+
+    claims_prefix = "jwt-claims:"
+    denylist_prefix = "jwt-denylist:"
+
+    def __init__(self, redis: Redis, codec: Codec | None = None) -> None:
+        """
+        :param redis: Binary-safe Redis client, i.e. not decoding the responses.
+        :param codec: Codec of the stored claims.
+        """
+        self.redis = redis
+        self.codec = codec or get_codec(redis_config.CACHE_CODEC)
+
+    @catch_exceptions((RedisError, ValueError))
+    async def get_claims(self, digest: str, check_denylist: bool = True) -> tuple[bool, dict | None]:
+        """
+        Reads the cached claims of the token along with its denylist entry in a single round trip.
+        :param digest: Token digest.
+        :param check_denylist: Whether to check the denylist as well.
+        :return: Whether the token is revoked and its verified claims, None if they aren't cached.
+        """
+        async with self.redis.pipeline(transaction=False) as pipe:
+            if check_denylist:
+                pipe.exists(self.denylist_prefix + digest)
+            pipe.get(self.claims_prefix + digest)
+            *revoked, claims = await pipe.execute()
+        return bool(revoked and revoked[0]), self.codec.decode(claims) if claims else None
+
+    @catch_exceptions((RedisError,))
+    async def set_claims(self, digest: str, claims: dict, expire: timedelta) -> None:
+        await self.redis.set(self.claims_prefix + digest, self.codec.encode(claims), px=expire)
+
+    @catch_exceptions((RedisError,))
+    async def is_revoked(self, digest: str) -> bool | None:
+        return bool(await self.redis.exists(self.denylist_prefix + digest))
+
+    @catch_exceptions((RedisError,))
+    async def revoke(self, digest: str, expire: timedelta | None = None) -> None:
+        """
+        Adds the token to the denylist and drops its cached claims.
+        :param digest: Token digest.
+        :param expire: TTL of the denylist entry, the token is rejected as expired after it anyway. Kept for good if
+        not set.
+        """
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.set(self.denylist_prefix + digest, b"1", px=expire)
+            pipe.unlink(self.claims_prefix + digest)
+            await pipe.execute()
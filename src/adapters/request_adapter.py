@@ -1,22 +1,97 @@
+import asyncio
 import logging
+import random
+import time
+from collections import defaultdict
+from collections.abc import Awaitable, Callable, Sequence
+from functools import partial
+from typing import Any, NamedTuple
 
-from httpx import AsyncClient, Response, codes
+from httpx import URL, USE_CLIENT_DEFAULT, AsyncClient, Response, Timeout, TransportError, codes
 
 from src.adapters.enums.http_method_enum import HTTPMethodEnum
+from src.core.config import http_client_config
 from src.core.exceptions import ClientError, ServerError
+from src.core.metrics import OUTBOUND_REQUEST_DURATION
+from src.dependencies.http_client_dependency import get_http_cache, get_http_client
+from src.utils.circuit_breaker import CircuitBreaker
+from src.utils.http_cache import HTTPCache
+from src.utils.latency_tracker import LatencyTracker
+from src.utils.retry_budget import RetryBudget
 
 logger = logging.getLogger(__name__)
 
+HEDGE_QUANTILE = 0.95
+IDEMPOTENT_METHODS = frozenset(
+    (HTTPMethodEnum.GET, HTTPMethodEnum.HEAD, HTTPMethodEnum.OPTIONS, HTTPMethodEnum.PUT, HTTPMethodEnum.DELETE),
+)
+# Statuses telling the request hasn't been processed and can be retried
+RETRYABLE_STATUS_CODES = frozenset((codes.BAD_GATEWAY, codes.SERVICE_UNAVAILABLE, codes.GATEWAY_TIMEOUT))
+
+
+class RequestSpec(NamedTuple):
+    url: str
+    method: HTTPMethodEnum = HTTPMethodEnum.GET
+    headers: dict | None = None
+    data: dict | None = None
+    params: dict | None = None
+    timeout: float | Timeout | None = USE_CLIENT_DEFAULT
+
+
+class RequestResult(NamedTuple):
+    response: Response | None = None
+    error: Exception | None = None
+
 
 class RequestService:
-    @staticmethod
+    # Shared by the outbound requests so the connections are reused, opened and closed by the application lifespan
+    client: AsyncClient | None = None
+    # Latencies by the host, the hedged requests are duplicated after the p95 one
+    latency_tracker = LatencyTracker(
+        window=http_client_config.LATENCY_WINDOW,
+        min_samples=http_client_config.HEDGE_MIN_SAMPLES,
+    )
+    http_cache: HTTPCache | None = get_http_cache()
+    # Circuit breakers and retry budgets by the host
+    circuit_breakers: dict[str, CircuitBreaker] = {}
+    retry_budgets: defaultdict[str, RetryBudget] = defaultdict(
+        lambda: RetryBudget(
+            ratio=http_client_config.RETRY_BUDGET_RATIO,
+            min_retries=http_client_config.RETRY_BUDGET_MIN_RETRIES,
+            window=http_client_config.RETRY_BUDGET_WINDOW,
+        ),
+    )
+
+    @classmethod
+    def start(cls) -> None:
+        cls.client = get_http_client()
+
+    @classmethod
+    async def close(cls) -> None:
+        if cls.client is not None:
+            await cls.client.aclose()
+            cls.client = None
+
+    @classmethod
+    def get_client(cls) -> AsyncClient:
+        # Outside the application, e.g. in scripts, the client is opened on the first request
+        if cls.client is None or cls.client.is_closed:
+            cls.start()
+        return cls.client
+
+    @classmethod
     async def make_request(
+        cls,
         url: str,
         headers: dict | None = None,
         data: dict | None = None,
         method: HTTPMethodEnum = HTTPMethodEnum.GET,
         params: dict | None = None,
         raise_for_status: bool = True,
+        timeout: float | Timeout | None = USE_CLIENT_DEFAULT,  # noqa: ASYNC109, handed over to httpx
+        hedge: bool = False,
+        use_cache: bool = True,
+        max_retries: int = http_client_config.MAX_RETRIES,
     ) -> Response:
         """
         Method for executing HTTP requests with specified URI.
@@ -26,26 +101,186 @@ class RequestService:
         :param method: HTTP method.
         :param params: Query params to pass within a request.
         :param raise_for_status: Flag indicating whether to raise exception in case URI returned any error code.
+        :param timeout: Timeout of the request in seconds, or per phase, the client one by default. None disables it.
+        :param hedge: Whether to send a duplicate of a GET request taking longer than the p95 latency of the host,
+        the first response wins. Ignored for the other methods.
+        :param use_cache: Whether a GET request may be served from the HTTP cache, if it's enabled.
+        :param max_retries: Retries of a request failing with a connection error, a timeout or a 502/503/504 status,
+        for the idempotent methods only and within the retry budget of the host.
         :return: Response from URI.
         """
         logger.info(
             "Sending external HTTP request",
             extra={"method": method, "url": url, "data": data, "params": params},
         )
-        async with AsyncClient() as client:
-            match method:
-                case HTTPMethodEnum.GET:
-                    response = await client.get(url=url, headers=headers, params=params)
-                case HTTPMethodEnum.POST:
-                    response = await client.post(url=url, json=data, headers=headers, params=params)
-                case HTTPMethodEnum.PUT:
-                    response = await client.put(url=url, json=data, headers=headers, params=params)
-                case HTTPMethodEnum.DELETE:
-                    response = await client.delete(url=url, headers=headers, params=params)
+        method = HTTPMethodEnum(method)
+        host = URL(url).host
+
+        async def send(extra_headers: dict[str, str] | None = None) -> Response:
+            request_headers = {**(headers or {}), **extra_headers} if extra_headers else headers
+            send_once = partial(
+                cls._send,
+                host,
+                method,
+                url,
+                max_retries,
+                json=data,
+                headers=request_headers,
+                params=params,
+                timeout=timeout,
+            )
+            if hedge and method == HTTPMethodEnum.GET:
+                return await cls._send_hedged(host, send_once)
+            return await send_once()
+
+        if use_cache and cls.http_cache is not None and method == HTTPMethodEnum.GET:
+            response = await cls.http_cache.fetch(cls.http_cache.build_key(url, params, headers), url, send)
+        else:
+            response = await send()
         if raise_for_status:
             RequestService.raise_for_status(status_code=response.status_code, response_text=response.text)
         return response
 
+    @classmethod
+    async def make_requests(
+        cls,
+        specs: Sequence[RequestSpec],
+        deadline: float | None = None,
+        max_concurrency_per_host: int = http_client_config.MAX_CONCURRENCY_PER_HOST,
+        raise_for_status: bool = True,
+        hedge: bool = False,
+    ) -> list[RequestResult]:
+        """
+        Sends the requests concurrently, a failed request doesn't affect the others.
+        :param specs: Requests to send.
+        :param deadline: Time in seconds the whole batch may take, the requests still running then are cancelled and
+        reported with a TimeoutError.
+        :param max_concurrency_per_host: Number of the requests running at once against a single host.
+        :param raise_for_status: Whether error status codes are reported as errors.
+        :param hedge: Whether to hedge the GET requests, see make_request.
+        :return: Response or error of each request, in the order of the specs.
+        """
+        semaphores = defaultdict(lambda: asyncio.Semaphore(max_concurrency_per_host))
+
+        async def send(spec: RequestSpec) -> Response:
+            async with semaphores[URL(spec.url).host]:
+                return await cls.make_request(**spec._asdict(), raise_for_status=raise_for_status, hedge=hedge)
+
+        tasks = [asyncio.create_task(send(spec)) for spec in specs]
+        if not tasks:
+            return []
+        _, pending = await asyncio.wait(tasks, timeout=deadline)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+        results = []
+        for task in tasks:
+            if task in pending:
+                results.append(RequestResult(error=TimeoutError("The batch deadline was exceeded")))
+            elif (error := task.exception()) is not None:
+                results.append(RequestResult(error=error))
+            else:
+                results.append(RequestResult(response=task.result()))
+        return results
+
+    @classmethod
+    async def _send(cls, host: str, method: HTTPMethodEnum, url: str, max_retries: int, **kwargs: Any) -> Response:
+        """
+        Sends the request through the circuit breaker of the host, retrying the idempotent requests within the retry
+        budget of the host.
+        """
+        retry_budget = cls.retry_budgets[host]
+        retry_budget.record_request()
+        attempt = 0
+        while True:
+            try:
+                response = await cls._send_once(host, method, url, **kwargs)
+            except TransportError:
+                if not cls._can_retry(method, attempt, max_retries, retry_budget):
+                    raise
+            else:
+                retryable = response.status_code in RETRYABLE_STATUS_CODES
+                if not retryable or not cls._can_retry(method, attempt, max_retries, retry_budget):
+                    return response
+            # Full jitter, so the retries of the concurrent requests don't hit the host at once
+            backoff = min(http_client_config.RETRY_BACKOFF_MAX, http_client_config.RETRY_BACKOFF_BASE * 2**attempt)
+            await asyncio.sleep(random.uniform(0, backoff))  # noqa: S311
+            attempt += 1
+
+    @classmethod
+    async def _send_once(cls, host: str, method: HTTPMethodEnum, url: str, **kwargs: Any) -> Response:
+        circuit_breaker = cls.get_circuit_breaker(host)
+        if circuit_breaker is not None and not circuit_breaker.acquire():
+            logger.error("The circuit is open, rejecting the request", extra={"host": host, "url": url})
+            raise ServerError(
+                status_code=codes.SERVICE_UNAVAILABLE,
+                content={"message": "External service unavailable!", "metadata": host},
+            )
+
+        started_at = time.perf_counter()
+        try:
+            response = await cls.get_client().request(method.value.upper(), url, **kwargs)
+        except TransportError:
+            OUTBOUND_REQUEST_DURATION.labels(host, method.value, 0).observe(time.perf_counter() - started_at)
+            if circuit_breaker is not None:
+                circuit_breaker.record(success=False)
+            raise
+        except BaseException:  # Cancelled, e.g. a hedged attempt which lost
+            if circuit_breaker is not None:
+                circuit_breaker.release()
+            raise
+        latency = time.perf_counter() - started_at
+        cls.latency_tracker.observe(host, latency)
+        OUTBOUND_REQUEST_DURATION.labels(host, method.value, response.status_code).observe(latency)
+        if circuit_breaker is not None:
+            circuit_breaker.record(success=not cls._is_host_failure(response.status_code))
+        return response
+
+    @staticmethod
+    def _is_host_failure(status_code: int) -> bool:
+        # Server errors and throttling trip the circuit of the host, the other client errors are the caller's
+        return status_code >= codes.INTERNAL_SERVER_ERROR or status_code == codes.TOO_MANY_REQUESTS
+
+    @staticmethod
+    def _can_retry(method: HTTPMethodEnum, attempt: int, max_retries: int, retry_budget: RetryBudget) -> bool:
+        return method in IDEMPOTENT_METHODS and attempt < max_retries and retry_budget.try_retry()
+
+    @classmethod
+    def get_circuit_breaker(cls, host: str) -> CircuitBreaker | None:
+        if not http_client_config.CIRCUIT_BREAKER_ENABLED:
+            return None
+        if (circuit_breaker := cls.circuit_breakers.get(host)) is None:
+            circuit_breaker = cls.circuit_breakers[host] = CircuitBreaker(
+                failure_rate_threshold=http_client_config.CIRCUIT_BREAKER_FAILURE_RATE,
+                window=http_client_config.CIRCUIT_BREAKER_WINDOW,
+                min_calls=http_client_config.CIRCUIT_BREAKER_MIN_CALLS,
+                open_duration=http_client_config.CIRCUIT_BREAKER_OPEN_DURATION,
+                half_open_max_calls=http_client_config.CIRCUIT_BREAKER_HALF_OPEN_CALLS,
+            )
+        return circuit_breaker
+
+    @classmethod
+    async def _send_hedged(cls, host: str, send: Callable[[], Awaitable[Response]]) -> Response:
+        delay = cls.latency_tracker.quantile(host, HEDGE_QUANTILE) or http_client_config.HEDGE_DELAY
+        attempts = {asyncio.ensure_future(send())}
+        try:
+            done, _ = await asyncio.wait(attempts, timeout=delay)
+            if not done:
+                attempts.add(asyncio.ensure_future(send()))
+            while True:
+                done, pending = await asyncio.wait(attempts, return_when=asyncio.FIRST_COMPLETED)
+                # A failed attempt loses to the one still running
+                succeeded = next((attempt for attempt in done if attempt.exception() is None), None)
+                if succeeded is not None or not pending:
+                    return (succeeded or done.pop()).result()
+                attempts = pending
+        finally:
+            for attempt in attempts:
+                attempt.cancel()
+            # Waiting for the cancelled attempts to wind down, so they don't outlive the request
+            await asyncio.gather(*attempts, return_exceptions=True)
+
     @staticmethod
     def raise_for_status(status_code: int, response_text: str) -> None:
         """
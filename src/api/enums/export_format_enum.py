@@ -0,0 +1,6 @@
+from src.core.enums.base_enum import BaseEnum
+
+
+class ExportFormatEnum(BaseEnum):
+    NDJSON = "ndjson"  # A JSON object per line
+    CSV = "csv"
@@ -0,0 +1,16 @@
+from fastapi import APIRouter, Response
+
+from src.core.metrics import generate_metrics
+from src.utils.cache_policy import cache_policy
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics", include_in_schema=False)
+@cache_policy(enabled=False)
+async def get_metrics() -> Response:
+    """
+    Metrics in the Prometheus text format, aggregated over the workers.
+    """
+    content, media_type = generate_metrics()
+    return Response(content=content, media_type=media_type)
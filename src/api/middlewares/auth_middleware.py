@@ -1,52 +1,75 @@
 import logging
-from collections.abc import Callable
-from typing import TYPE_CHECKING
+from collections.abc import Callable, Iterable
 
-from fastapi import Request as FastAPIRequest
-from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from fastapi.security.utils import get_authorization_scheme_param
 from starlette import status
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.responses import Response
-from starlette.types import ASGIApp
+from starlette.requests import Request
+from starlette.types import ASGIApp, Receive, Scope, Send
 from starlette_context import context
 
 from src.core.config import general_config
 from src.core.exceptions import AuthenticationError
 from src.services.auth_service import AuthService
-
-if TYPE_CHECKING:
-    from starlette.requests import Request
+from src.utils.route_matcher import RouteMatcher
 
 logger = logging.getLogger(__name__)
 
 
-class AuthenticationMiddleware(BaseHTTPMiddleware):
-    auth_scheme = HTTPBearer(auto_error=False)
+class AuthenticationMiddleware:
+    """
+    Pure ASGI middleware authenticating the requests with the bearer token of the Authorization header.
+
+    Requests to the anonymous endpoints skip the authentication entirely, the endpoints are matched with a matcher
+    compiled once, see RouteMatcher for the supported rules.
+    """
 
-    def __init__(self, on_error: Callable, app: ASGIApp) -> None:
+    def __init__(
+        self,
+        app: ASGIApp,
+        on_error: Callable,
+        anonymous_endpoints: Iterable[str] = general_config.ANONYMOUS_ENDPOINTS,
+    ) -> None:
+        """
+        :param app: ASGI application.
+        :param on_error: Callable building the response to an AuthenticationError out of the request and the error.
+        :param anonymous_endpoints: Exact paths, prefixes and patterns of the endpoints not requiring authentication.
+        """
+        self.app = app
         self.on_error = on_error
-        super().__init__(app)
+        self.anonymous_endpoints = RouteMatcher(anonymous_endpoints)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or self.anonymous_endpoints.matches(scope["path"]):
+            await self.app(scope, receive, send)
+            return
 
-    async def dispatch(self, request: FastAPIRequest, call_next: Callable) -> Response:
-        authorization: HTTPAuthorizationCredentials | None = await self.auth_scheme(request)
-        if request.url.path in general_config.ANONYMOUS_ENDPOINTS:
-            return await call_next(request)
+        request = Request(scope, receive)
         try:
-            if authorization:
-                user_info = AuthService.decode_token(token=authorization.credentials)
-
-                # Setting a global context that will be accessible across the app
-                context["request"] = request
-                context["user_info"] = user_info
-                context["access_token"] = authorization.credentials
-                logger.info("The user has been successfully authenticated", extra={"user": user_info})
-                return await call_next(request)
-            else:
+            credentials = self._get_bearer_credentials(scope)
+            if not credentials:
                 logger.error("Authorization failed! No token")
                 raise AuthenticationError(
                     status_code=status.HTTP_401_UNAUTHORIZED,
                     content={"message": "No Token"},
                 )
+            user_info = await AuthService.decode_token(token=credentials)
         except AuthenticationError as e:
             logger.exception("Got error while authenticating the user", extra={"e": e})
-            return self.on_error(request=request, exc=e)
+            response = self.on_error(request=request, exc=e)
+            await response(scope, receive, send)
+            return
+
+        # Setting a global context that will be accessible across the app
+        context["request"] = request
+        context["user_info"] = user_info
+        context["access_token"] = credentials
+        logger.info("The user has been successfully authenticated", extra={"user": user_info})
+        await self.app(scope, receive, send)
+
+    @staticmethod
+    def _get_bearer_credentials(scope: Scope) -> str | None:
+        authorization = next((value for name, value in scope["headers"] if name == b"authorization"), None)
+        if authorization is None:
+            return None
+        scheme, credentials = get_authorization_scheme_param(authorization.decode("latin-1"))
+        return credentials if scheme.lower() == "bearer" and credentials else None
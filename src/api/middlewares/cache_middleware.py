@@ -1,69 +1,539 @@
+import asyncio
+import hashlib
 import logging
-from collections.abc import Callable
+import time
+from collections.abc import Collection
 from datetime import timedelta
+from typing import NamedTuple
 
-from fastapi import FastAPI, Request
-from fastapi.security import HTTPBearer
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.responses import Response
-from starlette.status import HTTP_200_OK
+from fastapi.security.utils import get_authorization_scheme_param
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.status import HTTP_200_OK, HTTP_304_NOT_MODIFIED, HTTP_503_SERVICE_UNAVAILABLE
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from src.adapters.enums.http_method_enum import HTTPMethodEnum
 from src.adapters.redis_adapter import RedisRequestCachingService
-from src.core.config import redis_config
+from src.api.middlewares.enums.cache_scope_enum import CacheScopeEnum
+from src.api.middlewares.enums.coalescing_fallback_enum import CoalescingFallbackEnum
+from src.core.config import jwt_config, redis_config
+from src.core.metrics import RESPONSE_CACHE_REQUESTS
+from src.utils.cache_key import build_cache_key
+from src.utils.cache_policy import (
+    CachePolicy,
+    get_cache_policy,
+    resolve_route,
+    resource_tag,
+    route_tag,
+    user_tag,
+)
+from src.utils.compression import compress, is_compressible, parse_accept_encoding
+from src.utils.etag import compute_etag, encoded_etag, etag_matches
+from src.utils.lru_ttl_cache import LRUTTLCache
+from src.utils.request_context import get_user_info
+from src.utils.single_flight import SingleFlight
 
 logger = logging.getLogger(__name__)
 
+# Headers a 304 Not Modified response carries over from the full response, as listed in RFC 9110
+NOT_MODIFIED_HEADERS = frozenset((b"cache-control", b"content-location", b"date", b"etag", b"expires", b"vary"))
 
-class CacheMiddleware(BaseHTTPMiddleware):
-    auth_scheme = HTTPBearer(auto_error=False)
+
+class CacheRequest(NamedTuple):
+    key: str
+    policy: CachePolicy
+    tags: list[str]
+    if_none_match: str | None
+    encodings: list[str]
+    extra: dict
+
+
+class ResponseRecorder:
+    """
+    Send wrapper forwarding the response to the client while recording it.
+
+    The start message is held back until the first body chunk, so a successful single-chunk response gets a strong
+    ETag computed from its body and is answered with 304 Not Modified if the client already has it.
+
+    A body growing over the max body size stops being recorded and is only forwarded, so big responses aren't held in
+    memory and aren't cached.
+    """
+
+    def __init__(
+        self,
+        send: Send,
+        if_none_match: str | None,
+        record_body: bool = False,
+        extra_headers: tuple[tuple[bytes, bytes], ...] = (),
+        max_body_size: int = 0,
+    ) -> None:
+        """
+        :param send: ASGI send callable of the client.
+        :param if_none_match: If-None-Match header of the request.
+        :param record_body: Whether to keep the body of a successful response.
+        :param extra_headers: Headers added to a successful response sent to the client while its body is recorded,
+        not recorded.
+        :param max_body_size: Number of bytes above which the body isn't recorded anymore, no limit if 0.
+        """
+        self.send = send
+        self.if_none_match = if_none_match
+        self.record_body = record_body
+        self.extra_headers = extra_headers
+        self.max_body_size = max_body_size
+        self.body_size = 0
+
+        self.response_start: Message = {}
+        self.body: list[bytes] = []
+        self.etag: str | None = None
+        self.completed = False
+        self.started = False
+        self.not_modified = False
+
+    async def __call__(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self.response_start = {**message, "headers": list(message.get("headers", []))}
+            return
+        if message["type"] != "http.response.body":
+            if not self.started:  # E.g. trailers or a path send extension, the response can't be altered anymore
+                self.started = True
+                await self.send(self.response_start)
+            await self.send(message)
+            return
+
+        is_successful = self.response_start["status"] == HTTP_200_OK
+        more_body = message.get("more_body", False)
+        if is_successful and self.record_body:
+            self._record(message.get("body", b""), more_body=more_body)
+
+        if not self.started:
+            self.started = True
+            await self._send_start(message.get("body", b""), is_successful=is_successful, more_body=more_body)
+        if not self.not_modified:
+            await self.send(message)
+
+    def _record(self, chunk: bytes, more_body: bool) -> None:
+        self.body_size += len(chunk)
+        if self.max_body_size and self.body_size > self.max_body_size:
+            self.record_body = False
+            self.body = []
+            return
+        self.body.append(chunk)
+        self.completed = not more_body
+
+    def take_body(self) -> bytes:
+        """
+        :return: Recorded body, the recorded chunks are released so the body isn't held twice.
+        """
+        body = self.body[0] if len(self.body) == 1 else b"".join(self.body)
+        self.body = []
+        return body
+
+    async def _send_start(self, body: bytes, is_successful: bool, more_body: bool) -> None:
+        headers = self.response_start["headers"]
+        self.etag = next((value.decode("latin-1") for name, value in headers if name == b"etag"), None)
+        if is_successful and not more_body and self.etag is None:
+            self.etag = compute_etag(body)
+            headers.append((b"etag", self.etag.encode("latin-1")))
+
+        if is_successful and self.etag and self.if_none_match and etag_matches(self.if_none_match, self.etag):
+            self.not_modified = True
+            await send_not_modified(self.send, headers)
+            return
+
+        # Unless the body has outgrown the max size already, e.g. with the first chunk
+        extra_headers = self.extra_headers if is_successful and self.record_body else ()
+        await self.send({**self.response_start, "headers": [*headers, *extra_headers]})
+
+
+async def send_not_modified(send: Send, headers: list[tuple[bytes, bytes]]) -> None:
+    await send(
+        {
+            "type": "http.response.start",
+            "status": HTTP_304_NOT_MODIFIED,
+            "headers": [(name, value) for name, value in headers if name in NOT_MODIFIED_HEADERS],
+        },
+    )
+    await send({"type": "http.response.body", "body": b""})
+
+
+class CacheMiddleware:
+    """
+    Pure ASGI middleware caching successful GET responses of authenticated requests, and of any request to the routes
+    with the public cache scope.
+
+    On a cache miss the response messages are forwarded to the client as they are produced, while the cache entry
+    (status, headers and raw body) is assembled alongside. Cache hits are replayed as raw ASGI messages.
+
+    Concurrent misses of the same key are coalesced: only one request per worker reaches the handler, the others wait
+    for its response. With the lock TTL set, a short Redis lock extends it across workers, the workers not holding the
+    lock poll the cache for the response instead.
+
+    Entries older than the soft TTL are served stale while a single background request refreshes them. Responses are
+    marked with the Age and Cache-Status headers. The TTLs can be overridden per route with the cache_policy decorator.
+
+    Keys are hashes of the path, the sorted query parameters and the cache scope of the route. By default entries are
+    per user, the cache_policy decorator can share them between the users with the same role or between everybody.
+
+    Entries are registered under the route, user and declared resources invalidation tags.
+
+    Stored entries keep a strong ETag of their body, matching If-None-Match requests are answered with 304 Not Modified
+    straight from the entry metadata, without loading the body. Uncached GET responses get an ETag as well when they
+    consist of a single chunk.
+
+    Compressible bodies are compressed once when stored, hits are served with the variant negotiated through the
+    Accept-Encoding header. Responses with bodies over the max body size are passed through uncached.
+    """
+
+    cache_name = "fastapi-template"
+    lock_poll_interval = 0.05  # In seconds
 
     def __init__(
         self,
-        app: FastAPI,
+        app: ASGIApp,
         caching_repository: RedisRequestCachingService,
         expire: timedelta = redis_config.CACHE_TTL,
+        soft_expire: timedelta | None = None,
+        coalesce_timeout: timedelta = redis_config.CACHE_COALESCE_TIMEOUT,
+        coalesce_fallback: CoalescingFallbackEnum = CoalescingFallbackEnum.PASSTHROUGH,
+        lock_ttl: timedelta | None = None,
+        compression_min_size: int = redis_config.CACHE_COMPRESSION_MIN_SIZE,
+        compression_encodings: Collection[str] = redis_config.CACHE_COMPRESSION_ENCODINGS,
+        max_body_size: int = redis_config.CACHE_MAX_BODY_SIZE,
     ) -> None:
+        """
+        :param app: ASGI application.
+        :param caching_repository: Cache storage.
+        :param expire: Cache entries TTL, the hard TTL of the routes without own cache policy.
+        :param soft_expire: Soft TTL of the routes without own cache policy, stale entries aren't served if not set.
+        :param coalesce_timeout: How long a request waits for the response computed by a concurrent one.
+        :param coalesce_fallback: What to do with a request that has waited longer than the coalesce timeout.
+        :param lock_ttl: TTL of the Redis lock coalescing misses across workers, the lock isn't used if not set.
+        :param compression_min_size: Bodies smaller than this number of bytes aren't compressed.
+        :param compression_encodings: Encodings the cached bodies are compressed with, if available.
+        :param max_body_size: Responses with bodies larger than this number of bytes are passed through uncached, no
+        limit if 0.
+        """
+        self.app = app
         self.caching_repository = caching_repository
-        self.expire = expire
-        super().__init__(app)
+        self.default_policy = CachePolicy(hard_ttl=expire, soft_ttl=soft_expire)
+        self.coalesce_timeout = coalesce_timeout
+        self.coalesce_fallback = CoalescingFallbackEnum(coalesce_fallback)
+        self.lock_ttl = lock_ttl
+        self.compression_min_size = compression_min_size
+        self.compression_encodings = compression_encodings
+        self.max_body_size = max_body_size
+        self.single_flight = SingleFlight()
+        self.route_policies = LRUTTLCache(max_entries=1024)
+        self.background_tasks: set[asyncio.Task] = set()
 
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        if request.method.lower() != HTTPMethodEnum.GET.value:
-            return await call_next(request)
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"].lower() != HTTPMethodEnum.GET.value:
+            await self.app(scope, receive, send)
+            return
 
-        if not (authorization := await self.auth_scheme(request)):
-            return await call_next(request)
+        headers = Headers(scope=scope)
+        if_none_match = headers.get("if-none-match")
+        route_path, policy = self._get_route_policy(scope)
+        if (cache_scope := self._get_cache_scope(policy, headers)) is None:
+            await self.app(scope, receive, ResponseRecorder(send, if_none_match))
+            return
 
-        path = f"{request.url.path}/{request.url.query}"
-        cache_key = f"{path}:{authorization.credentials}"
-        extra = {"path": path}
+        path = f"{scope['path']}/{scope['query_string'].decode('latin-1')}"
+        request = CacheRequest(
+            key=build_cache_key(scope["path"], scope["query_string"].decode("latin-1"), cache_scope),
+            policy=policy,
+            tags=self._get_tags(route_path, policy),
+            if_none_match=if_none_match,
+            encodings=parse_accept_encoding(headers.get("accept-encoding")),
+            extra={"path": path, "cache_scope": policy.scope.value},
+        )
+
+        cached_response = None
+        if if_none_match:  # Checking the metadata first, so the body isn't loaded if the client has it already
+            metadata = await self.caching_repository.get_cache_metadata(request.key)
+            if metadata and etag_matches(if_none_match, self._select_representation(request, metadata)[1]):
+                cached_response = metadata
+        if cached_response is None:
+            cached_response = await self.caching_repository.get_cache(request.key, request.encodings)
 
-        cached_response = await self.caching_repository.get_cache(cache_key)
         if cached_response:
-            logger.info("Returning cached response", extra=extra)
-            return Response(
-                content=cached_response["content"],
-                media_type="application/json",
-                status_code=cached_response["status_code"],
+            age = self._get_age(cached_response)
+            is_stale = policy.soft_ttl is not None and age >= policy.soft_ttl.total_seconds()
+            logger.info(
+                "Returning stale cached response" if is_stale else "Returning cached response",
+                extra=request.extra,
             )
+            RESPONSE_CACHE_REQUESTS.labels("stale" if is_stale else "hit").inc()
+            await self._send_cached_response(send, request, cached_response, self._hit_status(policy, age))
+            if is_stale:
+                self._schedule_refresh(scope, request)
+            return
+
+        RESPONSE_CACHE_REQUESTS.labels("miss").inc()
+        if request.key in self.single_flight:
+            await self._wait_for_in_flight(scope, receive, send, request)
+            return
+
+        logger.info("Cached response not found! Processing with the actual handler", extra=request.extra)
+        await self.single_flight.do(request.key, lambda: self._call_and_cache_locked(scope, receive, send, request))
+
+    def _get_route_policy(self, scope: Scope) -> tuple[str | None, CachePolicy]:
+        if (route_policy := self.route_policies.get(scope["path"])) is None:
+            route = resolve_route(scope)
+            route_policy = (getattr(route, "path", None), get_cache_policy(route) or self.default_policy)
+            self.route_policies.set(scope["path"], route_policy)
+        return route_policy
+
+    @staticmethod
+    def _get_cache_scope(policy: CachePolicy, headers: Headers) -> str | None:
+        """
+        :return: Discriminator of the entries shared by the requester, None if the request mustn't be cached.
+        """
+        if not policy.enabled:
+            return None
+        if policy.scope == CacheScopeEnum.PUBLIC:
+            return CacheScopeEnum.PUBLIC.value
+
+        scheme, credentials = get_authorization_scheme_param(headers.get("authorization"))
+        if scheme.lower() != "bearer" or not credentials:
+            return None
 
-        logger.info("Cached response not found! Processing with the actual handler", extra=extra)
-        response = await call_next(request)  # Cache miss: Proceed with the request to the actual handler
-
-        if response.status_code == HTTP_200_OK:
-            response_body = [chunk async for chunk in response.body_iterator]
-            response_dict = {
-                "content": b"".join(response_body).decode("utf-8"),
-                "status_code": response.status_code,
-            }
-
-            # Serialize and store the response in cache
-            logger.info("Caching the request", extra=extra)
-            await self.caching_repository.set_cache(cache_key, response_dict, self.expire)
-            return Response(
-                content=response_dict["content"],
-                media_type="application/json",
-                status_code=response.status_code,
+        user_info = get_user_info()
+        if policy.scope == CacheScopeEnum.ROLE and (role := user_info.get(jwt_config.JWT_ROLE_CLAIM)) is not None:
+            roles = sorted(map(str, role)) if isinstance(role, list) else [str(role)]
+            return f"{CacheScopeEnum.ROLE.value}:{','.join(roles)}"
+        if (user_id := user_info.get(jwt_config.JWT_USER_ID_CLAIM)) is not None:
+            return f"{CacheScopeEnum.USER.value}:{user_id}"
+        # Without the claims, e.g. without the authentication middleware, falling back to an entry per token
+        return f"token:{hashlib.blake2b(credentials.encode(), digest_size=16).hexdigest()}"
+
+    @staticmethod
+    def _get_tags(route_path: str | None, policy: CachePolicy) -> list[str]:
+        tags = [resource_tag(resource) for resource in policy.resources]
+        if route_path:
+            tags.append(route_tag(route_path))
+        if policy.scope == CacheScopeEnum.USER and (user_id := get_user_info().get(jwt_config.JWT_USER_ID_CLAIM)):
+            tags.append(user_tag(str(user_id)))
+        return tags
+
+    async def _wait_for_in_flight(
+        self,
+        scope: Scope,
+        receive: Receive,
+        send: Send,
+        request: CacheRequest,
+    ) -> None:
+        logger.info("Waiting for the in-flight request with the same key", extra=request.extra)
+        try:
+            async with asyncio.timeout(self.coalesce_timeout.total_seconds()):
+                response_dict = await self.single_flight.wait(request.key)
+        except TimeoutError:
+            logger.warning("Timed out waiting for the in-flight request", extra=request.extra)
+            await self._fallback(scope, receive, send, request)
+            return
+
+        if response_dict:
+            await self._send_cached_response(send, request, response_dict, f"{self.cache_name}; hit; collapsed")
+        else:  # The response turned out not cacheable, so it can't be shared
+            await self.app(scope, receive, send)
+
+    async def _call_and_cache_locked(
+        self,
+        scope: Scope,
+        receive: Receive,
+        send: Send,
+        request: CacheRequest,
+    ) -> dict | None:
+        if not self.lock_ttl:
+            return await self._call_and_cache(scope, receive, send, request)
+
+        if token := await self.caching_repository.acquire_lock(request.key, self.lock_ttl):
+            try:
+                return await self._call_and_cache(scope, receive, send, request)
+            finally:
+                await self.caching_repository.release_lock(request.key, token)
+
+        logger.info("The response is being computed by another worker, polling the cache", extra=request.extra)
+        deadline = time.monotonic() + self.coalesce_timeout.total_seconds()
+        while time.monotonic() < deadline:
+            await asyncio.sleep(self.lock_poll_interval)
+            if response_dict := await self.caching_repository.get_cache(request.key):
+                await self._send_cached_response(send, request, response_dict, f"{self.cache_name}; hit; collapsed")
+                return response_dict
+
+        logger.warning("Timed out waiting for the response computed by another worker", extra=request.extra)
+        return await self._fallback(scope, receive, send, request)
+
+    async def _fallback(
+        self,
+        scope: Scope,
+        receive: Receive,
+        send: Send,
+        request: CacheRequest,
+    ) -> dict | None:
+        if self.coalesce_fallback == CoalescingFallbackEnum.REJECT:
+            response = JSONResponse(
+                status_code=HTTP_503_SERVICE_UNAVAILABLE,
+                content={"message": "The resource is being computed, try again later"},
+                headers={"Retry-After": "1"},
             )
-        return response
+            await response(scope, receive, send)
+            return None
+        return await self._call_and_cache(scope, receive, send, request)
+
+    def _schedule_refresh(self, scope: Scope, request: CacheRequest) -> None:
+        if request.key in self.single_flight:  # The entry is already being refreshed
+            return
+
+        request_received = False
+
+        async def receive() -> Message:
+            nonlocal request_received
+            if not request_received:
+                request_received = True
+                return {"type": "http.request", "body": b"", "more_body": False}
+            await asyncio.Event().wait()  # The refresh has no client which could disconnect
+            return {"type": "http.disconnect"}
+
+        async def send(message: Message) -> None:
+            return None
+
+        async def refresh() -> dict | None:
+            logger.info("Refreshing the stale cached response", extra=request.extra)
+            try:
+                return await self._call_and_cache_locked(dict(scope), receive, send, request)
+            except Exception as e:
+                logger.exception("Failed to refresh the stale cached response", extra={"e": e, **request.extra})
+                return None
+
+        task = asyncio.create_task(self.single_flight.do(request.key, refresh))
+        self.background_tasks.add(task)
+        task.add_done_callback(self.background_tasks.discard)
+
+    async def _call_and_cache(
+        self,
+        scope: Scope,
+        receive: Receive,
+        send: Send,
+        request: CacheRequest,
+    ) -> dict | None:
+        recorder = ResponseRecorder(
+            send,
+            request.if_none_match,
+            record_body=True,
+            extra_headers=((b"cache-status", f"{self.cache_name}; fwd=uri-miss; stored".encode("latin-1")),),
+            max_body_size=self.max_body_size,
+        )
+        await self.app(scope, receive, recorder)  # Cache miss: Proceed with the request to the actual handler
+
+        if not recorder.completed:
+            return None
+
+        body = recorder.take_body()
+        headers = recorder.response_start["headers"]
+        if (etag := recorder.etag) is None:  # The body came in chunks, the ETag is known only now
+            etag = compute_etag(body)
+            headers = [*headers, (b"etag", etag.encode("latin-1"))]
+
+        variants = await self._compress(body, headers)
+        if variants:
+            headers = [*headers, (b"vary", b"Accept-Encoding")]
+
+        response_dict = {
+            "status_code": recorder.response_start["status"],
+            "headers": [[name.decode("latin-1"), value.decode("latin-1")] for name, value in headers],
+            "etag": etag,
+            "encodings": list(variants),
+            "content": body,
+            "variants": variants,
+            "created_at": time.time(),
+        }
+
+        # Serialize and store the response in cache once the client has already got it
+        logger.info("Caching the request", extra=request.extra)
+        await self.caching_repository.set_cache(
+            request.key,
+            response_dict,
+            request.policy.hard_ttl,
+            tags=request.tags,
+        )
+        return response_dict
+
+    def _hit_status(self, policy: CachePolicy, age: int) -> str:
+        ttl = int((policy.soft_ttl or policy.hard_ttl).total_seconds()) - age
+        status = f"{self.cache_name}; hit; ttl={ttl}"
+        return status if ttl > 0 else f"{status}; fwd=stale"
+
+    @staticmethod
+    def _get_age(cached_response: dict) -> int:
+        return max(int(time.time() - cached_response.get("created_at", time.time())), 0)
+
+    async def _compress(self, body: bytes, headers: list[tuple[bytes, bytes]]) -> dict[str, bytes]:
+        if len(body) < self.compression_min_size or not self.compression_encodings:
+            return {}
+        response_headers = Headers(raw=headers)
+        if "content-encoding" in response_headers or not is_compressible(response_headers.get("content-type")):
+            return {}
+        # Compressing in a thread, so big bodies don't block the event loop
+        return await asyncio.to_thread(compress, body, self.compression_encodings)
+
+    @staticmethod
+    def _select_representation(
+        request: CacheRequest,
+        cached_response: dict,
+        loaded_only: bool = False,
+    ) -> tuple[str | None, str]:
+        """
+        :param loaded_only: Whether to select out of the loaded variants only, rather than out of the stored ones.
+        :return: The most preferred stored encoding acceptable by the client (None for the identity one) and the ETag
+        of the body with that encoding.
+        """
+        stored_encodings = cached_response["variants"] if loaded_only else cached_response.get("encodings", ())
+        encoding = next((encoding for encoding in request.encodings if encoding in stored_encodings), None)
+        return encoding, encoded_etag(cached_response["etag"], encoding) if encoding else cached_response["etag"]
+
+    def _build_cached_response_headers(
+        self,
+        cached_response: dict,
+        cache_status: str,
+        encoding: str | None,
+        etag: str,
+        content_length: int,
+    ) -> list[tuple[bytes, bytes]]:
+        headers = [
+            (name.encode("latin-1"), value.encode("latin-1"))
+            for name, value in cached_response["headers"]
+            if encoding is None or name not in ("content-length", "etag")
+        ]
+        if encoding is not None:
+            headers += [
+                (b"content-encoding", encoding.encode("latin-1")),
+                (b"content-length", str(content_length).encode("latin-1")),
+                (b"etag", etag.encode("latin-1")),
+            ]
+        return [
+            *headers,
+            (b"age", str(self._get_age(cached_response)).encode("latin-1")),
+            (b"cache-status", cache_status.encode("latin-1")),
+        ]
+
+    async def _send_cached_response(
+        self,
+        send: Send,
+        request: CacheRequest,
+        cached_response: dict,
+        cache_status: str,
+    ) -> None:
+        encoding, etag = self._select_representation(request, cached_response)
+        if request.if_none_match and etag_matches(request.if_none_match, etag):
+            headers = self._build_cached_response_headers(cached_response, cache_status, encoding, etag, 0)
+            await send_not_modified(send, headers)
+            return
+
+        # Entries filled into the local cache from Redis hold only the variant loaded then
+        if encoding is not None and encoding not in cached_response["variants"]:
+            encoding, etag = self._select_representation(request, cached_response, loaded_only=True)
+        body = cached_response["variants"][encoding] if encoding else cached_response["content"]
+        headers = self._build_cached_response_headers(cached_response, cache_status, encoding, etag, len(body))
+        await send({"type": "http.response.start", "status": cached_response["status_code"], "headers": headers})
+        await send({"type": "http.response.body", "body": body})
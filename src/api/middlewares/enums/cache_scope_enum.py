@@ -0,0 +1,7 @@
+from src.core.enums.base_enum import BaseEnum
+
+
+class CacheScopeEnum(BaseEnum):
+    PUBLIC = "public"  # A single entry shared by all the users, anonymous ones included
+    USER = "user"  # An entry per user, identified by the user id claim of the token
+    ROLE = "role"  # An entry per role, identified by the role claim of the token
@@ -0,0 +1,6 @@
+from src.core.enums.base_enum import BaseEnum
+
+
+class CoalescingFallbackEnum(BaseEnum):
+    PASSTHROUGH = "passthrough"  # Process the request with the actual handler
+    REJECT = "reject"  # Respond with 503 Service Unavailable
@@ -0,0 +1,51 @@
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.core.metrics import HTTP_REQUEST_DURATION, HTTP_REQUESTS_IN_FLIGHT, UNMATCHED_ROUTE
+from src.utils.cache_policy import resolve_route
+from src.utils.lru_ttl_cache import LRUTTLCache
+
+
+class MetricsMiddleware:
+    """
+    Records the latency and the in-flight requests by route template, e.g. "/api/v1/users/{user_id}/", so the
+    number of the series doesn't grow with the number of the requested paths.
+
+    The status of the requests failing with an unhandled exception is reported as 500.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+        self.route_templates = LRUTTLCache(max_entries=1024)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method, route = scope["method"], self._get_route_template(scope)
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        in_flight = HTTP_REQUESTS_IN_FLIGHT.labels(method, route)
+        in_flight.inc()
+        started_at = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_REQUEST_DURATION.labels(method, route, status_code).observe(time.perf_counter() - started_at)
+            in_flight.dec()
+
+    def _get_route_template(self, scope: Scope) -> str:
+        # Routes are matched by the method as well
+        key = (scope["method"], scope["path"])
+        if (route_template := self.route_templates.get(key)) is None:
+            route_template = getattr(resolve_route(scope), "path", None) or UNMATCHED_ROUTE
+            self.route_templates.set(key, route_template)
+        return route_template
@@ -0,0 +1,16 @@
+from typing import Any
+
+from starlette.responses import JSONResponse
+
+from src.utils.codecs import JSON_CODEC
+
+
+class CodecJSONResponse(JSONResponse):
+    """
+    JSON response rendered with the fastest available JSON codec, orjson if it's installed.
+
+    Unlike the Starlette JSONResponse, NaN and infinite floats are rendered as null with orjson rather than failing.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return JSON_CODEC.encode(content)
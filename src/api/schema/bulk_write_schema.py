@@ -0,0 +1,16 @@
+from collections.abc import Sequence
+from typing import Any
+
+from pydantic import BaseModel
+
+
+class BatchError(BaseModel):
+    batch: int  # Index of the batch, starting from 0
+    size: int  # Number of the rows in the batch, none of them have been written
+    detail: str
+
+
+class BulkWriteResult(BaseModel):
+    items: Sequence[Any] = ()  # Written rows, if they are returned
+    written: int = 0
+    errors: list[BatchError] = []
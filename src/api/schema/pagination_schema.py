@@ -9,11 +9,25 @@ from pydantic.generics import GenericModel
 class PaginatedData(BaseModel):
     items: Sequence[Any]
     page: int
-    pages: int
+    pages: int | None  # None if the total isn't counted
     size: int
-    total: int
+    total: int | None
+    total_is_exact: bool = True  # False for the estimated and the cached totals
+    has_next: bool | None = None
 
 
 class PaginationParams(BaseModel):
     page: int = Query(1, ge=1, description="Page number")
     size: int = Query(50, ge=1, le=100, description="Page size")
+
+
+class CursorPaginatedData(BaseModel):
+    items: Sequence[Any]
+    size: int
+    next_cursor: str | None = None
+    previous_cursor: str | None = None
+
+
+class CursorPaginationParams(BaseModel):
+    cursor: str | None = Query(None, description="Cursor of the page, the first page is returned if not set")
+    size: int = Query(50, ge=1, le=100, description="Page size")
@@ -0,0 +1,46 @@
+from typing import Any
+
+from fastapi import APIRouter, Depends
+
+from src.adapters.request_adapter import RequestService
+from src.db.db import engine, replica_engines
+from src.db.pool_metrics import get_pool_metrics
+from src.dependencies.cache_dependency import get_redis_request_caching_service
+from src.dependencies.role_dependency import require_roles
+from src.models.enums.user_role_enum import UserRoleEnum
+from src.utils.cache_policy import cache_policy
+
+router = APIRouter(prefix="/internal", tags=["internal"], dependencies=[Depends(require_roles(UserRoleEnum.Admin))])
+
+
+@router.get("/pool-metrics/")
+@cache_policy(enabled=False)
+async def get_pool_metrics_snapshot() -> dict[str, Any]:
+    """
+    Connection pool metrics of the primary and of the replicas, long checkout waits along with a busy pool point to
+    the pool starvation rather than to the database.
+    """
+    pools = (pool_engine.sync_engine.pool for pool_engine in (engine, *replica_engines))
+    return {pool.logging_name: get_pool_metrics(pool).snapshot(pool) for pool in pools}
+
+
+@router.get("/http-cache-metrics/")
+@cache_policy(enabled=False)
+async def get_http_cache_metrics() -> dict[str, Any]:
+    """
+    Hits and misses of the outbound HTTP cache.
+    """
+    if RequestService.http_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **RequestService.http_cache.get_metrics()}
+
+
+@router.get("/local-cache-metrics/")
+@cache_policy(enabled=False)
+async def get_local_cache_metrics() -> dict[str, Any]:
+    """
+    Hits, misses and evictions of the in-process tier of the response cache, of the current worker.
+    """
+    if (local_cache := get_redis_request_caching_service().local_cache) is None:
+        return {"enabled": False}
+    return {"enabled": True, **local_cache.stats}
@@ -1,7 +1,11 @@
 from fastapi import APIRouter
 
 from src.api.v1.health_check import router as health_check_router
+from src.api.v1.internal import router as internal_router
+from src.api.v1.users import router as users_router
 
 router = APIRouter(prefix="/v1")
 
 router.include_router(health_check_router)
+router.include_router(internal_router)
+router.include_router(users_router)
@@ -0,0 +1,35 @@
+from collections.abc import AsyncIterator
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import RowMapping, select
+from starlette.responses import StreamingResponse
+
+from src.adapters.postgres_adapter import PostgresAdapter
+from src.api.enums.export_format_enum import ExportFormatEnum
+from src.db.db import async_session
+from src.dependencies.role_dependency import require_roles
+from src.models.enums.user_role_enum import UserRoleEnum
+from src.models.user_model import User
+from src.utils.cache_policy import cache_policy
+from src.utils.streaming import build_streaming_response
+
+router = APIRouter(prefix="/users", tags=["users"])
+
+EXPORTED_COLUMNS = ("id", "first_name", "last_name", "email", "phone_number", "user_role", "created_at", "updated_at")
+
+
+async def iterate_users() -> AsyncIterator[RowMapping]:
+    # The session is opened by the stream itself, as it outlives the request handler
+    async with async_session() as session:
+        query = select(*(getattr(User, column) for column in EXPORTED_COLUMNS)).order_by(User.id)
+        async for row in PostgresAdapter(session, User).stream(query, is_mapping=True):
+            yield row
+
+
+# The export holds the contact details of every user
+@router.get("/export/", dependencies=[Depends(require_roles(UserRoleEnum.Admin))])
+@cache_policy(enabled=False)
+async def export_users(
+    export_format: ExportFormatEnum = Query(ExportFormatEnum.NDJSON, alias="format"),
+) -> StreamingResponse:
+    return build_streaming_response(iterate_users(), export_format, EXPORTED_COLUMNS, filename="users")
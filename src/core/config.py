@@ -10,11 +10,13 @@ class GeneralConfig:
     CORS_ORIGINS = os.getenv("CORS_ORIGINS", "").split(",")
     CORS_METHODS = os.getenv("CORS_METHODS", "").split(",")
     CORS_HEADERS = os.getenv("CORS_HEADERS", "").split(",")
+    # Exact paths, prefixes ending with "*" and patterns with {parameter} placeholders
     ANONYMOUS_ENDPOINTS = (
         "/api/v1/health-check/",
         "/api/docs",
         "/favicon.ico",
         "/api/openapi.json",
+        "/metrics",
     )
     LRU_CACHE_MAX_SIZE = 16  # In bytes
 
@@ -25,19 +27,159 @@ class JWTConfig:
     JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "")
     JWT_EXP_MIN = int(os.getenv("JWT_EXP_MIN", "180"))
     JWT_REFRESH_EXP_MIN = int(os.getenv("JWT_EXP_MIN", "720"))
+    JWT_USER_ID_CLAIM = os.getenv("JWT_USER_ID_CLAIM", "sub")
+    JWT_ROLE_CLAIM = os.getenv("JWT_ROLE_CLAIM", "role")
+
+    # Verified claims are cached by the token digest, entries never outlive the token expiration
+    JWT_CLAIMS_CACHE_ENABLED = os.getenv("JWT_CLAIMS_CACHE_ENABLED", "true").lower() == "true"
+    JWT_CLAIMS_CACHE_TTL = timedelta(seconds=int(os.getenv("JWT_CLAIMS_CACHE_TTL", "300")))  # In seconds
+    JWT_CLAIMS_CACHE_MAX_ENTRIES = int(os.getenv("JWT_CLAIMS_CACHE_MAX_ENTRIES", "10000"))
+    # Claims of tokens signed with asymmetric algorithms are shared across workers through Redis
+    JWT_CLAIMS_SHARED_CACHE_ENABLED = os.getenv("JWT_CLAIMS_SHARED_CACHE_ENABLED", "false").lower() == "true"
+    JWT_DENYLIST_ENABLED = os.getenv("JWT_DENYLIST_ENABLED", "false").lower() == "true"
 
 
 class PostgresConfig:
     CONN_STRING = os.getenv("POSTGRES_CONN_STRING", "")
+    # Reads are sent to the replicas if there are any
+    REPLICA_CONN_STRINGS = tuple(filter(None, os.getenv("POSTGRES_REPLICA_CONN_STRINGS", "").split(",")))
+    REPLICA_SELECTION = os.getenv("POSTGRES_REPLICA_SELECTION", "round_robin")  # round_robin/least_connections
+    # Reads following a committed write go to the primary for the window
+    READ_YOUR_WRITES_WINDOW = timedelta(seconds=float(os.getenv("POSTGRES_READ_YOUR_WRITES_WINDOW", "5")))  # In seconds
+
+    # Applied to the pools of the primary and of each replica, the connections above the pool size are the overflow
+    POOL_SIZE = int(os.getenv("POSTGRES_POOL_SIZE", "5"))
+    MAX_OVERFLOW = int(os.getenv("POSTGRES_MAX_OVERFLOW", "10"))
+    POOL_TIMEOUT = float(os.getenv("POSTGRES_POOL_TIMEOUT", "30"))  # In seconds
+    POOL_RECYCLE = int(os.getenv("POSTGRES_POOL_RECYCLE", "-1"))  # In seconds, connections are never recycled if -1
+    POOL_PRE_PING = os.getenv("POSTGRES_POOL_PRE_PING", "false").lower() == "true"
+    # Prepared statements cached per connection by asyncpg, has to be 0 behind pgbouncer in transaction mode
+    STATEMENT_CACHE_SIZE = int(os.getenv("POSTGRES_STATEMENT_CACHE_SIZE", "100"))
+
+    # Estimated counts below the threshold are cheap enough to be replaced with the exact ones
+    COUNT_ESTIMATE_THRESHOLD = int(os.getenv("POSTGRES_COUNT_ESTIMATE_THRESHOLD", "10000"))
+    COUNT_CACHE_TTL = timedelta(seconds=int(os.getenv("POSTGRES_COUNT_CACHE_TTL", "30")))  # In seconds
+    COUNT_CACHE_MAX_ENTRIES = int(os.getenv("POSTGRES_COUNT_CACHE_MAX_ENTRIES", "1024"))
+
+    BULK_WRITE_BATCH_SIZE = int(os.getenv("POSTGRES_BULK_WRITE_BATCH_SIZE", "1000"))
+    STREAM_FETCH_SIZE = int(os.getenv("POSTGRES_STREAM_FETCH_SIZE", "1000"))  # Rows fetched per server-side cursor read
 
 
 class RedisConfig:
     HOST = os.getenv("REDIS_HOST", "redis")
     PORT = int(os.getenv("REDIS_PORT", "6379"))
     CACHE_TTL = timedelta(seconds=int(os.getenv("REDIS_TTL", "300")))  # In seconds
+    # Stale entries are served while refreshed in the background after the soft TTL, disabled if 0
+    CACHE_SOFT_TTL = timedelta(seconds=int(os.getenv("REDIS_SOFT_TTL", "0")))  # In seconds
+
+    CACHE_CODEC = os.getenv("REDIS_CACHE_CODEC", "orjson")  # json/orjson/msgpack
+    INVALIDATION_BATCH_SIZE = int(os.getenv("REDIS_INVALIDATION_BATCH_SIZE", "500"))
+
+    # Cached bodies are stored compressed with each of the encodings, br and zstd need brotli and zstandard installed
+    CACHE_COMPRESSION_ENCODINGS = tuple(
+        filter(None, os.getenv("REDIS_CACHE_COMPRESSION_ENCODINGS", "zstd,br,gzip").split(",")),
+    )
+    CACHE_COMPRESSION_MIN_SIZE = int(os.getenv("REDIS_CACHE_COMPRESSION_MIN_SIZE", "1024"))  # In bytes
+    # Bigger responses are passed through uncached, rather than held in memory, no limit if 0
+    CACHE_MAX_BODY_SIZE = int(os.getenv("REDIS_CACHE_MAX_BODY_SIZE", str(1024 * 1024)))  # In bytes
+
+    # In-process cache tier checked before Redis, its TTL never exceeds the Redis one. The invalidations clear the tier
+    # of the invalidating worker only, the other workers may serve the invalidated entries for up to this TTL
+    LOCAL_CACHE_ENABLED = os.getenv("REDIS_LOCAL_CACHE_ENABLED", "false").lower() == "true"
+    LOCAL_CACHE_TTL = min(timedelta(seconds=int(os.getenv("REDIS_LOCAL_CACHE_TTL", "30"))), CACHE_TTL)  # In seconds
+    LOCAL_CACHE_MAX_ENTRIES = int(os.getenv("REDIS_LOCAL_CACHE_MAX_ENTRIES", "1024"))
+    LOCAL_CACHE_MAX_BYTES = int(os.getenv("REDIS_LOCAL_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))  # In bytes
+
+    # Coalescing of concurrent cache misses, optionally across workers through a short Redis lock
+    CACHE_COALESCE_TIMEOUT = timedelta(milliseconds=int(os.getenv("REDIS_CACHE_COALESCE_TIMEOUT", "5000")))  # In ms
+    CACHE_COALESCE_FALLBACK = os.getenv("REDIS_CACHE_COALESCE_FALLBACK", "passthrough")  # passthrough/reject
+    CACHE_LOCK_ENABLED = os.getenv("REDIS_CACHE_LOCK_ENABLED", "false").lower() == "true"
+    CACHE_LOCK_TTL = timedelta(milliseconds=int(os.getenv("REDIS_CACHE_LOCK_TTL", "10000")))  # In ms
+
+
+class HTTPClientConfig:
+    # Limits of the client shared by the outbound requests, connections idle for longer than the expiry are closed
+    MAX_CONNECTIONS = int(os.getenv("HTTP_CLIENT_MAX_CONNECTIONS", "100"))
+    MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_CLIENT_MAX_KEEPALIVE_CONNECTIONS", "20"))
+    KEEPALIVE_EXPIRY = float(os.getenv("HTTP_CLIENT_KEEPALIVE_EXPIRY", "5"))  # In seconds
+    HTTP2_ENABLED = os.getenv("HTTP_CLIENT_HTTP2_ENABLED", "false").lower() == "true"  # Needs h2 installed
+    # Hosts with pools of their own, so a busy host can't take all the connections, e.g. "api.example.com=50"
+    HOST_MAX_CONNECTIONS = {
+        host.strip(): int(limit)
+        for host, _, limit in (
+            rule.partition("=") for rule in filter(None, os.getenv("HTTP_CLIENT_HOST_MAX_CONNECTIONS", "").split(","))
+        )
+    }
+    TIMEOUT = float(os.getenv("HTTP_CLIENT_TIMEOUT", "10"))  # In seconds, overridable per request
+    CONNECT_TIMEOUT = float(os.getenv("HTTP_CLIENT_CONNECT_TIMEOUT", "5"))  # In seconds
+
+    # Requests of a batch running at once against a single host
+    MAX_CONCURRENCY_PER_HOST = int(os.getenv("HTTP_CLIENT_MAX_CONCURRENCY_PER_HOST", "10"))
+    # Hedged GETs are duplicated after the p95 latency of the host, or after the delay until it's known
+    HEDGE_DELAY = float(os.getenv("HTTP_CLIENT_HEDGE_DELAY", "0.1"))  # In seconds
+    HEDGE_MIN_SAMPLES = int(os.getenv("HTTP_CLIENT_HEDGE_MIN_SAMPLES", "20"))
+    LATENCY_WINDOW = int(os.getenv("HTTP_CLIENT_LATENCY_WINDOW", "200"))  # Latest latencies kept per host
+
+    # Idempotent requests failing with a connection error, a timeout or a 502/503/504 are retried with a jittered
+    # exponential backoff, as long as the retries stay within a share of the requests to the host
+    MAX_RETRIES = int(os.getenv("HTTP_CLIENT_MAX_RETRIES", "2"))
+    RETRY_BACKOFF_BASE = float(os.getenv("HTTP_CLIENT_RETRY_BACKOFF_BASE", "0.1"))  # In seconds
+    RETRY_BACKOFF_MAX = float(os.getenv("HTTP_CLIENT_RETRY_BACKOFF_MAX", "2"))  # In seconds
+    RETRY_BUDGET_RATIO = float(os.getenv("HTTP_CLIENT_RETRY_BUDGET_RATIO", "0.2"))
+    RETRY_BUDGET_MIN_RETRIES = int(os.getenv("HTTP_CLIENT_RETRY_BUDGET_MIN_RETRIES", "10"))
+    RETRY_BUDGET_WINDOW = timedelta(seconds=int(os.getenv("HTTP_CLIENT_RETRY_BUDGET_WINDOW", "10")))  # In seconds
+
+    # Requests to a host are rejected for a while once the failure rate within the window reaches the threshold
+    CIRCUIT_BREAKER_ENABLED = os.getenv("HTTP_CLIENT_CIRCUIT_BREAKER_ENABLED", "true").lower() == "true"
+    CIRCUIT_BREAKER_FAILURE_RATE = float(os.getenv("HTTP_CLIENT_CIRCUIT_BREAKER_FAILURE_RATE", "0.5"))
+    CIRCUIT_BREAKER_WINDOW = timedelta(seconds=int(os.getenv("HTTP_CLIENT_CIRCUIT_BREAKER_WINDOW", "30")))  # In seconds
+    CIRCUIT_BREAKER_MIN_CALLS = int(os.getenv("HTTP_CLIENT_CIRCUIT_BREAKER_MIN_CALLS", "20"))
+    CIRCUIT_BREAKER_OPEN_DURATION = timedelta(
+        seconds=int(os.getenv("HTTP_CLIENT_CIRCUIT_BREAKER_OPEN_DURATION", "30")),
+    )  # In seconds
+    CIRCUIT_BREAKER_HALF_OPEN_CALLS = int(os.getenv("HTTP_CLIENT_CIRCUIT_BREAKER_HALF_OPEN_CALLS", "3"))
+
+    # Cache of the GET responses following their Cache-Control, ETag and Last-Modified headers
+    CACHE_ENABLED = os.getenv("HTTP_CLIENT_CACHE_ENABLED", "false").lower() == "true"
+    CACHE_STORAGE = os.getenv("HTTP_CLIENT_CACHE_STORAGE", "memory")  # memory/redis
+    CACHE_MAX_ENTRIES = int(os.getenv("HTTP_CLIENT_CACHE_MAX_ENTRIES", "1024"))  # In memory only
+    CACHE_MAX_BYTES = int(os.getenv("HTTP_CLIENT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))  # In bytes, in memory only
+    CACHE_MAX_ENTRY_SIZE = int(os.getenv("HTTP_CLIENT_CACHE_MAX_ENTRY_SIZE", str(1024 * 1024)))  # In bytes
+    # Responses which can be revalidated are kept for the retention after going stale
+    CACHE_RETENTION = timedelta(seconds=int(os.getenv("HTTP_CLIENT_CACHE_RETENTION", "86400")))  # In seconds
+
+
+class LoggingConfig:
+    # Records are formatted and written by a background thread, the logging calls only enqueue them
+    QUEUE_ENABLED = os.getenv("LOG_QUEUE_ENABLED", "true").lower() == "true"
+    # Share of the INFO and lower records kept by logger, applied to the child loggers as well,
+    # e.g. "src.api.middlewares.cache_middleware=0.1,uvicorn.access=0.01"
+    SAMPLING_RATES = {
+        name.strip(): float(rate)
+        for name, _, rate in (
+            rule.partition("=") for rule in filter(None, os.getenv("LOG_SAMPLING_RATES", "").split(","))
+        )
+    }
+
+
+class MetricsConfig:
+    ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+    # Shared by the workers to aggregate their metrics, read by prometheus_client when imported, so it has to be set
+    # in the environment of the process and emptied before the workers start
+    MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR", "")
+    LATENCY_BUCKETS = tuple(
+        float(bucket)
+        for bucket in os.getenv(
+            "METRICS_LATENCY_BUCKETS",
+            "0.005,0.01,0.025,0.05,0.1,0.25,0.5,1,2.5,5,10",
+        ).split(",")
+    )  # In seconds
 
 
 general_config = GeneralConfig()
 postgres_config = PostgresConfig()
 jwt_config = JWTConfig()
 redis_config = RedisConfig()
+http_client_config = HTTPClientConfig()
+logging_config = LoggingConfig()
+metrics_config = MetricsConfig()
@@ -1,7 +1,87 @@
+import atexit
 import logging
+import random
+from collections.abc import Mapping
+from logging.handlers import QueueHandler, QueueListener
+from queue import SimpleQueue
 
+from pythonjsonlogger.core import RESERVED_ATTRS
 from pythonjsonlogger.json import JsonFormatter
 
+from src.core.config import logging_config
+
+try:
+    from pythonjsonlogger.orjson import OrjsonFormatter
+except ImportError:  # orjson isn't installed
+    OrjsonFormatter = None
+
+LOG_FORMAT = "[%(asctime)s %(levelname)-5s] %(message)s [%(filename)s:%(lineno)d]"
+LOG_DATE_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+# Attributes of the records themselves, the other ones are the extra ones passed by the caller
+RECORD_ATTRS = frozenset(RESERVED_ATTRS)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps a share of the INFO and lower records of the configured loggers and of their children, the records of the
+    other loggers and the warnings and errors are always kept.
+    """
+
+    def __init__(self, rates: Mapping[str, float]) -> None:
+        """
+        :param rates: Share of the records kept by the logger name, between 0 and 1.
+        """
+        super().__init__()
+        self.rates = dict(rates)
+        self._logger_rates: dict[str, float | None] = {}  # Rates resolved by the logger name
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.INFO or not self.rates:
+            return True
+        if (rate := self._get_rate(record.name)) is None:
+            return True
+        return random.random() < rate  # noqa: S311
+
+    def _get_rate(self, name: str) -> float | None:
+        if name not in self._logger_rates:
+            # The closest configured ancestor wins, e.g. "src.api" for "src.api.middlewares"
+            parts = name.split(".")
+            ancestors = (".".join(parts[:length]) for length in range(len(parts), 0, -1))
+            ancestor = next((ancestor for ancestor in ancestors if ancestor in self.rates), None)
+            self._logger_rates[name] = self.rates.get(ancestor)
+        return self._logger_rates[name]
+
+
+class DeferredFormattingQueueHandler(QueueHandler):
+    """
+    Queue handler leaving the formatting to the listener thread, while the base one formats the records in the
+    logging thread.
+
+    What the caller may change or drop before the record is formatted is captured when it's enqueued: the arguments
+    are merged into the message, the traceback is rendered and the extra containers are copied, shallowly.
+    """
+
+    traceback_formatter = logging.Formatter()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        # The stack info is rendered by the logger already, the traceback isn't, and its frames would be kept alive
+        if record.exc_info:
+            record.exc_text = record.exc_text or self.traceback_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        for name, value in record.__dict__.items():
+            if name not in RECORD_ATTRS and isinstance(value, dict | list | set):
+                record.__dict__[name] = value.copy()
+        return record
+
+
+def get_formatter() -> logging.Formatter:
+    if OrjsonFormatter is not None:
+        return OrjsonFormatter(fmt=LOG_FORMAT, datefmt=LOG_DATE_FORMAT)
+    return JsonFormatter(fmt=LOG_FORMAT, datefmt=LOG_DATE_FORMAT)
+
 
 def setup_logger() -> None:
     root_logger = logging.getLogger()
@@ -10,11 +90,15 @@ def setup_logger() -> None:
     root_logger.handlers.clear()
 
     log_handler = logging.StreamHandler()
-    formatter = JsonFormatter(
-        fmt="[%(asctime)s %(levelname)-5s] %(message)s [%(filename)s:%(lineno)d]",
-        datefmt="%Y-%m-%dT%H:%M:%SZ",
-    )
-    log_handler.setFormatter(formatter)
+    log_handler.setFormatter(get_formatter())
+    if logging_config.QUEUE_ENABLED:
+        queue = SimpleQueue()
+        listener = QueueListener(queue, log_handler, respect_handler_level=True)
+        listener.start()
+        atexit.register(listener.stop)  # Flushing the queued records on shutdown
+        log_handler = DeferredFormattingQueueHandler(queue)
+    # Sampling before the records are enqueued, so the dropped ones cost as little as possible
+    log_handler.addFilter(SamplingFilter(logging_config.SAMPLING_RATES))
 
     root_logger.addHandler(log_handler)
 
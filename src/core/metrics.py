@@ -0,0 +1,84 @@
+import os
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+from src.core.config import metrics_config
+
+# Bounding the label values: paths not matching any route are reported under a single one
+UNMATCHED_ROUTE = "<unmatched>"
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Duration of the HTTP requests by route template.",
+    ("method", "route", "status"),
+    buckets=metrics_config.LATENCY_BUCKETS,
+)
+# Summed over the live workers only, the in-flight requests of a dead worker aren't in flight anymore
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "HTTP requests being processed by route template.",
+    ("method", "route"),
+    multiprocess_mode="livesum",
+)
+
+RESPONSE_CACHE_REQUESTS = Counter(
+    "response_cache_requests",
+    "Lookups of the response cache by result (hit/stale/miss).",
+    ("result",),
+)
+RESPONSE_CACHE_BYTES = Counter(
+    "response_cache_bytes",
+    "Bytes read from and written to the response cache by tier (local/redis).",
+    ("operation", "tier"),
+)
+
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds",
+    "Duration of the database queries by engine and statement type, its count is the number of the queries.",
+    ("engine", "statement"),
+    buckets=metrics_config.LATENCY_BUCKETS,
+)
+DB_QUERY_ERRORS = Counter(
+    "db_query_errors",
+    "Failed database queries by engine and statement type.",
+    ("engine", "statement"),
+)
+
+OUTBOUND_REQUEST_DURATION = Histogram(
+    "http_client_request_duration_seconds",
+    "Duration of the outbound HTTP requests by host, a status of 0 stands for a transport error.",
+    ("host", "method", "status"),
+    buckets=metrics_config.LATENCY_BUCKETS,
+)
+
+
+def generate_metrics() -> tuple[bytes, str]:
+    """
+    Metrics in the Prometheus text format. With several workers, i.e. PROMETHEUS_MULTIPROC_DIR set, the metrics of
+    every worker are read from the shared directory and aggregated, so any worker serves the metrics of all of them.
+    :return: Metrics along with their content type.
+    """
+    if not metrics_config.MULTIPROC_DIR:
+        return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead() -> None:
+    """
+    Drops the live gauges of the current worker on its shutdown, e.g. its in-flight requests, so they aren't summed
+    with the ones of the live workers.
+    """
+    if metrics_config.MULTIPROC_DIR:
+        multiprocess.mark_process_dead(os.getpid())
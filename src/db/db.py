@@ -1,25 +1,59 @@
 from collections.abc import AsyncGenerator
 
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
 from src.core.config import postgres_config
+from src.db.enums.replica_selection_enum import ReplicaSelectionEnum
+from src.db.pool_metrics import InstrumentedAsyncAdaptedQueuePool, instrument_pool
+from src.db.query_metrics import instrument_queries
+from src.db.routing_session import ReplicaSelector, RoutingSession
 
 SQLALCHEMY_DATABASE_URL = postgres_config.CONN_STRING
 
 Base = declarative_base()
 
-engine = create_async_engine(
-    SQLALCHEMY_DATABASE_URL,
-    echo=False,
-)
+
+def create_engine(conn_string: str, name: str) -> AsyncEngine:
+    """
+    :param conn_string: Connection string of the database.
+    :param name: Name of the engine and of its pool, their metrics are reported under it.
+    """
+    instrumented_engine = create_async_engine(
+        conn_string,
+        echo=False,
+        poolclass=InstrumentedAsyncAdaptedQueuePool,
+        pool_size=postgres_config.POOL_SIZE,
+        max_overflow=postgres_config.MAX_OVERFLOW,
+        pool_timeout=postgres_config.POOL_TIMEOUT,
+        pool_recycle=postgres_config.POOL_RECYCLE,
+        pool_pre_ping=postgres_config.POOL_PRE_PING,
+        pool_logging_name=name,
+        connect_args={"statement_cache_size": postgres_config.STATEMENT_CACHE_SIZE},
+    )
+    instrument_pool(instrumented_engine.sync_engine.pool)
+    instrument_queries(instrumented_engine.sync_engine, name)
+    return instrumented_engine
+
+
+engine = create_engine(SQLALCHEMY_DATABASE_URL, name="primary")
+
+replica_engines = [
+    create_engine(conn_string, name=f"replica-{index}")
+    for index, conn_string in enumerate(postgres_config.REPLICA_CONN_STRINGS)
+]
 
 async_session = sessionmaker(
     engine,
     class_=AsyncSession,
     expire_on_commit=False,
     autoflush=True,
+    sync_session_class=RoutingSession,
+    replica_selector=ReplicaSelector(
+        [replica.sync_engine for replica in replica_engines],
+        ReplicaSelectionEnum(postgres_config.REPLICA_SELECTION),
+    ),
 )
 
 
@@ -0,0 +1,6 @@
+from src.core.enums.base_enum import BaseEnum
+
+
+class ReplicaSelectionEnum(BaseEnum):
+    ROUND_ROBIN = "round_robin"
+    LEAST_CONNECTIONS = "least_connections"  # The replica with the fewest connections checked out of its pool
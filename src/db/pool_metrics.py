@@ -0,0 +1,102 @@
+import bisect
+import time
+from typing import Any
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, ConnectionPoolEntry, Pool
+
+# Upper bounds of the checkout wait-time histogram buckets, in seconds
+WAIT_TIME_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class PoolMetrics:
+    """
+    Checkout metrics of a connection pool, the in-use and idle gauges are read from the pool itself.
+    """
+
+    def __init__(self, buckets: tuple[float, ...] = WAIT_TIME_BUCKETS) -> None:
+        self.buckets = buckets
+        self.bucket_counts = [0] * (len(buckets) + 1)  # The last bucket counts the waits above the highest bound
+        self.wait_time_sum = 0.0
+        self.wait_time_count = 0
+        self.checkouts = 0
+        self.timeouts = 0
+        self.connects = 0
+        self.invalidations = 0
+
+    def observe_wait_time(self, seconds: float) -> None:
+        self.bucket_counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.wait_time_sum += seconds
+        self.wait_time_count += 1
+
+    def snapshot(self, pool: Pool) -> dict[str, Any]:
+        """
+        :return: Current gauges of the pool along with the counters and the cumulative wait-time histogram.
+        """
+        cumulative_count, histogram = 0, {}
+        for bound, count in zip((*self.buckets, "+Inf"), self.bucket_counts, strict=True):
+            cumulative_count += count
+            histogram[str(bound)] = cumulative_count
+        return {
+            "size": pool.size(),
+            "in_use": pool.checkedout(),
+            "idle": pool.checkedin(),
+            "overflow": pool.overflow(),
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "connects": self.connects,
+            "invalidations": self.invalidations,
+            "wait_time": {"count": self.wait_time_count, "sum": self.wait_time_sum, "buckets": histogram},
+        }
+
+
+# Metrics by the pool logging name, kept across the pools recreated on dispose
+pool_metrics: dict[str, PoolMetrics] = {}
+
+
+def get_pool_metrics(pool: Pool) -> PoolMetrics:
+    return pool_metrics.setdefault(pool.logging_name or "default", PoolMetrics())
+
+
+class InstrumentedAsyncAdaptedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Queue pool timing how long the checkouts wait for a connection, SQLAlchemy has no event firing before a checkout.
+
+    The wait includes opening a new connection when the pool is allowed to grow, which is what the callers wait for.
+    """
+
+    def _do_get(self) -> ConnectionPoolEntry:
+        metrics = get_pool_metrics(self)
+        started_at = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            metrics.timeouts += 1
+            raise
+        finally:
+            metrics.observe_wait_time(time.perf_counter() - started_at)
+
+
+def instrument_pool(pool: Pool) -> PoolMetrics:
+    """
+    Counts the checkouts, connects and invalidations of the pool through the pool events, the listeners are carried
+    over to the pools recreated on dispose.
+
+    :param pool: Pool named with the engine pool_logging_name, so its metrics can be told apart.
+    :return: Metrics of the pool.
+    """
+    metrics = get_pool_metrics(pool)
+
+    @event.listens_for(pool, "checkout")
+    def record_checkout(*_: Any) -> None:
+        metrics.checkouts += 1
+
+    @event.listens_for(pool, "connect")
+    def record_connect(*_: Any) -> None:
+        metrics.connects += 1
+
+    @event.listens_for(pool, "invalidate")
+    def record_invalidation(*_: Any) -> None:
+        metrics.invalidations += 1
+
+    return metrics
@@ -0,0 +1,41 @@
+import time
+from typing import Any
+
+from sqlalchemy import Engine, event
+from sqlalchemy.engine import ExceptionContext
+
+from src.core.metrics import DB_QUERY_DURATION, DB_QUERY_ERRORS
+
+# Statement types reported, the rest (BEGIN, COMMIT, DDL...) fall into "other"
+STATEMENT_TYPES = frozenset(("select", "insert", "update", "delete", "with"))
+# Start times of the queries running on the connection, stacked as the events of nested executions interleave
+QUERY_STARTED_AT_KEY = "query_started_at"
+
+
+def get_statement_type(statement: str | None) -> str:
+    statement_type = next(iter((statement or "").lstrip()[:7].split(maxsplit=1)), "").lower()
+    return statement_type if statement_type in STATEMENT_TYPES else "other"
+
+
+def instrument_queries(engine: Engine, name: str) -> None:
+    """
+    Records the count and the duration of the queries, along with the failed ones, through the engine events.
+
+    :param engine: Synchronous engine, i.e. `AsyncEngine.sync_engine`.
+    :param name: Name of the engine the metrics are reported under.
+    """
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def start_timer(conn: Any, *_: Any) -> None:
+        conn.info.setdefault(QUERY_STARTED_AT_KEY, []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def record_query(conn: Any, _cursor: Any, statement: str, *_: Any) -> None:
+        duration = time.perf_counter() - conn.info[QUERY_STARTED_AT_KEY].pop()
+        DB_QUERY_DURATION.labels(name, get_statement_type(statement)).observe(duration)
+
+    @event.listens_for(engine, "handle_error")
+    def record_error(context: ExceptionContext) -> None:
+        if context.connection is not None and (started_at := context.connection.info.get(QUERY_STARTED_AT_KEY)):
+            started_at.pop()
+        DB_QUERY_ERRORS.labels(name, get_statement_type(context.statement)).inc()
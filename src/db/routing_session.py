@@ -0,0 +1,100 @@
+import itertools
+import time
+from collections.abc import Sequence
+from typing import Any
+
+from sqlalchemy import Engine, Select, event
+from sqlalchemy.orm import Mapper, Session
+
+from src.core.config import jwt_config, postgres_config
+from src.db.enums.replica_selection_enum import ReplicaSelectionEnum
+from src.utils.lru_ttl_cache import LRUTTLCache
+from src.utils.request_context import get_user_info
+from src.utils.sql_explain import Explain
+
+# Users who have recently written, their reads go to the primary until the replicas catch up
+recent_writers = LRUTTLCache(max_entries=10000, ttl=postgres_config.READ_YOUR_WRITES_WINDOW)
+
+
+class ReplicaSelector:
+    def __init__(self, replicas: Sequence[Engine], selection: ReplicaSelectionEnum) -> None:
+        """
+        :param replicas: Engines of the replicas.
+        :param selection: How a replica is chosen for a read.
+        """
+        self.replicas = replicas
+        self.selection = selection
+        self._round_robin = itertools.cycle(replicas)
+
+    def select(self) -> Engine:
+        if self.selection == ReplicaSelectionEnum.LEAST_CONNECTIONS:
+            return min(self.replicas, key=lambda replica: replica.pool.checkedout())
+        return next(self._round_robin)
+
+
+class RoutingSession(Session):
+    """
+    Session sending the reads to the replicas and the writes to the primary, the session bind.
+
+    The reads of a transaction go to a single replica, so they see the same state of the replication. Once the
+    session has written, everything up to the end of the transaction goes to the primary. After a committed
+    write, the reads of the session and of the same user stick to the primary for the read-your-writes window, so
+    the replication lag doesn't hide the writes.
+
+    Example usage:
+        sessionmaker(engine, class_=AsyncSession, sync_session_class=RoutingSession, replica_selector=selector)
+
+    """
+
+    def __init__(self, *args: Any, replica_selector: ReplicaSelector | None = None, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.replica_selector = replica_selector
+        self.in_write_transaction = False
+        self.last_write_at: float | None = None
+        # Replica of the current transaction, chosen on its first read
+        self.replica: Engine | None = None
+
+    def get_bind(self, mapper: Mapper | None = None, clause: Any = None, **kwargs: Any) -> Engine:
+        primary = super().get_bind(mapper, clause=clause, **kwargs)
+        if self.replica_selector is None or not self.replica_selector.replicas:
+            return primary
+        # The plan of a read is a read as well
+        if isinstance(clause, Explain):
+            clause = clause.statement
+        # Writes and SELECT ... FOR UPDATE pin the transaction to the primary
+        if self._flushing or getattr(clause, "is_dml", False) or getattr(clause, "_for_update_arg", None) is not None:
+            self.in_write_transaction = True
+            return primary
+        # The statements which can't be told apart, e.g. text ones, go to the primary without pinning the transaction
+        if not isinstance(clause, Select):
+            return primary
+        # Reads can be sent to the primary explicitly with the "primary" execution option
+        if self.in_write_transaction or clause.get_execution_options().get("primary") or self._is_reading_own_writes():
+            return primary
+        if self.replica is None:
+            self.replica = self.replica_selector.select()
+        return self.replica
+
+    def _is_reading_own_writes(self) -> bool:
+        window = postgres_config.READ_YOUR_WRITES_WINDOW.total_seconds()
+        if self.last_write_at is not None and time.monotonic() - self.last_write_at < window:
+            return True
+        user_id = get_user_info().get(jwt_config.JWT_USER_ID_CLAIM)
+        return user_id is not None and recent_writers.get(str(user_id)) is not None
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def record_write(session: RoutingSession) -> None:
+    session.replica = None
+    if not session.in_write_transaction:
+        return
+    session.in_write_transaction = False
+    session.last_write_at = time.monotonic()
+    if (user_id := get_user_info().get(jwt_config.JWT_USER_ID_CLAIM)) is not None:
+        recent_writers.set(str(user_id), session.last_write_at)
+
+
+@event.listens_for(RoutingSession, "after_rollback")
+def reset_write_transaction(session: RoutingSession) -> None:
+    session.in_write_transaction = False
+    session.replica = None
@@ -1,8 +1,25 @@
+from functools import cache
+
 from redis.asyncio import Redis
 
-from src.adapters.redis_adapter import RedisRequestCachingService
+from src.adapters.redis_adapter import RedisRequestCachingService, RedisTokenCachingService
+from src.core.config import redis_config
 from src.dependencies.redis_dependency import get_redis
+from src.utils.lru_ttl_cache import LRUTTLCache
 
 
+@cache  # A single service per process, so its local cache is shared and its stats can be reported
 def get_redis_request_caching_service() -> RedisRequestCachingService:
-    return RedisRequestCachingService(get_redis())
+    local_cache = None
+    if redis_config.LOCAL_CACHE_ENABLED:
+        local_cache = LRUTTLCache(
+            max_entries=redis_config.LOCAL_CACHE_MAX_ENTRIES,
+            max_bytes=redis_config.LOCAL_CACHE_MAX_BYTES,
+            ttl=redis_config.LOCAL_CACHE_TTL,
+        )
+    # Cached bodies are stored as raw bytes, possibly compressed, so the client mustn't decode them
+    return RedisRequestCachingService(get_redis(decode_responses=False), local_cache=local_cache)
+
+
+def get_redis_token_caching_service() -> RedisTokenCachingService:
+    return RedisTokenCachingService(get_redis(decode_responses=False))
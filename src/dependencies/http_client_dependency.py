@@ -0,0 +1,64 @@
+import importlib.util
+import logging
+
+from httpx import AsyncClient, AsyncHTTPTransport, Limits, Timeout
+
+from src.adapters.enums.http_cache_storage_enum import HTTPCacheStorageEnum
+from src.adapters.redis_adapter import RedisHTTPCachingService
+from src.core.config import http_client_config
+from src.dependencies.redis_dependency import get_redis
+from src.utils.http_cache import HTTPCache, HTTPCacheStorage, InMemoryHTTPCacheStorage
+
+logger = logging.getLogger(__name__)
+
+
+def get_http_client() -> AsyncClient:
+    """
+    :return: Client with the pooling of the config, the configured hosts get pools of their own.
+    """
+    http2 = http_client_config.HTTP2_ENABLED
+    if http2 and importlib.util.find_spec("h2") is None:
+        logger.warning("h2 is not installed, falling back to HTTP/1.1")
+        http2 = False
+
+    keepalive_expiry = http_client_config.KEEPALIVE_EXPIRY
+    mounts = {
+        f"all://{host}": AsyncHTTPTransport(
+            limits=Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=min(max_connections, http_client_config.MAX_KEEPALIVE_CONNECTIONS),
+                keepalive_expiry=keepalive_expiry,
+            ),
+            http2=http2,
+        )
+        for host, max_connections in http_client_config.HOST_MAX_CONNECTIONS.items()
+    }
+    return AsyncClient(
+        limits=Limits(
+            max_connections=http_client_config.MAX_CONNECTIONS,
+            max_keepalive_connections=http_client_config.MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=keepalive_expiry,
+        ),
+        timeout=Timeout(http_client_config.TIMEOUT, connect=http_client_config.CONNECT_TIMEOUT),
+        http2=http2,
+        mounts=mounts,
+    )
+
+
+def get_http_cache() -> HTTPCache | None:
+    if not http_client_config.CACHE_ENABLED:
+        return None
+
+    storage: HTTPCacheStorage
+    if HTTPCacheStorageEnum(http_client_config.CACHE_STORAGE) == HTTPCacheStorageEnum.REDIS:
+        storage = RedisHTTPCachingService(get_redis(decode_responses=False))
+    else:
+        storage = InMemoryHTTPCacheStorage(
+            max_entries=http_client_config.CACHE_MAX_ENTRIES,
+            max_bytes=http_client_config.CACHE_MAX_BYTES,
+        )
+    return HTTPCache(
+        storage,
+        max_entry_size=http_client_config.CACHE_MAX_ENTRY_SIZE,
+        retention=http_client_config.CACHE_RETENTION,
+    )
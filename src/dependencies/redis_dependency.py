@@ -3,5 +3,5 @@ from redis.asyncio import Redis
 from src.core.config import redis_config
 
 
-def get_redis() -> Redis:
-    return Redis(host=redis_config.HOST, port=redis_config.PORT, decode_responses=True)
+def get_redis(decode_responses: bool = True) -> Redis:
+    return Redis(host=redis_config.HOST, port=redis_config.PORT, decode_responses=decode_responses)
@@ -0,0 +1,24 @@
+from collections.abc import Callable
+
+from starlette import status
+
+from src.core.config import jwt_config
+from src.core.exceptions import ClientError
+from src.models.enums.user_role_enum import UserRoleEnum
+from src.utils.request_context import get_user_info
+
+
+def require_roles(*roles: UserRoleEnum) -> Callable[[], None]:
+    """
+    :param roles: Roles allowed to call the endpoint, any of them is enough.
+    :return: Dependency rejecting the requests whose token has none of the roles.
+    """
+    allowed_roles = {role.value for role in roles}
+
+    def check_roles() -> None:
+        role = get_user_info().get(jwt_config.JWT_ROLE_CLAIM)
+        user_roles = set(map(str, role)) if isinstance(role, list) else {str(role)}
+        if not user_roles & allowed_roles:
+            raise ClientError(status_code=status.HTTP_403_FORBIDDEN, content={"message": "Permission denied!"})
+
+    return check_roles
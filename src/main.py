@@ -1,3 +1,6 @@
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi_pagination import add_pagination
 from starlette.middleware import Middleware
@@ -5,14 +8,20 @@ from starlette.middleware.cors import CORSMiddleware
 from starlette_context import plugins
 from starlette_context.middleware import RawContextMiddleware
 
+from src.adapters.request_adapter import RequestService
+from src.api.metrics import router as metrics_router
 from src.api.middlewares.auth_middleware import AuthenticationMiddleware
 from src.api.middlewares.cache_middleware import CacheMiddleware
+from src.api.middlewares.metrics_middleware import MetricsMiddleware
+from src.api.responses import CodecJSONResponse
 from src.api.router import router
-from src.core.config import general_config, redis_config
+from src.core.config import general_config, metrics_config, redis_config
+from src.core.exceptions import AuthenticationError
 from src.core.exceptions.exception_handlers.middleware_exception_handlers import (
     authentication_error_exception_handler,
 )
 from src.core.logger import setup_logger
+from src.core.metrics import mark_process_dead
 from src.dependencies.cache_dependency import get_redis_request_caching_service
 
 setup_logger()
@@ -37,20 +46,41 @@ middlewares = [
         CacheMiddleware,
         caching_repository=get_redis_request_caching_service(),
         expire=redis_config.CACHE_TTL,
+        soft_expire=redis_config.CACHE_SOFT_TTL or None,
+        coalesce_timeout=redis_config.CACHE_COALESCE_TIMEOUT,
+        coalesce_fallback=redis_config.CACHE_COALESCE_FALLBACK,
+        lock_ttl=redis_config.CACHE_LOCK_TTL if redis_config.CACHE_LOCK_ENABLED else None,
     ),
 ]
+if metrics_config.ENABLED:  # Outermost, so the latency covers the other middlewares
+    middlewares.insert(0, Middleware(MetricsMiddleware))
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI) -> AsyncIterator[None]:
+    RequestService.start()
+    yield
+    await RequestService.close()
+    mark_process_dead()
+
 
 app = FastAPI(
     title="FastAPI Template",
+    lifespan=lifespan,
     middleware=middlewares,
+    default_response_class=CodecJSONResponse,
     openapi_url="/api/openapi.json",
     docs_url="/api/docs",
     debug=True,
     version="0.0.1",
 )
 app.openapi_version = "3.0.2"
+# Raised by the handlers, the authentication middleware handles its own errors
+app.add_exception_handler(AuthenticationError, authentication_error_exception_handler)
 
 add_pagination(app)
 app.include_router(router, prefix=api_prefix)
+if metrics_config.ENABLED:
+    app.include_router(metrics_router)
 
 from src.core.exceptions.exception_handlers.core_exception_handlers import *
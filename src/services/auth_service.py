@@ -1,19 +1,85 @@
+import hashlib
 import logging
+import time
+from datetime import timedelta
 
 import jwt
 from starlette import status
 
+from src.adapters.redis_adapter import RedisTokenCachingService
 from src.core.config import jwt_config
 from src.core.exceptions.exceptions import AuthenticationError
+from src.dependencies.cache_dependency import get_redis_token_caching_service
+from src.utils.lru_ttl_cache import LRUTTLCache
 
 logger = logging.getLogger(__name__)
 
+ASYMMETRIC_ALGORITHM_PREFIXES = ("RS", "ES", "PS", "EdDSA")
+
+
+def get_token_digest(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def get_claims_ttl(claims: dict) -> timedelta | None:
+    """
+    :return: Time the claims can be cached for, bounded by the token expiration, None if the token has expired.
+    """
+    if (expires_at := claims.get("exp")) is None:
+        return jwt_config.JWT_CLAIMS_CACHE_TTL
+    if (seconds := float(expires_at) - time.time()) <= 0:
+        return None
+    return min(timedelta(seconds=seconds), jwt_config.JWT_CLAIMS_CACHE_TTL)
+
 
 class AuthService:
-    @staticmethod
-    async def decode_token(token: str, verify_expiration: bool = True) -> dict:
+    # Verified claims by the token digest, so the signature isn't verified on every request
+    claims_cache: LRUTTLCache | None = (
+        LRUTTLCache(max_entries=jwt_config.JWT_CLAIMS_CACHE_MAX_ENTRIES, ttl=jwt_config.JWT_CLAIMS_CACHE_TTL)
+        if jwt_config.JWT_CLAIMS_CACHE_ENABLED
+        else None
+    )
+    # Verifying asymmetric signatures is expensive enough to share the verified claims across workers
+    use_shared_claims_cache = (
+        jwt_config.JWT_CLAIMS_CACHE_ENABLED
+        and jwt_config.JWT_CLAIMS_SHARED_CACHE_ENABLED
+        and jwt_config.JWT_ALGORITHM.startswith(ASYMMETRIC_ALGORITHM_PREFIXES)
+    )
+    use_denylist = jwt_config.JWT_DENYLIST_ENABLED
+    token_caching_service: RedisTokenCachingService | None = (
+        get_redis_token_caching_service() if use_shared_claims_cache or use_denylist else None
+    )
+
+    @classmethod
+    async def decode_token(cls, token: str, verify_expiration: bool = True) -> dict:
+        digest = get_token_digest(token)
+        # Claims verified without the expiration check aren't cached
+        claims = cls.claims_cache.get(digest) if cls.claims_cache is not None and verify_expiration else None
+        use_shared_claims_cache = cls.use_shared_claims_cache and verify_expiration and claims is None
+
+        revoked, shared_claims = False, None
+        if use_shared_claims_cache:
+            # Redis being unavailable, the claims are verified locally and the denylist isn't checked
+            result = await cls.token_caching_service.get_claims(digest, check_denylist=cls.use_denylist)
+            revoked, shared_claims = result or (False, None)
+        elif cls.use_denylist:
+            revoked = bool(await cls.token_caching_service.is_revoked(digest))
+
+        if revoked:
+            logger.error("The token is revoked!")
+            raise AuthenticationError(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                content={"message": "Token Revoked"},
+            )
+
+        if claims is None and shared_claims is not None:
+            claims = shared_claims
+            cls._cache_claims(digest, claims)
+        if claims is not None:
+            return dict(claims)  # Copying, so the callers can't alter the cached claims
+
         try:
-            return jwt.decode(
+            claims = jwt.decode(
                 jwt=token,
                 key=jwt_config.JWT_SECRET_KEY,
                 algorithms=[jwt_config.JWT_ALGORITHM],
@@ -32,6 +98,35 @@ class AuthService:
                 content={"message": "Authorization Failed"},
             ) from e
 
+        if verify_expiration:
+            cls._cache_claims(digest, claims)
+            if use_shared_claims_cache and (ttl := get_claims_ttl(claims)) is not None:
+                await cls.token_caching_service.set_claims(digest, claims, ttl)
+        return dict(claims)
+
+    @classmethod
+    def _cache_claims(cls, digest: str, claims: dict) -> None:
+        if cls.claims_cache is not None and (ttl := get_claims_ttl(claims)) is not None:
+            cls.claims_cache.set(digest, claims, ttl=ttl)
+
+    @classmethod
+    async def revoke_token(cls, token: str) -> None:
+        """
+        Adds the token to the denylist until it expires, so it's rejected by every worker.
+        """
+        digest = get_token_digest(token)
+        if cls.claims_cache is not None:
+            cls.claims_cache.pop(digest)
+        if not cls.use_denylist:
+            logger.warning("The denylist is disabled, the token stays valid until it expires")
+            return
+
+        claims = jwt.decode(jwt=token, options={"verify_signature": False})
+        if (expires_at := claims.get("exp")) is None:  # Tokens without the expiration stay on the denylist for good
+            await cls.token_caching_service.revoke(digest)
+        elif (seconds := float(expires_at) - time.time()) > 0:
+            await cls.token_caching_service.revoke(digest, timedelta(seconds=seconds))
+
     @staticmethod
     async def encode_token(payload: dict) -> str:
         return jwt.encode(payload, jwt_config.JWT_SECRET_KEY, algorithm=jwt_config.JWT_ALGORITHM)
@@ -0,0 +1,26 @@
+from collections.abc import AsyncIterable, AsyncIterator, Iterable
+from typing import TypeVar
+
+T = TypeVar("T")
+
+
+async def iterate_batches(items: Iterable[T] | AsyncIterable[T], batch_size: int) -> AsyncIterator[list[T]]:
+    """
+    Splits the items into lists of the batch size, the last one may be shorter. The items are consumed lazily, so
+    generators of any length can be passed.
+    """
+    batch = []
+    if isinstance(items, AsyncIterable):
+        async for item in items:
+            batch.append(item)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+    else:
+        for item in items:
+            batch.append(item)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
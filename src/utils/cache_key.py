@@ -0,0 +1,20 @@
+import hashlib
+from urllib.parse import parse_qsl, urlencode
+
+
+def canonicalize_query(query_string: str) -> str:
+    """
+    :return: Query string with the parameters sorted, so reordered parameters produce the same cache key.
+    """
+    return urlencode(sorted(parse_qsl(query_string, keep_blank_values=True)))
+
+
+def build_cache_key(path: str, query_string: str, scope: str) -> str:
+    """
+    :param path: Request path.
+    :param query_string: Raw query string of the request.
+    :param scope: Discriminator of the cache scope, e.g. "public" or "user:<id>".
+    :return: Fixed size cache key, so neither credentials nor user data end up in Redis key names.
+    """
+    canonical_request = f"{path}?{canonicalize_query(query_string)}\n{scope}"
+    return hashlib.blake2b(canonical_request.encode(), digest_size=16).hexdigest()
@@ -0,0 +1,100 @@
+from collections.abc import Callable
+from datetime import timedelta
+
+from pydantic import BaseModel, ConfigDict, model_validator
+from starlette.routing import BaseRoute, Match
+from starlette.types import Scope
+
+from src.api.middlewares.enums.cache_scope_enum import CacheScopeEnum
+from src.core.config import redis_config
+
+CACHE_POLICY_ATTRIBUTE = "__cache_policy__"
+
+
+class CachePolicy(BaseModel):
+    """
+    Caching rules of a route.
+
+    Within the soft TTL a cached response is fresh. Between the soft and the hard TTL it's stale: it's still served
+    right away, while a single background refresh updates it. After the hard TTL the entry is gone.
+
+    Entries are tagged with the resources the response is built from, so writes to them can invalidate the entries.
+
+    The scope defines who shares an entry: everybody (public), the users with the same role or a single user.
+
+    Routes with caching disabled, e.g. streaming ones, are passed through without recording their bodies.
+    """
+
+    model_config = ConfigDict(frozen=True)
+
+    enabled: bool = True
+    hard_ttl: timedelta = redis_config.CACHE_TTL
+    soft_ttl: timedelta | None = None
+    resources: tuple[str, ...] = ()
+    scope: CacheScopeEnum = CacheScopeEnum.USER
+
+    @model_validator(mode="after")
+    def validate_ttls(self) -> "CachePolicy":
+        if self.soft_ttl is not None and self.soft_ttl > self.hard_ttl:
+            msg = "Soft TTL can't be longer than the hard TTL"
+            raise ValueError(msg)
+        return self
+
+
+def cache_policy(**kwargs) -> Callable:
+    """
+    Overrides the caching rules of the decorated endpoint, see CachePolicy for the available options.
+
+    Example usage:
+        @router.get("/countries/")
+        @cache_policy(
+            soft_ttl=timedelta(minutes=5),
+            hard_ttl=timedelta(hours=1),
+            resources=("country",),
+            scope=CacheScopeEnum.PUBLIC,
+        )
+        async def get_countries():
+            ...
+
+    """
+    policy = CachePolicy(**kwargs)
+
+    def decorator(function: Callable) -> Callable:
+        setattr(function, CACHE_POLICY_ATTRIBUTE, policy)
+        return function
+
+    return decorator
+
+
+def resolve_route(scope: Scope) -> BaseRoute | None:
+    """
+    Finds the route the request will be routed to.
+
+    Middlewares run before routing, so the routes of the application are matched against the request here.
+    """
+    if (app := scope.get("app")) is None:
+        return None
+    for route in app.router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route
+    return None
+
+
+def get_cache_policy(route: BaseRoute | None) -> CachePolicy | None:
+    """
+    :return: Caching rules declared for the route endpoint with the cache_policy decorator, None if there are none.
+    """
+    return getattr(getattr(route, "endpoint", None), CACHE_POLICY_ATTRIBUTE, None)
+
+
+def route_tag(path: str) -> str:
+    return f"route:{path}"
+
+
+def resource_tag(resource: str) -> str:
+    return f"resource:{resource}"
+
+
+def user_tag(user_id: str) -> str:
+    return f"user:{user_id}"
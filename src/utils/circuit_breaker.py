@@ -0,0 +1,113 @@
+import time
+from collections import deque
+from datetime import timedelta
+
+from src.adapters.enums.circuit_state_enum import CircuitStateEnum
+
+
+class CircuitBreaker:
+    """
+    Rejects the calls to a failing dependency for a while instead of letting them pile up.
+
+    The circuit opens once the failure rate of the calls within the window reaches the threshold. After the open
+    duration, a few trial calls are let through: the circuit closes if all of them succeed and opens again otherwise.
+
+    Example usage:
+        if not breaker.acquire():
+            raise ServerError(...)
+        try:
+            result = await call()
+        except Exception:
+            breaker.record(success=False)
+            raise
+        breaker.record(success=True)
+
+    The breaker is not thread-safe, it's meant to be used from a single event loop.
+    """
+
+    def __init__(
+        self,
+        failure_rate_threshold: float,
+        window: timedelta,
+        min_calls: int,
+        open_duration: timedelta,
+        half_open_max_calls: int,
+    ) -> None:
+        """
+        :param failure_rate_threshold: Share of the failed calls opening the circuit, between 0 and 1.
+        :param window: Period the failure rate is computed over.
+        :param min_calls: Number of the calls within the window needed for the failure rate to be considered.
+        :param open_duration: How long the calls are rejected for once the circuit opens.
+        :param half_open_max_calls: Number of the trial calls deciding whether the circuit closes.
+        """
+        self.failure_rate_threshold = failure_rate_threshold
+        self.window = window.total_seconds()
+        self.min_calls = min_calls
+        self.open_duration = open_duration.total_seconds()
+        self.half_open_max_calls = half_open_max_calls
+
+        self._state = CircuitStateEnum.CLOSED
+        self._outcomes: deque[tuple[float, bool]] = deque()  # Time and success of the calls within the window
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_calls = 0
+        self._trial_successes = 0
+
+    @property
+    def state(self) -> CircuitStateEnum:
+        if self._state == CircuitStateEnum.OPEN and time.monotonic() - self._opened_at >= self.open_duration:
+            self._state = CircuitStateEnum.HALF_OPEN
+            self._trial_calls = self._trial_successes = 0
+        return self._state
+
+    def acquire(self) -> bool:
+        """
+        :return: Whether the call may go through, the outcome of an allowed call has to be recorded or released.
+        """
+        state = self.state
+        if state == CircuitStateEnum.CLOSED:
+            return True
+        if state == CircuitStateEnum.HALF_OPEN and self._trial_calls < self.half_open_max_calls:
+            self._trial_calls += 1
+            return True
+        return False
+
+    def release(self) -> None:
+        """
+        Gives back the permission of a call which ended without an outcome, e.g. cancelled.
+        """
+        if self._state == CircuitStateEnum.HALF_OPEN:
+            self._trial_calls = max(self._trial_calls - 1, 0)
+
+    def record(self, success: bool) -> None:
+        if self._state == CircuitStateEnum.HALF_OPEN:
+            if not success:
+                self._open()
+            elif (trial_successes := self._trial_successes + 1) >= self.half_open_max_calls:
+                self._close()
+            else:
+                self._trial_successes = trial_successes
+            return
+        if self._state == CircuitStateEnum.OPEN:
+            return  # Outcome of a call started before the circuit opened
+
+        now = time.monotonic()
+        self._outcomes.append((now, success))
+        self._failures += not success
+        while self._outcomes and self._outcomes[0][0] <= now - self.window:
+            _, expired_success = self._outcomes.popleft()
+            self._failures -= not expired_success
+        calls = len(self._outcomes)
+        if calls >= self.min_calls and self._failures / calls >= self.failure_rate_threshold:
+            self._open()
+
+    def _open(self) -> None:
+        self._state = CircuitStateEnum.OPEN
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
+        self._failures = 0
+
+    def _close(self) -> None:
+        self._state = CircuitStateEnum.CLOSED
+        self._outcomes.clear()
+        self._failures = 0
@@ -0,0 +1,75 @@
+import json
+import logging
+from typing import Any, Protocol
+
+logger = logging.getLogger(__name__)
+
+
+class Codec(Protocol):
+    name: str
+
+    def encode(self, data: Any) -> bytes: ...
+
+    def decode(self, data: bytes) -> Any: ...
+
+
+class JSONCodec:
+    name = "json"
+
+    def encode(self, data: Any) -> bytes:
+        return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode()
+
+    def decode(self, data: bytes) -> Any:
+        return json.loads(data)
+
+
+# Ordered by preference, the JSON codec is always available
+CODECS: dict[str, Codec] = {}
+
+try:
+    import orjson
+
+    class OrjsonCodec:
+        name = "orjson"
+
+        def encode(self, data: Any) -> bytes:
+            # Serializing the non-str keys as the json module does, e.g. {1: "a"} as {"1": "a"}
+            return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+
+        def decode(self, data: bytes) -> Any:
+            return orjson.loads(data)
+
+    CODECS[OrjsonCodec.name] = OrjsonCodec()
+except ImportError:
+    logger.debug("orjson is not installed, the orjson codec is disabled")
+
+try:
+    import msgpack
+
+    class MsgpackCodec:
+        name = "msgpack"
+
+        def encode(self, data: Any) -> bytes:
+            return msgpack.packb(data)
+
+        def decode(self, data: bytes) -> Any:
+            return msgpack.unpackb(data)
+
+    CODECS[MsgpackCodec.name] = MsgpackCodec()
+except ImportError:
+    logger.debug("msgpack is not installed, the msgpack codec is disabled")
+
+CODECS[JSONCodec.name] = JSONCodec()
+
+# The fastest available codec producing JSON, e.g. for response bodies
+JSON_CODEC: Codec = CODECS.get("orjson", CODECS[JSONCodec.name])
+
+
+def get_codec(name: str) -> Codec:
+    """
+    :return: Codec with the name, the JSON one if it isn't available.
+    """
+    if (codec := CODECS.get(name)) is None:
+        logger.warning("The codec isn't available, falling back to JSON", extra={"codec": name})
+        return CODECS[JSONCodec.name]
+    return codec
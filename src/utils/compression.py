@@ -0,0 +1,88 @@
+import logging
+import zlib
+from collections.abc import Callable, Collection
+
+logger = logging.getLogger(__name__)
+
+# Ordered by preference, used when the client accepts several encodings with the same quality
+COMPRESSORS: dict[str, Callable[[bytes], bytes]] = {}
+
+try:
+    import zstandard
+
+    COMPRESSORS["zstd"] = zstandard.ZstdCompressor(level=3).compress
+except ImportError:
+    logger.debug("zstandard is not installed, zstd compression is disabled")
+
+try:
+    import brotli
+
+    COMPRESSORS["br"] = lambda data: brotli.compress(data, quality=5)
+except ImportError:
+    logger.debug("brotli is not installed, br compression is disabled")
+
+
+def gzip_compress(data: bytes) -> bytes:
+    """
+    Compresses the data with a window no bigger than the data, as a bigger one doesn't compress better while the
+    state of the compressor, ~300KiB with the defaults, grows with the window and the memory level.
+    """
+    window_bits = max(9, min(15, (len(data) - 1).bit_length()))
+    # 16 + window bits for the gzip container, the memory level barely changes the ratio of the JSON bodies
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + window_bits, max(1, window_bits - 9))
+    return compressor.compress(data) + compressor.flush()
+
+
+COMPRESSORS["gzip"] = gzip_compress
+
+COMPRESSIBLE_MEDIA_TYPES = ("application/json", "application/javascript", "application/xml", "image/svg+xml")
+
+
+def is_compressible(content_type: str | None) -> bool:
+    media_type = (content_type or "").split(";", 1)[0].strip().lower()
+    return (
+        media_type.startswith("text/")
+        or media_type.endswith(("+json", "+xml"))
+        or media_type in COMPRESSIBLE_MEDIA_TYPES
+    )
+
+
+def compress(data: bytes, encodings: Collection[str]) -> dict[str, bytes]:
+    """
+    Compresses the data with every available encoding out of the passed ones.
+    :return: Compressed variants by encoding, the ones not smaller than the data itself are skipped.
+    """
+    variants = {}
+    for encoding, compressor in COMPRESSORS.items():
+        if encoding in encodings and len(compressed := compressor(data)) < len(data):
+            variants[encoding] = compressed
+    return variants
+
+
+def parse_accept_encoding(accept_encoding: str | None) -> list[str]:
+    """
+    :return: Supported encodings acceptable by the client, the most preferred first.
+    """
+    if not accept_encoding:
+        return []
+
+    qualities = {}
+    for item in accept_encoding.split(","):
+        encoding, _, parameters = item.strip().partition(";")
+        quality = 1.0
+        name, _, value = parameters.strip().partition("=")
+        if name.strip().lower() == "q":
+            try:
+                quality = float(value)
+            except ValueError:
+                continue
+        qualities[encoding.strip().lower()] = quality
+
+    wildcard_quality = qualities.get("*", 0.0)
+    preference = list(COMPRESSORS)
+    acceptable = [
+        (quality, -preference.index(encoding), encoding)
+        for encoding in COMPRESSORS
+        if (quality := qualities.get(encoding, wildcard_quality)) > 0
+    ]
+    return [encoding for *_, encoding in sorted(acceptable, reverse=True)]
@@ -0,0 +1,33 @@
+import base64
+import binascii
+import json
+from collections.abc import Sequence
+from typing import Any
+
+from pydantic_core import to_jsonable_python
+
+from src.adapters.enums.cursor_direction_enum import CursorDirectionEnum
+
+
+def encode_cursor(values: Sequence[Any], direction: CursorDirectionEnum) -> str:
+    """
+    :param values: Values of the key columns of the row the page starts after.
+    :param direction: Whether the page holds the rows after or before the row.
+    :return: Opaque URL-safe cursor.
+    """
+    payload = json.dumps([direction.value, to_jsonable_python(values)], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str) -> tuple[list[Any], CursorDirectionEnum]:
+    """
+    :return: Values of the key columns, JSON-compatible, and the direction of the page.
+    :raises ValueError: If the cursor is malformed.
+    """
+    try:
+        payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        direction, values = json.loads(payload)
+        return values, CursorDirectionEnum(direction)
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError) as e:
+        msg = "Malformed cursor"
+        raise ValueError(msg) from e
@@ -0,0 +1,25 @@
+import hashlib
+
+
+def compute_etag(body: bytes) -> str:
+    """
+    :return: Strong entity tag derived from the body content.
+    """
+    return f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def encoded_etag(etag: str, encoding: str) -> str:
+    """
+    :return: Entity tag of the body compressed with the encoding, derived from the entity tag of the identity body.
+    """
+    return f'{etag[:-1]}-{encoding}"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """
+    Evaluates the If-None-Match header against the entity tag, using the weak comparison as required by RFC 9110.
+    """
+    if if_none_match.strip() == "*":
+        return True
+    opaque_tag = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque_tag for candidate in if_none_match.split(","))
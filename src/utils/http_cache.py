@@ -0,0 +1,251 @@
+import asyncio
+import hashlib
+import logging
+import time
+from collections.abc import Awaitable, Callable, Mapping
+from datetime import timedelta
+from typing import NamedTuple, Protocol
+
+from httpx import URL, Request, Response, codes
+
+from src.utils.cache_key import canonicalize_query
+from src.utils.lru_ttl_cache import LRUTTLCache
+
+logger = logging.getLogger(__name__)
+
+# Describing the body as it was received, while the cached body is the decoded one
+DROPPED_HEADERS = frozenset(("content-encoding", "content-length", "transfer-encoding", "connection", "keep-alive"))
+
+
+class CacheControl(NamedTuple):
+    max_age: int = 0
+    stale_while_revalidate: int = 0
+    no_store: bool = False
+    no_cache: bool = False
+
+
+def parse_seconds(value: str | None) -> int:
+    try:
+        return max(int(value or 0), 0)
+    except ValueError:
+        return 0
+
+
+def parse_cache_control(value: str | None) -> CacheControl:
+    directives = {}
+    for directive in (value or "").split(","):
+        name, _, argument = directive.strip().partition("=")
+        directives[name.lower()] = argument.strip('"')
+
+    return CacheControl(
+        max_age=parse_seconds(directives.get("max-age")),
+        stale_while_revalidate=parse_seconds(directives.get("stale-while-revalidate")),
+        no_store="no-store" in directives,
+        no_cache="no-cache" in directives,
+    )
+
+
+class HTTPCacheStorage(Protocol):
+    async def get(self, key: str) -> dict | None: ...
+
+    async def set(self, key: str, entry: dict, expire: timedelta) -> None: ...
+
+
+class InMemoryHTTPCacheStorage:
+    def __init__(self, max_entries: int, max_bytes: int | None = None) -> None:
+        self.cache = LRUTTLCache(max_entries=max_entries, max_bytes=max_bytes)
+
+    async def get(self, key: str) -> dict | None:
+        return self.cache.get(key)
+
+    async def set(self, key: str, entry: dict, expire: timedelta) -> None:
+        self.cache.set(key, entry, size=len(entry["content"]), ttl=expire)
+
+
+class HTTPCache:
+    """
+    Private cache of the outbound GET responses following the HTTP caching semantics:
+        - responses are fresh for their max-age and served without a request
+        - stale responses within stale-while-revalidate are served while revalidated in the background
+        - later on, responses with an ETag or a Last-Modified header are revalidated with a conditional request, a 304
+          response refreshes the stored one
+    Responses marked no-store aren't stored, the ones marked no-cache are revalidated every time.
+    """
+
+    def __init__(self, storage: HTTPCacheStorage, max_entry_size: int, retention: timedelta) -> None:
+        """
+        :param storage: Storage of the entries.
+        :param max_entry_size: Bodies bigger than it aren't stored, in bytes.
+        :param retention: How long the responses which can be revalidated are kept after going stale.
+        """
+        self.storage = storage
+        self.max_entry_size = max_entry_size
+        self.retention = retention
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.stores = 0
+        self.skipped_too_large = 0
+        self._revalidating: dict[str, asyncio.Task] = {}  # Keeping the background revalidations referenced
+
+    @staticmethod
+    def build_key(url: str, params: Mapping | None = None, headers: Mapping | None = None) -> str:
+        """
+        :return: Key of the request, the request headers are a part of it, so responses to different credentials are
+        kept apart.
+        """
+        request_url = URL(url).copy_merge_params(params or {})
+        query = canonicalize_query(request_url.query.decode())
+        normalized_headers = sorted((name.lower(), str(value)) for name, value in (headers or {}).items())
+        canonical_request = f"{request_url.copy_with(query=None)}?{query}\n{normalized_headers!r}"
+        return hashlib.blake2b(canonical_request.encode(), digest_size=16).hexdigest()
+
+    async def fetch(self, key: str, url: str, send: Callable[[dict[str, str]], Awaitable[Response]]) -> Response:
+        """
+        :param key: Key of the request, see build_key.
+        :param url: URL of the request.
+        :param send: Sends the request with the extra headers passed, i.e. the conditional ones on revalidation.
+        :return: Cached response if it can be served, the upstream one otherwise.
+        """
+        if (entry := await self.storage.get(key)) is None:
+            self.misses += 1
+            response = await send({})
+            await self.store(key, response)
+            return response
+
+        if self.is_fresh(entry):
+            self.hits += 1
+            return self.build_response(entry, url)
+        if self.can_serve_stale(entry):
+            self.stale_hits += 1
+            if key not in self._revalidating:
+                task = asyncio.create_task(self._revalidate_in_background(key, entry, url, send))
+                self._revalidating[key] = task
+                task.add_done_callback(lambda _: self._revalidating.pop(key, None))
+            return self.build_response(entry, url)
+        return await self._revalidate(key, entry, url, send)
+
+    async def _revalidate(
+        self,
+        key: str,
+        entry: dict,
+        url: str,
+        send: Callable[[dict[str, str]], Awaitable[Response]],
+    ) -> Response:
+        response = await send(self.get_conditional_headers(entry))
+        if response.status_code == codes.NOT_MODIFIED:
+            self.revalidations += 1
+            return self.build_response(await self.refresh(key, entry, response), url)
+        self.misses += 1
+        await self.store(key, response)
+        return response
+
+    async def _revalidate_in_background(
+        self,
+        key: str,
+        entry: dict,
+        url: str,
+        send: Callable[[dict[str, str]], Awaitable[Response]],
+    ) -> None:
+        try:
+            await self._revalidate(key, entry, url, send)
+        except Exception as e:
+            logger.exception("Failed to revalidate the cached response", extra={"e": e, "url": url})
+
+    @staticmethod
+    def get_age(entry: dict) -> float:
+        return time.time() - entry["stored_at"]
+
+    @classmethod
+    def is_fresh(cls, entry: dict) -> bool:
+        return cls.get_age(entry) < entry["max_age"]
+
+    @classmethod
+    def can_serve_stale(cls, entry: dict) -> bool:
+        return cls.get_age(entry) < entry["max_age"] + entry["stale_while_revalidate"]
+
+    @staticmethod
+    def get_conditional_headers(entry: dict) -> dict[str, str]:
+        headers = {}
+        if entry["etag"]:
+            headers["if-none-match"] = entry["etag"]
+        if entry["last_modified"]:
+            headers["if-modified-since"] = entry["last_modified"]
+        return headers
+
+    async def store(self, key: str, response: Response) -> None:
+        """
+        Stores the response if its status and Cache-Control headers allow it.
+        """
+        cache_control = parse_cache_control(response.headers.get("cache-control"))
+        etag, last_modified = response.headers.get("etag"), response.headers.get("last-modified")
+        if response.status_code != codes.OK or cache_control.no_store:
+            return
+        if (cache_control.no_cache or not cache_control.max_age) and not (etag or last_modified):
+            return  # Would never be served
+        if len(response.content) > self.max_entry_size:
+            self.skipped_too_large += 1
+            return
+
+        entry = {
+            "status_code": response.status_code,
+            "headers": [(name, value) for name, value in response.headers.items() if name not in DROPPED_HEADERS],
+            "content": response.content,
+            "etag": etag,
+            "last_modified": last_modified,
+        }
+        await self._store_entry(key, entry, response)
+
+    async def refresh(self, key: str, entry: dict, not_modified_response: Response) -> dict:
+        """
+        Refreshes the entry revalidated with a 304 response, along with the headers it has updated.
+        :return: Refreshed entry.
+        """
+        updated_headers = dict(not_modified_response.headers.items())
+        headers = dict(entry["headers"])
+        headers.update((name, value) for name, value in updated_headers.items() if name not in DROPPED_HEADERS)
+        entry = {
+            **entry,
+            "headers": list(headers.items()),
+            "etag": updated_headers.get("etag", entry["etag"]),
+            "last_modified": updated_headers.get("last-modified", entry["last_modified"]),
+        }
+        return await self._store_entry(key, entry, not_modified_response)
+
+    async def _store_entry(self, key: str, entry: dict, response: Response) -> dict:
+        headers = dict(entry["headers"])
+        cache_control = parse_cache_control(headers.get("cache-control"))
+        max_age = 0 if cache_control.no_cache else cache_control.max_age
+        entry = {
+            **entry,
+            # The age of the response when received, e.g. from a CDN, counts against its max-age
+            "stored_at": time.time() - parse_seconds(response.headers.get("age")),
+            "max_age": max_age,
+            "stale_while_revalidate": 0 if cache_control.no_cache else cache_control.stale_while_revalidate,
+        }
+        expire = timedelta(seconds=max_age + entry["stale_while_revalidate"])
+        if entry["etag"] or entry["last_modified"]:
+            expire += self.retention
+        await self.storage.set(key, entry, expire)
+        self.stores += 1
+        return entry
+
+    @staticmethod
+    def build_response(entry: dict, url: str) -> Response:
+        return Response(
+            status_code=entry["status_code"],
+            headers=entry["headers"],
+            content=entry["content"],
+            request=Request("GET", url),
+        )
+
+    def get_metrics(self) -> dict[str, int]:
+        return {
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "revalidations": self.revalidations,
+            "stores": self.stores,
+            "skipped_too_large": self.skipped_too_large,
+        }
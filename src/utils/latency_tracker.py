@@ -0,0 +1,38 @@
+import math
+from collections import deque
+from collections.abc import Hashable
+
+
+class LatencyTracker:
+    """
+    Keeps the latest latencies by key, e.g. by the host, to derive their quantiles.
+
+    The tracker is not thread-safe, it's meant to be used from a single event loop.
+    """
+
+    def __init__(self, window: int, min_samples: int = 1) -> None:
+        """
+        :param window: Number of the latest latencies kept by key.
+        :param min_samples: Number of the latencies needed for a quantile to be computed.
+        """
+        self.window = window
+        self.min_samples = min_samples
+        self._latencies: dict[Hashable, deque[float]] = {}
+
+    def observe(self, key: Hashable, seconds: float) -> None:
+        if (latencies := self._latencies.get(key)) is None:
+            latencies = self._latencies[key] = deque(maxlen=self.window)
+        latencies.append(seconds)
+
+    def quantile(self, key: Hashable, quantile: float) -> float | None:
+        """
+        :return: Latency below which the quantile of the latencies falls, None if there aren't enough of them.
+        """
+        latencies = self._latencies.get(key, ())
+        if len(latencies) < self.min_samples:
+            return None
+        ordered = sorted(latencies)
+        return ordered[min(len(ordered) - 1, math.ceil(quantile * len(ordered)) - 1)]
+
+    def clear(self) -> None:
+        self._latencies.clear()
@@ -0,0 +1,96 @@
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from datetime import timedelta
+from typing import Any
+
+
+class LRUTTLCache:
+    """
+    Bounded in-process cache evicting the least recently used entries once either the entries count or the total size
+    cap is reached. Every entry expires after its TTL.
+
+    The cache is not thread-safe, it's meant to be used from a single event loop.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int | None = None, ttl: timedelta | None = None) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl.total_seconds() if ttl else None
+
+        self._entries: OrderedDict[Hashable, tuple[Any, float | None, int]] = OrderedDict()
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, default: Any = None, is_usable: Callable[[Any], bool] | None = None) -> Any:
+        """
+        :param is_usable: Tells whether the stored value can be used by the caller, the default is returned and a miss
+        is counted if it can't.
+        """
+        if (entry := self._entries.get(key)) is None:
+            self.misses += 1
+            return default
+
+        value, expires_at, _ = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            self.pop(key)
+            self.misses += 1
+            return default
+        if is_usable is not None and not is_usable(value):
+            self.misses += 1
+            return default
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, size: int = 0, ttl: timedelta | None = None) -> bool:
+        """
+        Stores the value under the key.
+        :param key: Cache key.
+        :param value: Value to store.
+        :param size: Size of the value in bytes, accounted against the size cap.
+        :param ttl: Entry TTL, can only shorten the TTL the cache was configured with.
+        :return: Whether the value has been stored, values bigger than the whole size cap are skipped.
+        """
+        if self.max_bytes is not None and size > self.max_bytes:
+            return False
+
+        seconds = min(filter(None, (self.ttl, ttl.total_seconds() if ttl else None)), default=None)
+        self.pop(key)
+        self._entries[key] = (value, time.monotonic() + seconds if seconds else None, size)
+        self.size_bytes += size
+
+        while len(self._entries) > self.max_entries or (
+            self.max_bytes is not None and self.size_bytes > self.max_bytes
+        ):
+            _, (_, _, evicted_size) = self._entries.popitem(last=False)
+            self.size_bytes -= evicted_size
+            self.evictions += 1
+        return True
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        if (entry := self._entries.pop(key, None)) is None:
+            return default
+        value, _, size = entry
+        self.size_bytes -= size
+        return value
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.size_bytes = 0
+
+    @property
+    def stats(self) -> dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+            "size_bytes": self.size_bytes,
+        }
@@ -0,0 +1,9 @@
+from starlette_context import context
+
+
+def get_user_info() -> dict:
+    """
+    :return: Claims of the token verified by the authentication middleware, empty if there are none.
+    """
+    user_info = context.get("user_info") if context.exists() else None
+    return user_info if isinstance(user_info, dict) else {}
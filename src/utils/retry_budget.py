@@ -0,0 +1,40 @@
+import time
+from collections import deque
+from datetime import timedelta
+
+
+class RetryBudget:
+    """
+    Caps the retries to a share of the requests within a sliding window, so retries can't multiply the load on a
+    struggling dependency. A minimum number of retries is always allowed, so low traffic can still be retried.
+
+    The budget is not thread-safe, it's meant to be used from a single event loop.
+    """
+
+    def __init__(self, ratio: float, min_retries: int, window: timedelta) -> None:
+        """
+        :param ratio: Retries allowed per request within the window, e.g. 0.2 for a retry per 5 requests.
+        :param min_retries: Retries allowed within the window regardless of the number of the requests.
+        :param window: Period the requests and the retries are counted over.
+        """
+        self.ratio = ratio
+        self.min_retries = min_retries
+        self.window = window.total_seconds()
+        self._requests: deque[float] = deque()
+        self._retries: deque[float] = deque()
+
+    def record_request(self) -> None:
+        self._requests.append(time.monotonic())
+
+    def try_retry(self) -> bool:
+        """
+        :return: Whether a retry fits within the budget, the retry is accounted for if it does.
+        """
+        now = time.monotonic()
+        for timestamps in (self._requests, self._retries):
+            while timestamps and timestamps[0] <= now - self.window:
+                timestamps.popleft()
+        if len(self._retries) >= self.min_retries + self.ratio * len(self._requests):
+            return False
+        self._retries.append(now)
+        return True
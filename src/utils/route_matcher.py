@@ -0,0 +1,41 @@
+import re
+from collections.abc import Iterable
+
+PATH_PARAMETER_PATTERN = re.compile(r"\{[^/{}]+\}")
+
+
+class RouteMatcher:
+    """
+    Matches request paths against a set of rules compiled once, checked from the cheapest to the most expensive:
+        - exact paths, e.g. "/api/docs", looked up in a set
+        - prefixes ending with "*", e.g. "/static/*", checked with a single startswith call
+        - patterns with path parameters, e.g. "/api/v1/countries/{code}/", combined into a single regex, a parameter
+          matches a single path segment
+
+    Example usage:
+        matcher = RouteMatcher(("/api/docs", "/static/*", "/api/v1/countries/{code}/"))
+        matcher.matches("/static/logo.png")  # True
+
+    """
+
+    def __init__(self, rules: Iterable[str]) -> None:
+        exact_paths, prefixes, patterns = set(), [], []
+        for rule in rules:
+            if rule.endswith("*"):
+                prefixes.append(rule.removesuffix("*"))
+            elif PATH_PARAMETER_PATTERN.search(rule):
+                parts = PATH_PARAMETER_PATTERN.split(rule)
+                patterns.append("[^/]+".join(map(re.escape, parts)))
+            else:
+                exact_paths.add(rule)
+
+        self.exact_paths = frozenset(exact_paths)
+        self.prefixes = tuple(prefixes)
+        self.pattern = re.compile("|".join(f"(?:{pattern})" for pattern in patterns)) if patterns else None
+
+    def matches(self, path: str) -> bool:
+        return (
+            path in self.exact_paths
+            or (bool(self.prefixes) and path.startswith(self.prefixes))
+            or (self.pattern is not None and self.pattern.fullmatch(path) is not None)
+        )
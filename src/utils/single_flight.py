@@ -0,0 +1,47 @@
+import asyncio
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Any
+
+
+class SingleFlight:
+    """
+    Deduplicates concurrent calls sharing the same key within the event loop: the first caller executes the call,
+    the others wait for its outcome instead of executing the same call again.
+
+    Example usage:
+        if key in single_flight:
+            async with asyncio.timeout(5):
+                result = await single_flight.wait(key)
+        else:
+            result = await single_flight.do(key, compute)
+
+    """
+
+    def __init__(self) -> None:
+        self._calls: dict[Hashable, asyncio.Future] = {}
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._calls
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = future
+        try:
+            result = await func()
+        except BaseException as e:
+            future.set_exception(e if isinstance(e, Exception) else RuntimeError("The in-flight call was cancelled"))
+            future.exception()  # Marking the exception as retrieved, waiters re-raise it on their own
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._calls.pop(key, None)
+
+    async def wait(self, key: Hashable) -> Any:
+        """
+        Waits for the outcome of the in-flight call with the key.
+        :raises KeyError: There is no in-flight call with the key.
+        """
+        # Shielding, so a cancelled or timed out waiter doesn't cancel the call for the others
+        return await asyncio.shield(self._calls[key])
@@ -0,0 +1,69 @@
+import csv
+import io
+from collections.abc import AsyncIterable, AsyncIterator, Mapping, Sequence
+from typing import Any
+
+from pydantic_core import to_jsonable_python
+from starlette.responses import StreamingResponse
+
+from src.api.enums.export_format_enum import ExportFormatEnum
+from src.utils.codecs import JSON_CODEC
+
+MEDIA_TYPES = {
+    ExportFormatEnum.NDJSON: "application/x-ndjson",
+    ExportFormatEnum.CSV: "text/csv",
+}
+CHUNK_SIZE = 64 * 1024  # In bytes, rows are sent in chunks of about this size
+
+
+def _get_values(row: Any, columns: Sequence[str]) -> list:
+    if isinstance(row, Mapping):
+        return [row[column] for column in columns]
+    return [getattr(row, column) for column in columns]
+
+
+async def iterate_ndjson(rows: AsyncIterable[Any], columns: Sequence[str]) -> AsyncIterator[bytes]:
+    chunk, size = [], 0
+    async for row in rows:
+        line = JSON_CODEC.encode(to_jsonable_python(dict(zip(columns, _get_values(row, columns), strict=True)))) + b"\n"
+        chunk.append(line)
+        size += len(line)
+        if size >= CHUNK_SIZE:
+            yield b"".join(chunk)
+            chunk, size = [], 0
+    if chunk:
+        yield b"".join(chunk)
+
+
+async def iterate_csv(rows: AsyncIterable[Any], columns: Sequence[str]) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    async for row in rows:
+        writer.writerow(to_jsonable_python(_get_values(row, columns)))
+        if buffer.tell() >= CHUNK_SIZE:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def build_streaming_response(
+    rows: AsyncIterable[Any],
+    export_format: ExportFormatEnum,
+    columns: Sequence[str],
+    filename: str | None = None,
+) -> StreamingResponse:
+    """
+    Streams the rows as NDJSON or CSV while they are read, e.g. from PostgresAdapter.stream.
+    :param rows: Model objects or mappings.
+    :param export_format: Format of the body.
+    :param columns: Attributes or keys of the rows to export, in the order of the CSV columns.
+    :param filename: Name the file is downloaded with, without the extension.
+    """
+    iterate = iterate_ndjson if export_format == ExportFormatEnum.NDJSON else iterate_csv
+    headers = {}
+    if filename is not None:
+        headers["Content-Disposition"] = f'attachment; filename="{filename}.{export_format.value}"'
+    return StreamingResponse(iterate(rows, columns), media_type=MEDIA_TYPES[export_format], headers=headers)
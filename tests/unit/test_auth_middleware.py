@@ -0,0 +1,82 @@
+import pytest
+from fastapi import FastAPI, status
+from httpx import ASGITransport, AsyncClient
+from starlette_context import context
+from starlette_context.middleware import RawContextMiddleware
+
+from src.api.middlewares.auth_middleware import AuthenticationMiddleware
+from src.core.exceptions.exception_handlers.middleware_exception_handlers import (
+    authentication_error_exception_handler,
+)
+from src.services.auth_service import AuthService
+from src.utils.route_matcher import RouteMatcher
+
+
+@pytest.fixture
+def app():
+    app = FastAPI()
+
+    @app.get("/public/{code}/")
+    async def get_public(code: str):
+        return {"code": code}
+
+    @app.get("/private/")
+    async def get_private():
+        return {"user": context["user_info"]["sub"], "token": context["access_token"]}
+
+    app.add_middleware(
+        AuthenticationMiddleware,
+        on_error=authentication_error_exception_handler,
+        anonymous_endpoints=("/public/{code}/",),
+    )
+    app.add_middleware(RawContextMiddleware)
+    return app
+
+
+@pytest.mark.asyncio
+async def test_authenticated_requests_populate_context(app):
+    token = await AuthService.encode_token({"sub": "1"})
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get("/private/", headers={"Authorization": f"Bearer {token}"})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"user": "1", "token": token}
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    ("authorization", "message"),
+    [(None, "No Token"), ("Basic abc", "No Token"), ("Bearer invalid", "Authorization Failed")],
+)
+async def test_unauthenticated_requests_are_rejected(app, authorization, message):
+    headers = {"Authorization": authorization} if authorization else {}
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get("/private/", headers=headers)
+
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    assert response.json() == {"message": message}
+
+
+@pytest.mark.asyncio
+async def test_anonymous_endpoints_skip_authentication(app):
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get("/public/ua/")
+
+    assert response.status_code == status.HTTP_200_OK
+
+
+@pytest.mark.parametrize(
+    ("path", "expected"),
+    [
+        ("/api/docs", True),
+        ("/api/docs/", False),
+        ("/static/css/app.css", True),
+        ("/api/v1/countries/ua/", True),
+        ("/api/v1/countries/ua/cities/", False),
+        ("/api/v1/users/", False),
+    ],
+)
+def test_route_matcher(path, expected):
+    matcher = RouteMatcher(("/api/docs", "/static/*", "/api/v1/countries/{code}/"))
+
+    assert matcher.matches(path) is expected
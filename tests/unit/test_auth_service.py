@@ -0,0 +1,63 @@
+import time
+from datetime import timedelta
+
+import jwt
+import pytest
+
+from src.core.exceptions import AuthenticationError
+from src.services.auth_service import AuthService, get_claims_ttl
+from src.utils.lru_ttl_cache import LRUTTLCache
+
+
+@pytest.fixture
+def claims_cache(mocker):
+    cache = LRUTTLCache(max_entries=10, ttl=timedelta(minutes=5))
+    mocker.patch.object(AuthService, "claims_cache", cache)
+    mocker.patch.object(AuthService, "use_shared_claims_cache", False)
+    mocker.patch.object(AuthService, "use_denylist", False)
+    return cache
+
+
+@pytest.mark.asyncio
+async def test_verified_claims_are_cached(mocker, claims_cache):
+    token = await AuthService.encode_token({"sub": "1", "exp": int(time.time()) + 60})
+    decode = mocker.spy(jwt, "decode")
+
+    first = await AuthService.decode_token(token)
+    first["sub"] = "altered"
+    second = await AuthService.decode_token(token)
+
+    assert second["sub"] == "1"
+    assert decode.call_count == 1
+    assert len(claims_cache) == 1
+
+
+@pytest.mark.asyncio
+async def test_invalid_tokens_are_not_cached(claims_cache):
+    with pytest.raises(AuthenticationError):
+        await AuthService.decode_token("invalid")
+
+    assert len(claims_cache) == 0
+
+
+def test_claims_ttl_is_bounded_by_token_expiration():
+    assert get_claims_ttl({"exp": time.time() + 10}) <= timedelta(seconds=10)
+    assert get_claims_ttl({"exp": time.time() - 10}) is None
+
+
+@pytest.mark.asyncio
+async def test_revoked_tokens_are_rejected_even_if_cached(mocker, claims_cache):
+    token_caching_service = mocker.AsyncMock()
+    token_caching_service.is_revoked.return_value = False
+    mocker.patch.object(AuthService, "token_caching_service", token_caching_service)
+    mocker.patch.object(AuthService, "use_denylist", True)
+    token = await AuthService.encode_token({"sub": "1", "exp": int(time.time()) + 60})
+    await AuthService.decode_token(token)
+
+    await AuthService.revoke_token(token)
+    token_caching_service.is_revoked.return_value = True
+
+    with pytest.raises(AuthenticationError):
+        await AuthService.decode_token(token)
+    token_caching_service.revoke.assert_awaited_once()
+    assert token_caching_service.revoke.await_args.args[1] <= timedelta(seconds=60)
@@ -0,0 +1,334 @@
+import asyncio
+from datetime import timedelta
+
+import pytest
+import pytest_asyncio
+from fastapi import FastAPI, status
+from httpx import ASGITransport, AsyncClient
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse, StreamingResponse
+
+from src.api.middlewares.cache_middleware import CacheMiddleware
+from src.api.middlewares.enums.cache_scope_enum import CacheScopeEnum
+from src.utils.cache_policy import CachePolicy, cache_policy
+
+
+class FakeCachingRepository:
+    def __init__(self):
+        self.storage = {}
+        self.tags = {}
+
+    async def get_cache(self, key, encodings=()):
+        return self.storage.get(key)
+
+    async def get_cache_metadata(self, key):
+        if (response := self.storage.get(key)) is None:
+            return None
+        return {name: value for name, value in response.items() if name not in ("content", "variants")}
+
+    async def set_cache(self, key, response, expire, tags=()):
+        self.storage[key] = response
+        for tag in tags:
+            self.tags.setdefault(tag, set()).add(key)
+
+
+@pytest.fixture
+def caching_repository():
+    return FakeCachingRepository()
+
+
+@pytest.fixture
+def cached_app(caching_repository):
+    app = FastAPI()
+    app.state.calls = 0
+
+    @app.get("/items/")
+    async def get_items():
+        app.state.calls += 1
+        return JSONResponse({"items": ["ä", "b"]}, headers={"X-Custom": "value"})
+
+    @app.get("/slow/")
+    async def get_slow():
+        app.state.calls += 1
+        await asyncio.sleep(0.05)
+        return JSONResponse({"calls": app.state.calls})
+
+    @app.get("/reference/")
+    @cache_policy(soft_ttl=timedelta(seconds=10), hard_ttl=timedelta(seconds=60), resources=("reference",))
+    async def get_reference():
+        app.state.calls += 1
+        return JSONResponse({"calls": app.state.calls})
+
+    @app.get("/large/")
+    async def get_large():
+        app.state.calls += 1
+        return JSONResponse({"items": ["value"] * 1000})
+
+    @app.get("/countries/")
+    @cache_policy(scope=CacheScopeEnum.PUBLIC)
+    async def get_countries():
+        app.state.calls += 1
+        return JSONResponse({"calls": app.state.calls})
+
+    @app.get("/export/")
+    @cache_policy(enabled=False)
+    async def get_export():
+        app.state.calls += 1
+        return JSONResponse({"calls": app.state.calls})
+
+    @app.get("/missing/")
+    async def get_missing():
+        app.state.calls += 1
+        return JSONResponse({"detail": "Not found"}, status_code=status.HTTP_404_NOT_FOUND)
+
+    app.add_middleware(CacheMiddleware, caching_repository=caching_repository, expire=timedelta(seconds=60))
+    return app
+
+
+@pytest_asyncio.fixture
+async def cached_client(cached_app):
+    async with AsyncClient(
+        transport=ASGITransport(app=cached_app),
+        base_url="http://test",
+        headers={"Authorization": "Bearer token"},
+    ) as client:
+        yield client
+
+
+@pytest.mark.asyncio
+async def test_cache_hit_replays_status_headers_and_body(cached_app, cached_client, caching_repository):
+    first = await cached_client.get("/items/")
+    second = await cached_client.get("/items/")
+
+    assert cached_app.state.calls == 1
+    assert len(caching_repository.storage) == 1
+    assert second.status_code == first.status_code == status.HTTP_200_OK
+    assert second.content == first.content
+    assert second.json() == {"items": ["ä", "b"]}
+    assert second.headers["x-custom"] == "value"
+    assert second.headers["content-type"] == first.headers["content-type"]
+
+
+@pytest.mark.asyncio
+async def test_non_success_responses_are_not_cached(cached_app, cached_client, caching_repository):
+    await cached_client.get("/missing/")
+    response = await cached_client.get("/missing/")
+
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    assert cached_app.state.calls == 2
+    assert not caching_repository.storage
+
+
+@pytest.mark.asyncio
+async def test_anonymous_requests_bypass_cache(cached_app, caching_repository):
+    async with AsyncClient(transport=ASGITransport(app=cached_app), base_url="http://test") as client:
+        await client.get("/items/")
+        await client.get("/items/")
+
+    assert cached_app.state.calls == 2
+    assert not caching_repository.storage
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_are_coalesced(cached_app, cached_client):
+    responses = await asyncio.gather(*(cached_client.get("/slow/") for _ in range(5)))
+
+    assert cached_app.state.calls == 1
+    assert all(response.status_code == status.HTTP_200_OK for response in responses)
+    assert all(response.json() == {"calls": 1} for response in responses)
+
+
+@pytest.mark.asyncio
+async def test_coalesced_waiter_is_rejected_after_timeout(caching_repository):
+    app = FastAPI()
+
+    @app.get("/slow/")
+    async def get_slow():
+        await asyncio.sleep(0.1)
+        return JSONResponse({})
+
+    app.add_middleware(
+        CacheMiddleware,
+        caching_repository=caching_repository,
+        coalesce_timeout=timedelta(milliseconds=10),
+        coalesce_fallback="reject",
+    )
+    async with AsyncClient(
+        transport=ASGITransport(app=app),
+        base_url="http://test",
+        headers={"Authorization": "Bearer token"},
+    ) as client:
+        leader, waiter = await asyncio.gather(client.get("/slow/"), client.get("/slow/"))
+
+    assert leader.status_code == status.HTTP_200_OK
+    assert waiter.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+
+
+@pytest.mark.asyncio
+async def test_stale_response_is_served_and_refreshed_in_background(cached_app, cached_client, caching_repository):
+    first = await cached_client.get("/reference/")
+    fresh = await cached_client.get("/reference/")
+    (entry,) = caching_repository.storage.values()
+    entry["created_at"] -= 15
+
+    stale = await cached_client.get("/reference/")
+    await asyncio.sleep(0.01)  # Letting the background refresh finish
+    refreshed = await cached_client.get("/reference/")
+
+    assert first.headers["cache-status"] == "fastapi-template; fwd=uri-miss; stored"
+    assert fresh.headers["cache-status"].startswith("fastapi-template; hit; ttl=")
+    assert stale.json() == {"calls": 1}
+    assert stale.headers["cache-status"].endswith("fwd=stale")
+    assert int(stale.headers["age"]) >= 15
+    assert refreshed.json() == {"calls": 2}
+    assert cached_app.state.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_entries_are_registered_under_invalidation_tags(cached_client, caching_repository):
+    await cached_client.get("/reference/")
+    await cached_client.get("/items/")
+
+    assert set(caching_repository.tags) == {"resource:reference", "route:/reference/", "route:/items/"}
+
+
+@pytest.mark.asyncio
+async def test_matching_if_none_match_is_answered_with_not_modified(cached_app, cached_client):
+    first = await cached_client.get("/items/")
+    miss_revalidated = await cached_client.get("/slow/", headers={"If-None-Match": '"other"'})
+    not_modified = await cached_client.get("/items/", headers={"If-None-Match": first.headers["etag"]})
+    modified = await cached_client.get("/items/", headers={"If-None-Match": '"other"'})
+
+    assert first.headers["etag"]
+    assert miss_revalidated.status_code == status.HTTP_200_OK
+    assert not_modified.status_code == status.HTTP_304_NOT_MODIFIED
+    assert not_modified.content == b""
+    assert not_modified.headers["etag"] == first.headers["etag"]
+    assert modified.status_code == status.HTTP_200_OK
+    assert modified.content == first.content
+    assert cached_app.state.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_uncached_responses_get_etag(cached_app, caching_repository):
+    async with AsyncClient(transport=ASGITransport(app=cached_app), base_url="http://test") as client:
+        first = await client.get("/items/")
+        second = await client.get("/items/", headers={"If-None-Match": first.headers["etag"]})
+
+    assert second.status_code == status.HTTP_304_NOT_MODIFIED
+    assert not caching_repository.storage
+
+
+@pytest.mark.asyncio
+async def test_compressed_variant_is_served_to_accepting_clients(cached_app, cached_client, caching_repository):
+    first = await cached_client.get("/large/", headers={"Accept-Encoding": "gzip"})
+    compressed = await cached_client.get("/large/", headers={"Accept-Encoding": "gzip"})
+    identity = await cached_client.get("/large/", headers={"Accept-Encoding": "identity"})
+    not_modified = await cached_client.get(
+        "/large/",
+        headers={"Accept-Encoding": "gzip", "If-None-Match": compressed.headers["etag"]},
+    )
+
+    (entry,) = caching_repository.storage.values()
+    assert "gzip" in entry["variants"]
+    assert compressed.headers["content-encoding"] == "gzip"
+    assert compressed.headers["vary"] == "Accept-Encoding"
+    assert compressed.content == first.content
+    assert compressed.headers["etag"] != identity.headers["etag"]
+    assert "content-encoding" not in identity.headers
+    assert identity.content == first.content
+    assert not_modified.status_code == status.HTTP_304_NOT_MODIFIED
+    assert cached_app.state.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_only_loaded_variants_are_served(cached_app, cached_client, caching_repository):
+    await cached_client.get("/large/", headers={"Accept-Encoding": "gzip"})
+    identity = await cached_client.get("/large/", headers={"Accept-Encoding": "identity"})
+    # As the local cache filled from Redis by an identity request, holding the identity body only
+    (entry,) = caching_repository.storage.values()
+    entry["variants"] = {}
+
+    response = await cached_client.get("/large/", headers={"Accept-Encoding": "gzip"})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert "content-encoding" not in response.headers
+    assert response.headers["etag"] == identity.headers["etag"]
+    assert response.content == identity.content
+    assert cached_app.state.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_reordered_query_parameters_share_the_entry(cached_app, cached_client, caching_repository):
+    await cached_client.get("/items/?page=1&size=10")
+    await cached_client.get("/items/?size=10&page=1")
+
+    assert cached_app.state.calls == 1
+    assert all("token" not in key for key in caching_repository.storage)
+
+
+@pytest.mark.asyncio
+async def test_public_entries_are_shared_between_users(cached_app, cached_client):
+    async with AsyncClient(transport=ASGITransport(app=cached_app), base_url="http://test") as anonymous_client:
+        await cached_client.get("/countries/")
+        other_user = await cached_client.get("/countries/", headers={"Authorization": "Bearer other"})
+        anonymous = await anonymous_client.get("/countries/")
+        private = await anonymous_client.get("/items/")
+
+    assert other_user.headers["cache-status"].startswith("fastapi-template; hit")
+    assert anonymous.headers["cache-status"].startswith("fastapi-template; hit")
+    assert "cache-status" not in private.headers
+    assert cached_app.state.calls == 2
+
+
+@pytest.mark.parametrize(
+    ("scope", "claims", "expected"),
+    [
+        (CacheScopeEnum.PUBLIC, {}, "public"),
+        (CacheScopeEnum.USER, {"sub": "1", "role": "User"}, "user:1"),
+        (CacheScopeEnum.ROLE, {"sub": "1", "role": "User"}, "role:User"),
+        (CacheScopeEnum.ROLE, {"sub": "1", "role": ["User", "Admin"]}, "role:Admin,User"),
+        (CacheScopeEnum.ROLE, {"sub": "1"}, "user:1"),
+    ],
+)
+def test_cache_scope_is_derived_from_the_token_claims(mocker, scope, claims, expected):
+    mocker.patch("src.api.middlewares.cache_middleware.get_user_info", return_value=claims)
+    headers = Headers({"Authorization": "Bearer token"})
+
+    assert CacheMiddleware._get_cache_scope(CachePolicy(scope=scope), headers) == expected
+
+
+@pytest.mark.asyncio
+async def test_routes_with_caching_disabled_are_passed_through(cached_app, cached_client, caching_repository):
+    await cached_client.get("/export/")
+    await cached_client.get("/export/")
+
+    assert cached_app.state.calls == 2
+    assert not caching_repository.storage
+
+
+@pytest.mark.asyncio
+async def test_responses_over_max_body_size_are_passed_through(caching_repository):
+    app = FastAPI()
+
+    @app.get("/large/")
+    async def get_large():
+        return JSONResponse({"items": ["value"] * 1000})
+
+    @app.get("/stream/")
+    async def get_stream():
+        return StreamingResponse(iter([b"a" * 600] * 3), media_type="text/plain")
+
+    app.add_middleware(CacheMiddleware, caching_repository=caching_repository, max_body_size=1024)
+    async with AsyncClient(
+        transport=ASGITransport(app=app),
+        base_url="http://test",
+        headers={"Authorization": "Bearer token"},
+    ) as client:
+        large = await client.get("/large/")
+        stream = await client.get("/stream/")
+
+    assert large.json() == {"items": ["value"] * 1000}
+    assert "cache-status" not in large.headers
+    assert stream.content == b"a" * 1800
+    assert not caching_repository.storage
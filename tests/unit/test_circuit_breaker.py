@@ -0,0 +1,63 @@
+from datetime import timedelta
+
+import pytest
+
+from src.adapters.enums.circuit_state_enum import CircuitStateEnum
+from src.utils.circuit_breaker import CircuitBreaker
+from src.utils.retry_budget import RetryBudget
+
+
+@pytest.fixture
+def breaker():
+    return CircuitBreaker(
+        failure_rate_threshold=0.5,
+        window=timedelta(seconds=10),
+        min_calls=4,
+        open_duration=timedelta(seconds=30),
+        half_open_max_calls=2,
+    )
+
+
+def open_circuit(breaker):
+    for success in (True, False, True, False):
+        breaker.record(success=success)
+
+
+def test_circuit_opens_at_failure_rate_with_enough_calls(breaker):
+    for success in (False, False, False):
+        breaker.record(success=success)
+    assert breaker.state == CircuitStateEnum.CLOSED
+
+    breaker.record(success=True)
+
+    assert breaker.state == CircuitStateEnum.OPEN
+    assert not breaker.acquire()
+
+
+def test_half_open_circuit_closes_after_successful_trial_calls(mocker, breaker):
+    open_circuit(breaker)
+    mocker.patch("src.utils.circuit_breaker.time.monotonic", return_value=breaker._opened_at + 30)
+
+    assert [breaker.acquire() for _ in range(3)] == [True, True, False]
+    breaker.record(success=True)
+    breaker.record(success=True)
+
+    assert breaker.state == CircuitStateEnum.CLOSED
+
+
+def test_failed_trial_call_opens_circuit_again(mocker, breaker):
+    open_circuit(breaker)
+    mocker.patch("src.utils.circuit_breaker.time.monotonic", return_value=breaker._opened_at + 30)
+    breaker.acquire()
+
+    breaker.record(success=False)
+
+    assert breaker.state == CircuitStateEnum.OPEN
+
+
+def test_retry_budget_allows_share_of_requests():
+    budget = RetryBudget(ratio=0.5, min_retries=1, window=timedelta(seconds=10))
+    for _ in range(4):
+        budget.record_request()
+
+    assert [budget.try_retry() for _ in range(4)] == [True, True, True, False]
@@ -0,0 +1,30 @@
+import pytest
+
+from src.utils.codecs import CODECS, get_codec
+
+JSON_CODECS = {name: codec for name, codec in CODECS.items() if name != "msgpack"}
+
+
+@pytest.mark.parametrize("codec", CODECS.values(), ids=CODECS)
+def test_cache_metadata_round_trip(codec):
+    metadata = {
+        "status_code": 200,
+        "headers": [["content-type", "application/json"], ["x-custom", "ä"]],
+        "etag": '"abc"',
+        "encodings": ["gzip"],
+        "created_at": 1700000000.5,
+    }
+
+    encoded = codec.encode(metadata)
+
+    assert isinstance(encoded, bytes)
+    assert codec.decode(encoded) == metadata
+
+
+@pytest.mark.parametrize("codec", JSON_CODECS.values(), ids=JSON_CODECS)
+def test_non_str_keys_are_encoded_as_json_does(codec):
+    assert codec.decode(codec.encode({1: "a", "b": {2: "c"}})) == {"1": "a", "b": {"2": "c"}}
+
+
+def test_unavailable_codec_falls_back_to_json():
+    assert get_codec("unknown").name == "json"
@@ -0,0 +1,12 @@
+import gzip
+
+import pytest
+
+from src.utils.compression import gzip_compress
+
+
+@pytest.mark.parametrize("size", [1, 600, 9000, 200000])
+def test_gzip_variants_are_readable_by_any_gzip_decoder(size):
+    data = (b'{"id":1,"email":"user@example.com"}' * (size // 35 + 1))[:size]
+
+    assert gzip.decompress(gzip_compress(data)) == data
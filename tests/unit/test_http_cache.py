@@ -0,0 +1,96 @@
+import asyncio
+from datetime import timedelta
+
+import httpx
+import pytest
+
+from src.adapters.request_adapter import RequestService
+from src.utils.http_cache import HTTPCache, InMemoryHTTPCacheStorage, parse_cache_control
+
+
+@pytest.fixture
+def http_cache():
+    return HTTPCache(InMemoryHTTPCacheStorage(max_entries=10), max_entry_size=100, retention=timedelta(hours=1))
+
+
+@pytest.fixture
+def upstream(mocker, http_cache):
+    upstream = {"headers": {}, "requests": [], "content": b'{"rates": []}'}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        upstream["requests"].append(request)
+        if "etag" in upstream["headers"] and request.headers.get("if-none-match") == upstream["headers"]["etag"]:
+            return httpx.Response(304, headers=upstream["headers"])
+        return httpx.Response(200, headers=upstream["headers"], content=upstream["content"])
+
+    mocker.patch.object(RequestService, "client", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    mocker.patch.object(RequestService, "http_cache", http_cache)
+    return upstream
+
+
+def test_cache_control_is_parsed():
+    assert parse_cache_control('max-age="60", stale-while-revalidate=30, no-cache') == (60, 30, False, True)
+    assert parse_cache_control("max-age=invalid, no-store") == (0, 0, True, False)
+
+
+@pytest.mark.asyncio
+async def test_fresh_responses_are_served_without_request(upstream, http_cache):
+    upstream["headers"] = {"cache-control": "max-age=60"}
+
+    first = await RequestService.make_request("https://rates.com/latest", params={"base": "EUR"})
+    second = await RequestService.make_request("https://rates.com/latest", params={"base": "EUR"})
+
+    assert second.json() == first.json()
+    assert len(upstream["requests"]) == 1
+    assert (http_cache.hits, http_cache.misses) == (1, 1)
+
+
+@pytest.mark.asyncio
+async def test_stale_responses_are_revalidated_with_etag(upstream, http_cache):
+    upstream["headers"] = {"cache-control": "max-age=0", "etag": '"v1"'}
+
+    await RequestService.make_request("https://rates.com/latest")
+    response = await RequestService.make_request("https://rates.com/latest")
+
+    assert response.content == upstream["content"]
+    assert upstream["requests"][1].headers["if-none-match"] == '"v1"'
+    assert http_cache.revalidations == 1
+
+
+@pytest.mark.asyncio
+async def test_stale_responses_are_served_while_revalidated(upstream, http_cache):
+    upstream["headers"] = {"cache-control": "max-age=10, stale-while-revalidate=60"}
+    await RequestService.make_request("https://rates.com/latest")
+    entry = next(iter(http_cache.storage.cache._entries.values()))[0]
+    entry["stored_at"] -= 20
+    upstream["content"] = b'{"rates": [1]}'
+
+    response = await RequestService.make_request("https://rates.com/latest")
+    await asyncio.gather(*http_cache._revalidating.values())
+
+    assert response.content == b'{"rates": []}'
+    assert http_cache.stale_hits == 1
+    assert (await RequestService.make_request("https://rates.com/latest")).content == b'{"rates": [1]}'
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    ("cache_control", "content"),
+    [("no-store, max-age=60", b"{}"), ("max-age=60", b"x" * 101), ("no-cache", b"{}")],
+)
+async def test_uncacheable_responses_are_not_stored(upstream, http_cache, cache_control, content):
+    upstream["headers"], upstream["content"] = {"cache-control": cache_control}, content
+
+    await RequestService.make_request("https://rates.com/latest")
+    await RequestService.make_request("https://rates.com/latest")
+
+    assert len(upstream["requests"]) == 2
+    assert http_cache.stores == 0
+
+
+def test_request_headers_are_part_of_key():
+    assert HTTPCache.build_key("https://a.com/", {"b": 1, "a": 2}) == HTTPCache.build_key("https://a.com/?b=1&a=2")
+    assert HTTPCache.build_key("https://a.com/", headers={"Authorization": "1"}) != HTTPCache.build_key(
+        "https://a.com/",
+        headers={"Authorization": "2"},
+    )
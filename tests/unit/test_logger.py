@@ -0,0 +1,71 @@
+import logging
+from logging.handlers import QueueListener
+from queue import SimpleQueue
+
+import pytest
+
+from src.core.logger import DeferredFormattingQueueHandler, SamplingFilter, get_formatter
+
+
+def make_record(name: str, level: int = logging.INFO, msg: str = "message", args: tuple = ()) -> logging.LogRecord:
+    return logging.LogRecord(name, level, __file__, 1, msg, args, None)
+
+
+@pytest.mark.parametrize(
+    ("name", "level", "expected"),
+    [
+        ("src.api.middlewares.cache_middleware", logging.INFO, False),
+        ("src.api.middlewares.cache_middleware", logging.WARNING, True),
+        ("src.api.middlewares.auth_middleware", logging.DEBUG, False),
+        ("src.api.middlewares.auth_middleware.child", logging.INFO, True),
+        ("src.services", logging.INFO, True),
+    ],
+)
+def test_sampling_applies_to_closest_configured_logger(name, level, expected):
+    sampling_filter = SamplingFilter({"src.api.middlewares": 0, "src.api.middlewares.auth_middleware.child": 1})
+
+    assert sampling_filter.filter(make_record(name, level)) is expected
+
+
+def test_queued_records_are_formatted_by_listener(mocker):
+    queue = SimpleQueue()
+    handler = mocker.Mock(level=logging.NOTSET)
+    queue_handler = DeferredFormattingQueueHandler(queue)
+    format_ = mocker.spy(queue_handler, "format")
+    args = ["first"]
+
+    queue_handler.handle(make_record("src", msg="value: %s", args=(args,)))
+    args.append("changed")
+    listener = QueueListener(queue, handler)
+    listener.start()
+    listener.stop()
+
+    format_.assert_not_called()
+    assert handler.handle.call_args.args[0].getMessage() == "value: ['first']"
+
+
+def test_queued_records_capture_traceback_and_extras(mocker):
+    queue = SimpleQueue()
+    handler = mocker.Mock(level=logging.NOTSET)
+    logger = logging.getLogger("src.test_logger")
+    logger.addHandler(DeferredFormattingQueueHandler(queue))
+    extra = {"batch": [1]}
+
+    try:
+        1 / 0  # noqa: B018
+    except ZeroDivisionError:
+        logger.exception("Failed", extra={"extra": extra}, stack_info=True)
+    extra["batch"].append(2)
+    extra["changed"] = True
+    logger.handlers.clear()
+    listener = QueueListener(queue, handler)
+    listener.start()
+    listener.stop()
+
+    record = handler.handle.call_args.args[0]
+    formatted = get_formatter().format(record)
+    assert record.exc_info is None
+    assert "ZeroDivisionError: division by zero" in record.exc_text
+    assert record.extra == {"batch": [1, 2]}
+    assert "ZeroDivisionError: division by zero" in formatted
+    assert "test_queued_records_capture_traceback_and_extras" in formatted
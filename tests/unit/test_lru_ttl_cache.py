@@ -0,0 +1,50 @@
+from datetime import timedelta
+
+from src.utils.lru_ttl_cache import LRUTTLCache
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = LRUTTLCache(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats == {"hits": 3, "misses": 1, "evictions": 1, "entries": 2, "size_bytes": 0}
+
+
+def test_size_cap_is_enforced():
+    cache = LRUTTLCache(max_entries=10, max_bytes=10)
+
+    assert cache.set("a", "a", size=6)
+    assert cache.set("b", "b", size=6)
+    assert not cache.set("c", "c", size=11)
+    assert cache.get("a") is None
+    assert cache.size_bytes == 6
+
+
+def test_expired_entries_are_not_returned(mocker):
+    monotonic = mocker.patch("src.utils.lru_ttl_cache.time.monotonic", return_value=100.0)
+    cache = LRUTTLCache(max_entries=10, ttl=timedelta(seconds=30))
+    cache.set("a", 1)
+    cache.set("b", 2, ttl=timedelta(seconds=5))
+
+    monotonic.return_value = 110.0
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+
+    monotonic.return_value = 131.0
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_unusable_entries_are_counted_as_misses():
+    cache = LRUTTLCache(max_entries=10)
+    cache.set("a", {"usable": False})
+
+    assert cache.get("a", is_usable=lambda value: value["usable"]) is None
+    assert cache.get("a") == {"usable": False}
+    assert (cache.hits, cache.misses) == (1, 1)
@@ -0,0 +1,88 @@
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from prometheus_client import REGISTRY
+from sqlalchemy import create_engine, text
+
+from src.api.metrics import router as metrics_router
+from src.api.middlewares.metrics_middleware import MetricsMiddleware
+from src.core.metrics import UNMATCHED_ROUTE
+from src.db.query_metrics import get_statement_type, instrument_queries
+
+
+def get_sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+@pytest.fixture
+def metrics_app():
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+    app.include_router(metrics_router)
+
+    @app.get("/metrics-test/items/{item_id}/")
+    async def get_item(item_id: int):
+        return {"id": item_id}
+
+    @app.get("/metrics-test/failing/")
+    async def get_failing():
+        raise RuntimeError
+
+    return app
+
+
+@pytest.mark.asyncio
+async def test_requests_are_recorded_by_route_template(metrics_app):
+    labels = {"method": "GET", "route": "/metrics-test/items/{item_id}/", "status": "200"}
+    count = get_sample("http_request_duration_seconds_count", **labels)
+
+    async with AsyncClient(transport=ASGITransport(app=metrics_app), base_url="http://test") as client:
+        await client.get("/metrics-test/items/1/")
+        await client.get("/metrics-test/items/2/")
+
+    assert get_sample("http_request_duration_seconds_count", **labels) == count + 2
+    assert get_sample("http_requests_in_flight", method="GET", route="/metrics-test/items/{item_id}/") == 0
+
+
+@pytest.mark.asyncio
+async def test_unmatched_and_failing_requests_are_recorded(metrics_app):
+    unmatched = {"method": "GET", "route": UNMATCHED_ROUTE, "status": "404"}
+    failing = {"method": "GET", "route": "/metrics-test/failing/", "status": "500"}
+    unmatched_count = get_sample("http_request_duration_seconds_count", **unmatched)
+    failing_count = get_sample("http_request_duration_seconds_count", **failing)
+
+    transport = ASGITransport(app=metrics_app, raise_app_exceptions=False)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        await client.get("/metrics-test/unknown/")
+        await client.get("/metrics-test/failing/")
+
+    assert get_sample("http_request_duration_seconds_count", **unmatched) == unmatched_count + 1
+    assert get_sample("http_request_duration_seconds_count", **failing) == failing_count + 1
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint_exposes_the_text_format(metrics_app):
+    async with AsyncClient(transport=ASGITransport(app=metrics_app), base_url="http://test") as client:
+        await client.get("/metrics-test/items/1/")
+        response = await client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "# TYPE http_request_duration_seconds histogram" in response.text
+    assert 'route="/metrics-test/items/{item_id}/"' in response.text
+
+
+def test_queries_are_recorded_by_statement_type():
+    engine = create_engine("sqlite://")
+    instrument_queries(engine, "metrics-test")
+    labels = {"engine": "metrics-test", "statement": "select"}
+
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+        with pytest.raises(Exception, match="no such table"):
+            connection.execute(text("SELECT * FROM missing"))
+
+    assert get_sample("db_query_duration_seconds_count", **labels) == 1
+    assert get_sample("db_query_errors_total", **labels) == 1
+    assert get_statement_type("\n  WITH rows AS (SELECT 1) SELECT * FROM rows") == "with"
+    assert get_statement_type("BEGIN") == "other"
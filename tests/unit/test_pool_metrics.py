@@ -0,0 +1,63 @@
+import pytest
+from sqlalchemy import exc
+from sqlalchemy.util import greenlet_spawn
+
+from src.db.pool_metrics import InstrumentedAsyncAdaptedQueuePool, PoolMetrics, instrument_pool, pool_metrics
+
+
+@pytest.fixture
+def pool(mocker):
+    pool_metrics.pop("test", None)
+    pool = InstrumentedAsyncAdaptedQueuePool(
+        mocker.Mock,
+        pool_size=1,
+        max_overflow=0,
+        timeout=0.01,
+        logging_name="test",
+    )
+    instrument_pool(pool)
+    yield pool
+    pool_metrics.pop("test", None)
+
+
+def test_checkouts_are_counted_and_gauged(pool):
+    connection = pool.connect()
+
+    snapshot = pool_metrics["test"].snapshot(pool)
+
+    assert (snapshot["in_use"], snapshot["checkouts"], snapshot["connects"]) == (1, 1, 1)
+    assert snapshot["wait_time"]["count"] == 1
+    connection.close()
+    assert pool_metrics["test"].snapshot(pool)["idle"] == 1
+
+
+@pytest.mark.asyncio
+async def test_checkout_timeouts_are_counted(pool):
+    connection = await greenlet_spawn(pool.connect)
+
+    with pytest.raises(exc.TimeoutError):
+        await greenlet_spawn(pool.connect)
+
+    snapshot = pool_metrics["test"].snapshot(pool)
+    assert snapshot["timeouts"] == 1
+    assert snapshot["wait_time"]["count"] == 2
+    await greenlet_spawn(connection.close)
+
+
+def test_metrics_outlive_pool_recreation(pool):
+    pool.connect().close()
+
+    recreated_pool = pool.recreate()
+    recreated_pool.connect().close()
+
+    assert pool_metrics["test"].checkouts == 2
+
+
+def test_wait_time_histogram_is_cumulative(mocker):
+    metrics = PoolMetrics(buckets=(0.01, 0.1))
+    for seconds in (0.005, 0.05, 0.5):
+        metrics.observe_wait_time(seconds)
+
+    histogram = metrics.snapshot(mocker.Mock())["wait_time"]["buckets"]
+
+    assert histogram == {"0.01": 1, "0.1": 2, "+Inf": 3}
@@ -0,0 +1,403 @@
+import pytest
+from fastapi import HTTPException, status
+from pydantic import BaseModel
+from sqlalchemy import create_engine, select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from src.adapters.enums.count_strategy_enum import CountStrategyEnum
+from src.adapters.enums.cursor_direction_enum import CursorDirectionEnum
+from src.adapters.model_statements import get_model_statements
+from src.adapters.postgres_adapter import PostgresAdapter
+from src.api.schema.pagination_schema import CursorPaginationParams, PaginationParams
+from src.models.enums.user_role_enum import UserRoleEnum
+from src.models.user_model import User
+from src.utils.cursor import decode_cursor, encode_cursor
+from src.utils.lru_ttl_cache import LRUTTLCache
+
+
+def compile_query(query) -> str:
+    return str(query.compile(dialect=postgresql.dialect()))
+
+
+@pytest.fixture
+def session(mocker):
+    session = mocker.AsyncMock()
+    session.execute.return_value.scalars = mocker.Mock()
+    session.begin_nested = mocker.MagicMock()
+    session.begin_nested.return_value.__aexit__.return_value = False
+    return session
+
+
+def set_rows(session, rows):
+    session.execute.return_value.scalars.return_value.all.return_value = rows
+
+
+@pytest.mark.asyncio
+async def test_first_page_returns_next_cursor(session):
+    set_rows(session, [User(id=i) for i in range(1, 4)])
+    adapter = PostgresAdapter(session, User)
+
+    page = await adapter.get_cursor_paginated_data(CursorPaginationParams(cursor=None, size=2), select(User))
+
+    query = compile_query(session.execute.await_args.args[0])
+    assert 'ORDER BY "user".id ASC' in query
+    assert "LIMIT" in query
+    assert [user.id for user in page.items] == [1, 2]
+    assert decode_cursor(page.next_cursor) == ([2], CursorDirectionEnum.NEXT)
+    assert page.previous_cursor is None
+
+
+@pytest.mark.asyncio
+async def test_next_page_uses_row_value_comparison(session):
+    set_rows(session, [User(id=3)])
+    adapter = PostgresAdapter(session, User)
+    cursor = encode_cursor([2], CursorDirectionEnum.NEXT)
+
+    page = await adapter.get_cursor_paginated_data(CursorPaginationParams(cursor=cursor, size=2), select(User))
+
+    assert '("user".id) > (' in compile_query(session.execute.await_args.args[0])
+    assert page.next_cursor is None
+    assert decode_cursor(page.previous_cursor) == ([3], CursorDirectionEnum.PREVIOUS)
+
+
+@pytest.mark.asyncio
+async def test_previous_page_is_read_backwards_and_reversed(session):
+    set_rows(session, [User(id=4, first_name="b"), User(id=2, first_name="b"), User(id=9, first_name="a")])
+    adapter = PostgresAdapter(session, User)
+    cursor = encode_cursor(["c", 1], CursorDirectionEnum.PREVIOUS)
+
+    page = await adapter.get_cursor_paginated_data(
+        CursorPaginationParams(cursor=cursor, size=2),
+        select(User),
+        order_by=(User.first_name.desc(), User.id),
+    )
+
+    query = compile_query(session.execute.await_args.args[0])
+    assert 'ORDER BY "user".first_name ASC, "user".id DESC' in query
+    assert '"user".first_name > ' in query
+    assert [user.id for user in page.items] == [2, 4]
+    assert decode_cursor(page.previous_cursor) == (["b", 2], CursorDirectionEnum.PREVIOUS)
+    assert decode_cursor(page.next_cursor) == (["b", 4], CursorDirectionEnum.NEXT)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("cursor", ["not-a-cursor", encode_cursor([1, 2], CursorDirectionEnum.NEXT)])
+async def test_invalid_cursor_is_rejected(session, cursor):
+    adapter = PostgresAdapter(session, User)
+
+    with pytest.raises(HTTPException):
+        await adapter.get_cursor_paginated_data(CursorPaginationParams(cursor=cursor, size=2), select(User))
+    session.execute.assert_not_awaited()
+
+
+def result(mocker, scalar=None, rows=()):
+    res = mocker.Mock()
+    res.scalar.return_value = scalar
+    res.scalars.return_value.all.return_value = list(rows)
+    res.scalars.return_value.first.return_value = rows[0] if rows else None
+    return res
+
+
+@pytest.mark.asyncio
+async def test_exact_count_is_run_over_subquery(mocker, session):
+    session.execute.side_effect = [result(mocker, scalar=3), result(mocker, rows=[User(id=1), User(id=2)])]
+    adapter = PostgresAdapter(session, User)
+
+    page = await adapter.get_paginated_data(PaginationParams(page=1, size=2), select(User))
+
+    assert "count(*)" in compile_query(session.execute.await_args_list[0].args[0])
+    assert "FROM (SELECT" in compile_query(session.execute.await_args_list[0].args[0])
+    assert (page.total, page.pages, page.total_is_exact, page.has_next) == (3, 2, True, False)
+
+
+@pytest.mark.asyncio
+async def test_no_count_detects_next_page_with_extra_row(mocker, session):
+    session.execute.side_effect = [result(mocker, rows=[User(id=i) for i in range(3)])]
+    adapter = PostgresAdapter(session, User)
+
+    page = await adapter.get_paginated_data(
+        PaginationParams(page=1, size=2),
+        select(User),
+        count_strategy=CountStrategyEnum.NONE,
+    )
+
+    assert session.execute.await_count == 1
+    assert len(page.items) == 2
+    assert (page.total, page.pages, page.total_is_exact, page.has_next) == (None, None, False, True)
+
+
+@pytest.mark.asyncio
+async def test_large_estimated_count_is_used_as_is(mocker, session):
+    plan = [{"Plan": {"Plan Rows": 1_000_000}}]
+    session.execute.side_effect = [result(mocker, scalar=plan), result(mocker, rows=[User(id=1)])]
+    adapter = PostgresAdapter(session, User)
+
+    page = await adapter.get_paginated_data(
+        PaginationParams(page=1, size=2),
+        select(User),
+        count_strategy=CountStrategyEnum.ESTIMATED,
+    )
+
+    assert compile_query(session.execute.await_args_list[0].args[0]).startswith("EXPLAIN (FORMAT JSON) SELECT")
+    assert (page.total, page.total_is_exact) == (1_000_000, False)
+
+
+@pytest.mark.asyncio
+async def test_cached_count_is_reused_for_same_query(mocker, session):
+    mocker.patch.object(PostgresAdapter, "count_cache", LRUTTLCache(max_entries=10))
+    session.execute.side_effect = [result(mocker, scalar=5), result(mocker), result(mocker)]
+    adapter = PostgresAdapter(session, User)
+    params = PaginationParams(page=1, size=2)
+
+    first = await adapter.get_paginated_data(params, select(User), count_strategy=CountStrategyEnum.CACHED)
+    second = await adapter.get_paginated_data(params, select(User), count_strategy=CountStrategyEnum.CACHED)
+
+    assert session.execute.await_count == 3
+    assert (first.total, first.total_is_exact) == (5, True)
+    assert (second.total, second.total_is_exact) == (5, False)
+
+
+class UserCreate(BaseModel):
+    id: int
+    first_name: str
+    last_name: str | None = None
+
+
+async def async_users(count):
+    for i in range(count):
+        yield UserCreate(id=i, first_name=f"user{i}")
+
+
+@pytest.mark.asyncio
+async def test_bulk_create_inserts_batches_with_returning(mocker, session):
+    session.execute.side_effect = [result(mocker, rows=[User(id=0), User(id=1)]), result(mocker, rows=[User(id=2)])]
+    adapter = PostgresAdapter(session, User)
+
+    bulk_result = await adapter.bulk_create(async_users(3), batch_size=2)
+
+    queries = [compile_query(call.args[0]) for call in session.execute.await_args_list]
+    assert all(query.startswith('INSERT INTO "user"') and "RETURNING" in query for query in queries)
+    assert queries[0].count("%(id_m") == 2
+    assert session.commit.await_count == 2
+    assert bulk_result.written == 3
+    assert [user.id for user in bulk_result.items] == [0, 1, 2]
+
+
+@pytest.mark.asyncio
+async def test_bulk_create_reports_failed_batches(mocker, session):
+    error = IntegrityError("INSERT", {}, Exception("duplicate key"))
+    session.execute.side_effect = [error, result(mocker, rows=[User(id=2)])]
+    adapter = PostgresAdapter(session, User)
+
+    bulk_result = await adapter.bulk_create([UserCreate(id=i, first_name="a") for i in range(3)], batch_size=2)
+
+    assert isinstance(session.begin_nested.return_value.__aexit__.await_args_list[0].args[1], IntegrityError)
+    session.rollback.assert_not_awaited()
+    assert bulk_result.written == 1
+    assert [(error.batch, error.size) for error in bulk_result.errors] == [(0, 2)]
+
+
+@pytest.mark.asyncio
+async def test_bulk_create_keeps_items_of_written_batches_on_failure(mocker, session):
+    error = IntegrityError("INSERT", {}, Exception("duplicate key"))
+    session.execute.side_effect = [result(mocker, rows=[User(id=0, first_name="a"), User(id=1, first_name="b")]), error]
+    adapter = PostgresAdapter(session, User)
+
+    bulk_result = await adapter.bulk_create([UserCreate(id=i, first_name="a") for i in range(3)], batch_size=2)
+
+    # Only the savepoint of the failed batch is rolled back, the session isn't, so the items aren't expired
+    session.rollback.assert_not_awaited()
+    assert session.begin_nested.call_count == 2
+    assert [(user.id, user.first_name) for user in bulk_result.items] == [(0, "a"), (1, "b")]
+    assert [(error.batch, error.size) for error in bulk_result.errors] == [(1, 1)]
+
+
+@pytest.mark.asyncio
+async def test_bulk_upsert_updates_non_conflicting_columns(mocker, session):
+    session.execute.side_effect = [result(mocker, rows=[User(id=1)])]
+    adapter = PostgresAdapter(session, User)
+
+    await adapter.bulk_upsert([UserCreate(id=1, first_name="a")])
+
+    query = compile_query(session.execute.await_args.args[0])
+    assert "ON CONFLICT (id) DO UPDATE SET first_name = excluded.first_name" in query
+
+
+@pytest.mark.asyncio
+async def test_bulk_upsert_writes_only_set_columns(mocker, session):
+    session.execute.side_effect = [result(mocker, rows=[User(id=1)]), result(mocker, rows=[User(id=2)])]
+    adapter = PostgresAdapter(session, User)
+
+    await adapter.bulk_upsert([UserCreate(id=1, first_name="a", last_name="b"), UserCreate(id=2, first_name="c")])
+
+    with_last_name, without_last_name = (compile_query(call.args[0]) for call in session.execute.await_args_list)
+    assert "SET first_name = excluded.first_name, last_name = excluded.last_name" in with_last_name
+    assert 'INSERT INTO "user" (id, first_name) VALUES' in without_last_name
+    assert "DO UPDATE SET first_name = excluded.first_name RETURNING" in without_last_name
+
+
+@pytest.mark.asyncio
+async def test_bulk_upsert_deduplicates_rows_by_conflict_columns(mocker, session):
+    session.execute.side_effect = [result(mocker, rows=[User(id=1), User(id=2)])]
+    adapter = PostgresAdapter(session, User)
+
+    bulk_result = await adapter.bulk_upsert(
+        [UserCreate(id=1, first_name="a"), UserCreate(id=2, first_name="b"), UserCreate(id=1, first_name="c")],
+    )
+
+    params = session.execute.await_args.args[0].compile(dialect=postgresql.dialect()).params
+    assert session.execute.await_count == 1
+    assert [(params["id_m0"], params["first_name_m0"]), (params["id_m1"], params["first_name_m1"])] == [
+        (1, "c"),
+        (2, "b"),
+    ]
+    assert "id_m2" not in params
+    assert bulk_result.written == 2
+
+
+@pytest.mark.asyncio
+async def test_bulk_create_copies_records(mocker, session):
+    driver_connection = mocker.AsyncMock()
+    connection = mocker.AsyncMock()
+    connection.get_raw_connection.return_value.driver_connection = driver_connection
+    session.connection.return_value = connection
+    adapter = PostgresAdapter(session, User)
+
+    bulk_result = await adapter.bulk_create(async_users(3), batch_size=2, use_copy=True)
+
+    assert driver_connection.copy_records_to_table.await_count == 2
+    assert driver_connection.copy_records_to_table.await_args_list[0].kwargs["records"] == [(0, "user0"), (1, "user1")]
+    assert bulk_result.written == 3
+
+
+class UserUpdate(BaseModel):
+    first_name: str | None = None
+    last_name: str | None = None
+
+
+@pytest.mark.asyncio
+async def test_retrieve_runs_single_query(mocker, session):
+    session.execute.side_effect = [result(mocker, rows=[User(id=1)])]
+    adapter = PostgresAdapter(session, User)
+
+    await adapter.retrieve(1)
+
+    assert session.execute.await_count == 1
+    session.refresh.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_bulk_retrieve_doesnt_refresh_objects(mocker, session):
+    session.execute.side_effect = [result(mocker, rows=[User(id=1), User(id=2)])]
+    adapter = PostgresAdapter(session, User)
+
+    await adapter.bulk_retrieve([1, 2])
+
+    assert session.execute.await_count == 1
+    session.refresh.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_update_returns_updated_object_in_single_statement(mocker, session):
+    updated = User(id=1, first_name="new")
+    session.execute.side_effect = [result(mocker, rows=[updated])]
+    adapter = PostgresAdapter(session, User)
+
+    obj = await adapter.update(1, UserUpdate(first_name="new"), partial=True)
+
+    query = compile_query(session.execute.await_args.args[0])
+    assert query.startswith('UPDATE "user" SET first_name=')
+    assert "RETURNING" in query
+    assert obj is updated
+    assert session.execute.await_count == 1
+    assert session.commit.await_count == 1
+    session.refresh.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_update_refreshes_object_on_request(mocker, session):
+    session.execute.side_effect = [result(mocker, rows=[User(id=1)])]
+    adapter = PostgresAdapter(session, User)
+
+    await adapter.update(1, UserUpdate(first_name="new"), partial=True, refresh=True)
+
+    session.refresh.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_update_of_missing_object_raises_not_found(mocker, session):
+    session.execute.side_effect = [result(mocker)]
+    adapter = PostgresAdapter(session, User)
+
+    with pytest.raises(HTTPException) as exc_info:
+        await adapter.update(1, UserUpdate(first_name="new"), partial=True)
+
+    assert exc_info.value.status_code == status.HTTP_404_NOT_FOUND
+    session.commit.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(("deleted_pk", "expected_status"), [(1, None), (None, status.HTTP_404_NOT_FOUND)])
+async def test_delete_runs_single_statement(mocker, session, deleted_pk, expected_status):
+    session.execute.side_effect = [result(mocker, scalar=deleted_pk)]
+    adapter = PostgresAdapter(session, User)
+
+    if expected_status is None:
+        await adapter.delete(1)
+    else:
+        with pytest.raises(HTTPException) as exc_info:
+            await adapter.delete(1)
+        assert exc_info.value.status_code == expected_status
+
+    assert compile_query(session.execute.await_args.args[0]).startswith('DELETE FROM "user" WHERE')
+    assert session.execute.await_count == 1
+
+
+def test_deleted_object_is_removed_from_session():
+    engine = create_engine("sqlite://")
+    User.__table__.create(engine)
+    statements = get_model_statements(User)
+
+    with Session(engine) as session:
+        user = User(id=1, first_name="a", last_name="b", email="e", phone_number="p", user_role=UserRoleEnum.User)
+        session.add(user)
+        session.commit()
+
+        assert session.execute(statements.delete, {"primary_key": 1}).scalar() == 1
+        assert user not in session
+        assert session.get(User, 1) is None
+        assert session.execute(statements.retrieve, {"primary_key": 1}).scalars().first() is None
+
+
+@pytest.mark.asyncio
+async def test_stream_reads_partitions_of_fetch_size(mocker, session):
+    async def partitions():
+        yield [User(id=1), User(id=2)]
+        yield [User(id=3)]
+
+    stream_result = mocker.Mock()
+    stream_result.scalars.return_value.partitions = partitions
+    session.stream.return_value = stream_result
+    adapter = PostgresAdapter(session, User)
+
+    users = [user async for user in adapter.stream(select(User), fetch_size=2)]
+
+    assert [user.id for user in users] == [1, 2, 3]
+    assert session.stream.await_args.args[0].get_execution_options()["yield_per"] == 2
+
+
+@pytest.mark.asyncio
+async def test_bulk_statements_keep_same_sql_for_any_number_of_keys(mocker, session):
+    adapter = PostgresAdapter(session, User)
+    queries = []
+    for pks in ([1], [1, 2, 3]):
+        session.execute.side_effect = [result(mocker, rows=[])]
+        await adapter.bulk_retrieve(pks)
+        queries.append(compile_query(session.execute.await_args.args[0]))
+        assert session.execute.await_args.args[1] == {"primary_keys": pks}
+
+    assert queries[0] == queries[1]
+    assert '"user".id = ANY (%(primary_keys)s::INTEGER[])' in queries[0]
+    assert PostgresAdapter(session, User).statements is adapter.statements
@@ -0,0 +1,108 @@
+from datetime import timedelta
+
+import pytest
+
+from src.adapters.redis_adapter import RedisRequestCachingService
+from src.utils.codecs import get_codec
+from src.utils.lru_ttl_cache import LRUTTLCache
+
+CODEC = get_codec("json")
+
+
+@pytest.fixture
+def get_cache_script(mocker):
+    return mocker.AsyncMock()
+
+
+@pytest.fixture
+def caching_service(mocker, get_cache_script):
+    redis = mocker.MagicMock()
+    redis.register_script.return_value = get_cache_script
+    local_cache = LRUTTLCache(max_entries=10, ttl=timedelta(seconds=30))
+    return RedisRequestCachingService(redis, local_cache=local_cache, codec=CODEC)
+
+
+@pytest.mark.asyncio
+async def test_local_entry_does_not_outlive_the_redis_one(mocker, caching_service, get_cache_script):
+    monotonic = mocker.patch("src.utils.lru_ttl_cache.time.monotonic", return_value=100.0)
+    get_cache_script.return_value = [CODEC.encode({"status_code": 200}), b"content", b"body", 5000]
+
+    assert (await caching_service.get_cache("key"))["content"] == b"body"
+
+    monotonic.return_value = 104.0
+    assert await caching_service.get_cache("key") is not None
+    assert get_cache_script.await_count == 1
+
+    get_cache_script.return_value = None
+    monotonic.return_value = 106.0
+    assert await caching_service.get_cache("key") is None
+    assert get_cache_script.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_local_hit_is_counted_only_when_served(caching_service, get_cache_script):
+    get_cache_script.return_value = [CODEC.encode({"status_code": 200}), b"content:gzip", b"compressed", 5000]
+    await caching_service.get_cache("key", ["gzip"])
+    get_cache_script.return_value = [CODEC.encode({"status_code": 200}), b"content", b"body", 5000]
+
+    assert (await caching_service.get_cache("key", ["gzip"]))["variants"] == {"gzip": b"compressed"}
+    assert (await caching_service.get_cache("key"))["content"] == b"body"
+    assert caching_service.local_cache.hits == 1
+    assert caching_service.local_cache.misses == 2
+
+
+@pytest.fixture
+def pipeline(mocker, caching_service):
+    pipeline = mocker.MagicMock()
+    pipeline.execute = mocker.AsyncMock()
+    caching_service.redis.pipeline.return_value.__aenter__.return_value = pipeline
+    return pipeline
+
+
+@pytest.mark.asyncio
+async def test_tagged_keys_are_scored_by_expiration_and_pruned(mocker, caching_service, pipeline):
+    mocker.patch("src.adapters.redis_adapter.time.time", return_value=1000.0)
+
+    await caching_service.set_cache(
+        "key",
+        {"status_code": 200, "content": b"body", "variants": {}},
+        expire=timedelta(seconds=60),
+        tags=["users"],
+    )
+
+    pipeline.zremrangebyscore.assert_called_once_with("request-cache-tags:users", "-inf", 1000.0)
+    pipeline.zadd.assert_called_once_with("request-cache-tags:users", {"key": 1060.0})
+
+
+@pytest.mark.asyncio
+async def test_invalidation_removes_only_scanned_keys_from_tag(mocker, caching_service, pipeline):
+    async def zscan_iter(*_, **__):
+        for key in (b"first", b"second"):
+            yield key, 1060.0
+
+    caching_service.redis.zscan_iter = zscan_iter
+    caching_service.redis.unlink = mocker.AsyncMock()
+    pipeline.execute.return_value = [2, 2]
+
+    assert await caching_service.invalidate_tags("users") == 2
+
+    pipeline.unlink.assert_called_once_with("request-cache:first", "request-cache:second")
+    pipeline.zrem.assert_called_once_with("request-cache-tags:users", "first", "second")
+    caching_service.redis.unlink.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_removals_clear_the_local_tier(caching_service):
+    async def scan_iter(*_, **__):
+        for key in ():
+            yield key
+
+    caching_service.redis.scan_iter = caching_service.redis.zscan_iter = scan_iter
+    # Local keys are hashes, they can't be matched against the path substrings
+    caching_service.local_cache.set("3f2a9c", {"content": b"body", "variants": {}})
+    await caching_service.remove_all_cache("/users/")
+    assert len(caching_service.local_cache) == 0
+
+    caching_service.local_cache.set("3f2a9c", {"content": b"body", "variants": {}})
+    await caching_service.invalidate_tags("users")
+    assert len(caching_service.local_cache) == 0
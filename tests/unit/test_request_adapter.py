@@ -0,0 +1,194 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from src.adapters.enums.circuit_state_enum import CircuitStateEnum
+from src.adapters.enums.http_method_enum import HTTPMethodEnum
+from src.adapters.request_adapter import RequestService, RequestSpec
+from src.core.config import http_client_config
+from src.core.exceptions import ClientError, ServerError
+from src.dependencies.http_client_dependency import get_http_client
+from src.utils.latency_tracker import LatencyTracker
+
+
+@pytest.fixture(autouse=True)
+def resilience(mocker):
+    mocker.patch.object(http_client_config, "RETRY_BACKOFF_BASE", 0)
+    RequestService.circuit_breakers.clear()
+    RequestService.retry_budgets.clear()
+    yield
+    RequestService.circuit_breakers.clear()
+    RequestService.retry_budgets.clear()
+
+
+@pytest.fixture
+def requests(mocker):
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        if request.url.path.startswith("/status/"):
+            return httpx.Response(int(request.url.path.removeprefix("/status/")), json={"ok": False})
+        return httpx.Response(503 if request.url.path == "/unavailable" else 200, json={"ok": True})
+
+    mocker.patch.object(RequestService, "client", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    return requests
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("method", list(HTTPMethodEnum))
+async def test_every_method_is_sent_through_shared_client(requests, method):
+    client = RequestService.client
+
+    await RequestService.make_request("https://example.com/items", method=method, timeout=1.5)
+
+    assert requests[0].method == method.value.upper()
+    assert requests[0].extensions["timeout"]["read"] == 1.5
+    assert RequestService.client is client
+
+
+@pytest.mark.asyncio
+async def test_server_errors_are_raised(requests):
+    with pytest.raises(ServerError):
+        await RequestService.make_request("https://example.com/unavailable")
+
+
+@pytest.mark.asyncio
+async def test_client_is_closed_on_shutdown(mocker):
+    mocker.patch.object(RequestService, "client", None)
+    RequestService.start()
+    client = RequestService.client
+
+    await RequestService.close()
+
+    assert client.is_closed
+    assert RequestService.client is None
+
+
+def test_configured_hosts_get_pools_of_their_own(mocker):
+    mocker.patch.object(http_client_config, "HOST_MAX_CONNECTIONS", {"api.example.com": 5})
+
+    client = get_http_client()
+
+    assert client._transport_for_url(httpx.URL("https://api.example.com/")) is not client._transport
+    assert client._transport_for_url(httpx.URL("https://other.com/")) is client._transport
+
+
+@pytest.fixture
+def slow_client(mocker):
+    state = {"running": 0, "max_running": 0, "calls": 0}
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        state["running"] += 1
+        state["calls"] += 1
+        state["max_running"] = max(state["max_running"], state["running"])
+        try:
+            delay = float(request.url.params.get("delay", 0))
+            if request.url.params.get("fast_retry") and state["calls"] > 1:
+                delay = 0
+            await asyncio.sleep(delay)
+        finally:
+            state["running"] -= 1
+        return httpx.Response(404 if request.url.path == "/missing" else 200)
+
+    mocker.patch.object(RequestService, "client", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    mocker.patch.object(RequestService, "latency_tracker", LatencyTracker(window=10, min_samples=10))
+    return state
+
+
+@pytest.mark.asyncio
+async def test_batch_reports_results_and_errors_per_item(slow_client):
+    specs = [
+        RequestSpec("https://a.com/ok"),
+        RequestSpec("https://a.com/missing"),
+        RequestSpec("https://b.com/ok", params={"delay": 1}),
+    ]
+
+    results = await RequestService.make_requests(specs, deadline=0.2)
+
+    assert results[0].response.status_code == 200
+    assert isinstance(results[1].error, ClientError)
+    assert isinstance(results[2].error, TimeoutError)
+
+
+@pytest.mark.asyncio
+async def test_batch_limits_concurrency_per_host(slow_client):
+    specs = [RequestSpec("https://a.com/ok", params={"delay": 0.01}) for _ in range(6)]
+
+    results = await RequestService.make_requests(specs, max_concurrency_per_host=2)
+
+    assert all(result.error is None for result in results)
+    assert slow_client["max_running"] == 2
+
+
+@pytest.mark.asyncio
+async def test_hedged_get_returns_first_response(mocker, slow_client):
+    mocker.patch.object(http_client_config, "HEDGE_DELAY", 0.01)
+
+    started_at = time.perf_counter()
+    await RequestService.make_request("https://a.com/ok", params={"delay": 5, "fast_retry": 1}, hedge=True)
+
+    assert time.perf_counter() - started_at < 1
+    assert slow_client["calls"] == 2
+    assert slow_client["running"] == 0  # The losing attempt has been cancelled and awaited
+
+
+def test_hedge_delay_follows_p95_latency():
+    tracker = LatencyTracker(window=100, min_samples=10)
+    for latency in range(1, 101):
+        tracker.observe("a.com", latency / 100)
+
+    assert tracker.quantile("a.com", 0.95) == 0.95
+    assert tracker.quantile("b.com", 0.95) is None
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(("method", "expected_attempts"), [(HTTPMethodEnum.GET, 3), (HTTPMethodEnum.POST, 1)])
+async def test_only_idempotent_requests_are_retried(requests, method, expected_attempts):
+    with pytest.raises(ServerError):
+        await RequestService.make_request("https://example.com/unavailable", method=method)
+
+    assert len(requests) == expected_attempts
+
+
+@pytest.mark.asyncio
+async def test_retries_are_capped_by_retry_budget(mocker, requests):
+    mocker.patch.object(http_client_config, "RETRY_BUDGET_MIN_RETRIES", 1)
+    mocker.patch.object(http_client_config, "RETRY_BUDGET_RATIO", 0)
+
+    for _ in range(3):
+        with pytest.raises(ServerError):
+            await RequestService.make_request("https://example.com/unavailable")
+
+    assert len(requests) == 4
+
+
+@pytest.mark.asyncio
+async def test_open_circuit_rejects_requests_without_sending_them(mocker, requests):
+    mocker.patch.object(http_client_config, "CIRCUIT_BREAKER_MIN_CALLS", 2)
+    for _ in range(2):
+        with pytest.raises(ServerError):
+            await RequestService.make_request("https://example.com/unavailable", max_retries=0)
+
+    with pytest.raises(ServerError) as exc_info:
+        await RequestService.make_request("https://example.com/items")
+
+    assert exc_info.value.status_code == httpx.codes.SERVICE_UNAVAILABLE
+    assert len(requests) == 2
+    assert RequestService.circuit_breakers["example.com"].state == CircuitStateEnum.OPEN
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    ("status_code", "expected_state"),
+    [(500, CircuitStateEnum.OPEN), (429, CircuitStateEnum.OPEN), (404, CircuitStateEnum.CLOSED)],
+)
+async def test_server_errors_and_throttling_trip_the_circuit(mocker, requests, status_code, expected_state):
+    mocker.patch.object(http_client_config, "CIRCUIT_BREAKER_MIN_CALLS", 2)
+    for _ in range(2):
+        with pytest.raises((ClientError, ServerError)):
+            await RequestService.make_request(f"https://example.com/status/{status_code}")
+
+    assert RequestService.circuit_breakers["example.com"].state == expected_state
@@ -0,0 +1,43 @@
+import pytest
+from fastapi import FastAPI, status
+from httpx import ASGITransport, AsyncClient
+
+from src.api.v1.internal import router as internal_router
+from src.core.exceptions import ClientError
+from src.core.exceptions.exception_handlers.core_exception_handlers import client_error_exception_handler
+from src.dependencies.role_dependency import require_roles
+from src.models.enums.user_role_enum import UserRoleEnum
+
+
+@pytest.mark.parametrize("role", ["Admin", ["User", "Admin"]])
+def test_allowed_roles_pass(mocker, role):
+    mocker.patch("src.dependencies.role_dependency.get_user_info", return_value={"role": role})
+
+    require_roles(UserRoleEnum.Admin)()
+
+
+@pytest.mark.parametrize("claims", [{"role": "User"}, {"role": ["User"]}, {}])
+def test_other_roles_are_rejected(mocker, claims):
+    mocker.patch("src.dependencies.role_dependency.get_user_info", return_value=claims)
+
+    with pytest.raises(ClientError) as exc_info:
+        require_roles(UserRoleEnum.Admin)()
+
+    assert exc_info.value.status_code == status.HTTP_403_FORBIDDEN
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    ("role", "expected_status"),
+    [("User", status.HTTP_403_FORBIDDEN), ("Admin", status.HTTP_200_OK)],
+)
+async def test_internal_endpoints_are_restricted_to_admins(mocker, role, expected_status):
+    mocker.patch("src.dependencies.role_dependency.get_user_info", return_value={"role": role})
+    app = FastAPI()
+    app.include_router(internal_router)
+    app.add_exception_handler(ClientError, client_error_exception_handler)
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get("/internal/http-cache-metrics/")
+
+    assert response.status_code == expected_status
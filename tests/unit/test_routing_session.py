@@ -0,0 +1,98 @@
+import pytest
+from sqlalchemy import delete, select, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from src.db.enums.replica_selection_enum import ReplicaSelectionEnum
+from src.db.routing_session import (
+    ReplicaSelector,
+    RoutingSession,
+    recent_writers,
+    record_write,
+    reset_write_transaction,
+)
+from src.models.user_model import User
+from src.utils.sql_explain import Explain
+
+
+@pytest.fixture
+def engines():
+    primary, *replicas = (
+        create_async_engine(f"postgresql+asyncpg://{host}/db").sync_engine
+        for host in ("primary", "replica-1", "replica-2")
+    )
+    return primary, replicas
+
+
+@pytest.fixture
+def session(engines):
+    primary, replicas = engines
+    return RoutingSession(bind=primary, replica_selector=ReplicaSelector(replicas, ReplicaSelectionEnum.ROUND_ROBIN))
+
+
+def test_reads_of_a_transaction_use_a_single_replica(engines, session):
+    _, replicas = engines
+
+    assert session.get_bind(clause=select(User)) is replicas[0]
+    assert session.get_bind(clause=select(User).where(User.id == 1)) is replicas[0]
+
+
+def test_reads_are_spread_over_replicas_by_transaction(engines, session):
+    _, replicas = engines
+    binds = []
+
+    for end_transaction in (record_write, reset_write_transaction, record_write, reset_write_transaction):
+        binds.append(session.get_bind(clause=select(User)))
+        end_transaction(session)
+
+    assert binds == [*replicas, *replicas]
+
+
+def test_writes_and_following_reads_go_to_primary(engines, session):
+    primary, _ = engines
+
+    assert session.get_bind(clause=delete(User)) is primary
+    assert session.get_bind(clause=select(User)) is primary
+
+
+@pytest.mark.parametrize(
+    "clause",
+    [text("SELECT 1"), select(User).with_for_update(), select(User).execution_options(primary=True)],
+)
+def test_ambiguous_locking_and_explicit_reads_go_to_primary(engines, session, clause):
+    assert session.get_bind(clause=clause) is engines[0]
+
+
+def test_explained_reads_go_to_replicas(engines, session):
+    _, replicas = engines
+
+    assert session.get_bind(clause=Explain(select(User))) is replicas[0]
+
+
+@pytest.mark.parametrize("clause", [text("SELECT 1"), None])
+def test_ambiguous_statements_do_not_pin_the_transaction(engines, session, clause):
+    _, replicas = engines
+
+    assert session.get_bind(clause=clause) is engines[0]
+    assert not session.in_write_transaction
+    assert session.get_bind(clause=select(User)) is replicas[0]
+
+
+def test_reads_stick_to_primary_after_commit_within_window(mocker, engines, session):
+    mocker.patch("src.db.routing_session.get_user_info", return_value={"sub": "1"})
+    recent_writers.clear()
+    session.get_bind(clause=delete(User))
+
+    record_write(session)
+    other_session = RoutingSession(bind=engines[0], replica_selector=session.replica_selector)
+
+    assert session.get_bind(clause=select(User)) is engines[0]
+    assert other_session.get_bind(clause=select(User)) is engines[0]
+    recent_writers.clear()
+
+
+def test_least_connections_picks_least_busy_replica(mocker, engines):
+    _, replicas = engines
+    mocker.patch.object(replicas[0].pool, "checkedout", return_value=3)
+    mocker.patch.object(replicas[1].pool, "checkedout", return_value=1)
+
+    assert ReplicaSelector(replicas, ReplicaSelectionEnum.LEAST_CONNECTIONS).select() is replicas[1]
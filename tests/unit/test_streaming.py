@@ -0,0 +1,61 @@
+import json
+from datetime import datetime
+
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from src.api.enums.export_format_enum import ExportFormatEnum
+from src.utils.streaming import CHUNK_SIZE, build_streaming_response, iterate_ndjson
+
+COLUMNS = ("id", "name", "created_at")
+
+
+async def iterate_rows(count):
+    for i in range(count):
+        yield {"id": i, "name": f"name, {i}", "created_at": datetime(2024, 1, 1), "secret": "hidden"}
+
+
+@pytest.fixture
+def app():
+    app = FastAPI()
+
+    @app.get("/export/")
+    async def export(export_format: ExportFormatEnum):
+        return build_streaming_response(iterate_rows(3), export_format, COLUMNS, filename="rows")
+
+    return app
+
+
+@pytest.mark.asyncio
+async def test_ndjson_export(app):
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get("/export/", params={"export_format": "ndjson"})
+
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert response.headers["content-disposition"] == 'attachment; filename="rows.ndjson"'
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines[0] == {"id": 0, "name": "name, 0", "created_at": "2024-01-01T00:00:00"}
+    assert len(lines) == 3
+
+
+@pytest.mark.asyncio
+async def test_csv_export(app):
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get("/export/", params={"export_format": "csv"})
+
+    assert response.headers["content-type"].startswith("text/csv")
+    assert response.text.splitlines() == [
+        "id,name,created_at",
+        '0,"name, 0",2024-01-01T00:00:00',
+        '1,"name, 1",2024-01-01T00:00:00',
+        '2,"name, 2",2024-01-01T00:00:00',
+    ]
+
+
+@pytest.mark.asyncio
+async def test_rows_are_sent_in_bounded_chunks():
+    chunks = [chunk async for chunk in iterate_ndjson(iterate_rows(5000), COLUMNS)]
+
+    assert len(chunks) > 1
+    assert all(len(chunk) < 2 * CHUNK_SIZE for chunk in chunks)